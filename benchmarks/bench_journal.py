@@ -0,0 +1,66 @@
+"""
+事件日誌效能測試 - 測量日誌寫入速率與每千筆事件的重播時間
+
+用法：python benchmarks/bench_journal.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.game.room import GameRoom
+from src.utils.journal import RoomJournal
+from src.utils.storage import GameStorage
+
+PLAYERS = 12
+EVENT_COUNTS = [1000, 10000, 50000]
+
+
+def record_votes(room: GameRoom, events: int):
+    """以投票產生大量事件（每位玩家反覆改票）"""
+    ids = list(room.players)
+    for i in range(events):
+        room.cast_vote(ids[i % PLAYERS], ids[(i * 7 + 1) % PLAYERS])
+
+
+def new_room(journal: RoomJournal) -> GameRoom:
+    room = GameRoom("group_bench")
+    journal.attach(room)
+    for p in range(PLAYERS):
+        room.add_player(f"user_{p}", f"Player {p}")
+    return room
+
+
+def main():
+    print(f"{'事件數':>8}{'寫入(筆/秒)':>14}{'fsync(筆/秒)':>14}{'重播(ms/千筆)':>16}")
+    for count in EVENT_COUNTS:
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = RoomJournal(os.path.join(tmp, "journal"))
+            room = new_room(journal)
+            start = time.perf_counter()
+            record_votes(room, count)
+            append_rate = count / (time.perf_counter() - start)
+            journal.close()
+
+            storage = GameStorage(os.path.join(tmp, "data"), journal=RoomJournal(os.path.join(tmp, "journal")))
+            start = time.perf_counter()
+            rebuilt = storage.load_game("group_bench")
+            replay_ms = (time.perf_counter() - start) * 1000 / (count / 1000)
+            assert rebuilt.votes == room.votes
+
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = RoomJournal(tmp, fsync=True)
+            room = new_room(journal)
+            fsync_events = min(count, 1000)
+            start = time.perf_counter()
+            record_votes(room, fsync_events)
+            fsync_rate = fsync_events / (time.perf_counter() - start)
+            journal.close()
+
+        print(f"{count:>8}{append_rate:>14.0f}{fsync_rate:>14.0f}{replay_ms:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
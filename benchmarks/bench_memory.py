@@ -0,0 +1,120 @@
+"""
+房間記憶體用量測試 - 以 tracemalloc 量測每個常駐 12 人房間佔用的位元組數
+
+與改用 __slots__ 與角色代碼之前的資料模型（以 BaselineRoom 等一般類別重現當時的欄位）比較。
+
+用法：python benchmarks/bench_memory.py
+"""
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.game.role import ROLE_TYPES
+from src.game.room import GameRoom
+from src.game.state import GameState
+from src.utils.config import GameConfig
+
+ROOMS = 2000
+PLAYERS_PER_ROOM = 12
+
+
+class BaselineRole:
+    """改版前的 Role：以 Enum 記錄角色，每個旗標一個屬性，特殊效果一律配置字典"""
+
+    def __init__(self, role_type):
+        self.role_type = role_type
+        self.is_alive = True
+        self.skill_used = False
+        self.protected_by_guard = False
+        self.special_effects = {}
+
+
+class BaselinePlayer:
+    """改版前的 Player：被投票紀錄為投票者 id 的串列"""
+
+    def __init__(self, user_id: str, display_name: str):
+        self.user_id = user_id
+        self.display_name = display_name
+        self.role = None
+        self.is_ready = False
+        self.voted_by = []
+
+
+class BaselineRoom:
+    """改版前 GameRoom 的欄位（沒有座位、遮罩與計票表）"""
+
+    def __init__(self, room_id: str):
+        self.room_id = room_id
+        self.players = {}
+        self.game_state = GameState.WAITING
+        self.day_count = 0
+        self.night_actions = {}
+        self.witch_potion = {"heal": True, "poison": True}
+        self.current_turn = 0
+        self.delayed_actions = []
+        self.night_action_count = 0
+        self.is_werewolf_action_time = False
+        self.config = GameConfig()
+        self.votes = {}
+        self.event_seq = 0
+        self.on_event = None
+        self._replaying = False
+
+
+def build_baseline_room(r: int) -> BaselineRoom:
+    room = BaselineRoom(f"group_{r:010d}")
+    for p in range(PLAYERS_PER_ROOM):
+        player = BaselinePlayer(f"U{r:016x}{p:016x}", f"Player {p}")
+        player.is_ready = True
+        room.players[player.user_id] = player
+    roles = room.config.deck.deal(PLAYERS_PER_ROOM)
+    for player, code in zip(room.players.values(), roles):
+        player.role = BaselineRole(ROLE_TYPES[code])
+    room.game_state = GameState.NIGHT
+    room.day_count = 1
+    players = list(room.players)
+    for voter in players:
+        room.votes[voter] = players[0]
+        room.players[players[0]].voted_by.append(voter)
+    return room
+
+
+def build_room(r: int) -> GameRoom:
+    room = GameRoom(f"group_{r:010d}")
+    for p in range(PLAYERS_PER_ROOM):
+        room.add_player(f"U{r:016x}{p:016x}", f"Player {p}")
+        room.toggle_ready(f"U{r:016x}{p:016x}")
+    room.start_game()
+    # 進行到第一次投票，讓投票紀錄等狀態也有內容
+    players = list(room.players)
+    for voter in players:
+        room.cast_vote(voter, players[0])
+    return room
+
+
+def measure(count: int, build) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [build(i) for i in range(count)]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+def main():
+    print(f"{ROOMS} 個房間，每房 {PLAYERS_PER_ROOM} 人")
+    for label, build in (("改版前", build_baseline_room), ("目前", build_room)):
+        # 預先建立一個房間，排除模組載入與快取的一次性配置
+        build(-1)
+        per_room = measure(ROOMS, build)
+        print(f"{label}  每個房間: {per_room:,.0f} bytes  每位玩家: {per_room / PLAYERS_PER_ROOM:,.0f} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+亂數效能測試 - 比較 RoomRandom 與 random.Random 的發牌速度與每個房間的狀態大小
+
+用法：python benchmarks/bench_rng.py [--deals 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.game.deck import compile_deck
+from src.utils.config import GameConfig
+from src.utils.rng import RoomRandom
+
+PLAYERS = 12
+ROOMS = 2000
+
+
+def deals_per_second(deck, rng, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        deck.deal(PLAYERS, rng)
+    return count / (time.perf_counter() - start)
+
+
+def batch_per_second(deck, rng: RoomRandom, count: int) -> float:
+    roles = deck.roles_for(PLAYERS)
+    start = time.perf_counter()
+    rng.shuffled_batch(roles, count)
+    return count / (time.perf_counter() - start)
+
+
+def state_bytes(factory) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory(i) for i in range(ROOMS)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / ROOMS
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--deals", type=int, default=100000)
+    args = parser.parse_args()
+
+    deck = compile_deck(GameConfig.DEFAULT_CONFIG)
+    print(f"{PLAYERS} 人發牌 {args.deals:,} 次")
+    print(f"random.Random: {deals_per_second(deck, random.Random(1), args.deals):,.0f} 次/秒")
+    print(f"RoomRandom:    {deals_per_second(deck, RoomRandom(1), args.deals):,.0f} 次/秒")
+    print(f"RoomRandom 批次: {batch_per_second(deck, RoomRandom(1), args.deals):,.0f} 次/秒")
+    print(f"每房亂數狀態 random.Random: {state_bytes(random.Random):,.0f} bytes")
+    print(f"每房亂數狀態 RoomRandom:    {state_bytes(RoomRandom):,.0f} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+私訊路由效能測試 - 比較線性掃描與玩家索引在大量房間時的查找時間
+
+用法：python benchmarks/bench_routing.py
+"""
+import os
+import sys
+import time
+from unittest.mock import Mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.bot.handler import MessageHandler
+from src.game.room import GameRoom
+
+ROOM_COUNTS = [10, 100, 1000, 10000]
+PLAYERS_PER_ROOM = 12
+LOOKUPS = 2000
+
+
+def build_handler(room_count: int) -> MessageHandler:
+    handler = MessageHandler(Mock())
+    for r in range(room_count):
+        room = GameRoom(f"group_{r}")
+        for p in range(PLAYERS_PER_ROOM):
+            room.add_player(f"user_{r}_{p}", f"Player {p}")
+        handler.register_room(room.room_id, room)
+    return handler
+
+
+def scan_lookup(handler: MessageHandler, user_id: str):
+    # 舊做法：逐一掃描所有房間的玩家
+    for room in handler.rooms.values():
+        if user_id in room.players:
+            return room
+    return None
+
+
+def measure(lookup, handler: MessageHandler, room_count: int) -> float:
+    # 查詢最後一個房間的玩家（掃描的最壞情況）
+    user_id = f"user_{room_count - 1}_0"
+    start = time.perf_counter()
+    for _ in range(LOOKUPS):
+        lookup(user_id)
+    return (time.perf_counter() - start) / LOOKUPS * 1e6
+
+
+def main():
+    print(f"{'房間數':>8}{'掃描(µs)':>14}{'索引(µs)':>14}")
+    for count in ROOM_COUNTS:
+        handler = build_handler(count)
+        scan = measure(lambda user_id: scan_lookup(handler, user_id), handler, count)
+        index = measure(handler.find_player_room, handler, count)
+        handler.timer.shutdown()
+        print(f"{count:>8}{scan:>14.2f}{index:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+模擬器效能測試 - 比較逐局操作 GameRoom 與 NumPy 整批模擬的每秒局數
+
+用法：python benchmarks/bench_sim.py [--games 2000] [--batch-games 200000] [--players 9]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.sim.simulator import VILLAGE, simulate
+from src.sim.vector import np, simulate_vectorized
+
+
+def measure(name: str, run, games: int):
+    start = time.perf_counter()
+    results = run()
+    elapsed = time.perf_counter() - start
+    stats = next(iter(results.values()))
+    low, high = stats.interval(VILLAGE)
+    print(f"{name:<8} {games / elapsed:>10,.0f} 局/秒  "
+          f"好人勝率 {stats.win_rate(VILLAGE):.1%} [{low:.1%}, {high:.1%}]")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--batch-games", type=int, default=200000)
+    parser.add_argument("--players", type=int, default=9)
+    parser.add_argument("--policy", default="informed")
+    args = parser.parse_args()
+
+    print(f"{args.players} 人，策略 {args.policy}（單一行程）")
+    measure("GameRoom", lambda: simulate([args.players], args.games, 1, args.policy), args.games)
+    if np is None:
+        print("未安裝 numpy，略過整批模擬")
+        return
+    measure("NumPy", lambda: simulate_vectorized([args.players], args.batch_games, args.policy),
+            args.batch_games)
+
+
+if __name__ == "__main__":
+    main()
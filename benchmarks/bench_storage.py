@@ -0,0 +1,92 @@
+"""
+儲存後端效能測試 - 比較 FileBackend 與 SQLiteBackend 的存檔、讀檔與統計更新吞吐量
+
+用法：python benchmarks/bench_storage.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.game.room import GameRoom
+from src.utils.backend import FileBackend, SQLiteBackend
+from src.utils.storage import GameStorage
+
+ROOMS = 500
+PLAYERS_PER_ROOM = 12
+ROUNDS = 4
+STAT_GAMES = 200
+
+
+def build_rooms():
+    rooms = []
+    for r in range(ROOMS):
+        room = GameRoom(f"group_{r}")
+        for p in range(PLAYERS_PER_ROOM):
+            room.add_player(f"user_{r}_{p}", f"Player {p}")
+        rooms.append(room)
+    return rooms
+
+
+def throughput(count: int, fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return count / (time.perf_counter() - start)
+
+
+def bench(backend, rooms):
+    storage = GameStorage(backend=backend)
+    snapshots = {room.room_id: GameStorage.snapshot(room) for room in rooms}
+
+    def save_each():
+        for _ in range(ROUNDS):
+            for room in rooms:
+                storage.save_game(room)
+
+    def save_batched():
+        # 背景寫入時一次 flush 的情況：整批房間一次寫入
+        for _ in range(ROUNDS):
+            backend.save_rooms(snapshots)
+
+    def load():
+        for _ in range(ROUNDS):
+            for room in rooms:
+                storage.load_game(room.room_id)
+
+    def update_stats():
+        # 每場遊戲結束時一次寫入所有玩家的結果
+        for g in range(STAT_GAMES):
+            backend.record_stats([
+                (f"user_{g % ROOMS}_{p}", p % 3 == 0, "平民", "2024-01-01 00:00:00")
+                for p in range(PLAYERS_PER_ROOM)
+            ])
+
+    return {
+        "save": throughput(ROOMS * ROUNDS, save_each),
+        "save(batch)": throughput(ROOMS * ROUNDS, save_batched),
+        "load": throughput(ROOMS * ROUNDS, load),
+        "stats(game)": throughput(STAT_GAMES, update_stats),
+    }
+
+
+def main():
+    rooms = build_rooms()
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            "file": bench(FileBackend(
+                storage_dir=os.path.join(tmp, "game_data"),
+                stats_file=os.path.join(tmp, "player_stats.json"),
+                log_dir=os.path.join(tmp, "game_logs")
+            ), rooms),
+            "sqlite": bench(SQLiteBackend(os.path.join(tmp, "game.db")), rooms),
+        }
+
+    print(f"{'操作(次/秒)':<14}{'file':>12}{'sqlite':>12}")
+    for name in results["file"]:
+        print(f"{name:<14}{results['file'][name]:>12.0f}{results['sqlite'][name]:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
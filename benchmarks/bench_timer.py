@@ -0,0 +1,81 @@
+"""
+計時器效能測試 - 比較單一排程執行緒與每個計時器一條執行緒的資源使用
+
+用法：python benchmarks/bench_timer.py [--legacy-max 1000]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.utils.timer import GameTimer
+
+COUNTS = [10, 100, 1000, 10000]
+PHASES = ["night", "discussion", "vote", "warning"]
+
+
+def measure_scheduler(count: int):
+    timer = GameTimer()
+    base_threads = threading.active_count()
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(count):
+        timer.schedule(f"room_{i // len(PHASES)}", PHASES[i % len(PHASES)], 3600, lambda: None)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    threads = threading.active_count() - base_threads
+
+    start = time.perf_counter()
+    for i in range(count):
+        timer.cancel(f"room_{i // len(PHASES)}", PHASES[i % len(PHASES)])
+    cancel_elapsed = time.perf_counter() - start
+    timer.shutdown()
+    return threads, current, elapsed, cancel_elapsed
+
+
+def measure_legacy(count: int):
+    base_threads = threading.active_count()
+    tracemalloc.start()
+    start = time.perf_counter()
+    timers = []
+    for _ in range(count):
+        t = threading.Timer(3600, lambda: None)
+        t.start()
+        timers.append(t)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    threads = threading.active_count() - base_threads
+
+    start = time.perf_counter()
+    for t in timers:
+        t.cancel()
+    cancel_elapsed = time.perf_counter() - start
+    for t in timers:
+        t.join()
+    return threads, current, elapsed, cancel_elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--legacy-max", type=int, default=1000,
+                        help="threading.Timer 對照組的最大計時器數量（每個計時器一條執行緒）")
+    args = parser.parse_args()
+
+    print(f"{'實作':<14}{'計時器數':>10}{'新增執行緒':>12}{'Python 記憶體':>16}{'排程(ms)':>12}{'取消(ms)':>12}")
+    for count in COUNTS:
+        rows = [("heap 排程器", measure_scheduler(count))]
+        if count <= args.legacy_max:
+            rows.append(("threading.Timer", measure_legacy(count)))
+        for name, (threads, memory, elapsed, cancel_elapsed) in rows:
+            print(f"{name:<14}{count:>10}{threads:>12}{memory / 1024:>14.1f}KB"
+                  f"{elapsed * 1000:>12.2f}{cancel_elapsed * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Webhook 壓力測試 - 多個群組同時以簽章過的 webhook 進行完整遊戲，量測端對端延遲
+
+Flask app 在本行程以 HTTP 伺服器啟動，LINE API 指向本機的 FakeLineApi（可加入延遲）。
+每個群組依序送出 /join、/ready、/start、夜晚私訊 /skill 與白天 /vote，直到遊戲結束。
+機器人玩家直接讀取房間狀態決定行動對象，因此指令都在請求內同步處理
+（強制 ASYNC_WEBHOOK=0、ROOM_WORKERS=0）。
+
+結果（延遲百分位數、每秒事件數、每局 API 呼叫數、記憶體變化）另存為 JSON，方便比較不同版本。
+
+用法：python benchmarks/bench_webhook.py [--groups 20] [--players 9] [--concurrency 8]
+                                         [--latency 20] [--jitter 10] [--messenger sync]
+                                         [--output webhook_bench.json]
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fake_line_api import FakeLineApi
+
+CHANNEL_SECRET = "bench-channel-secret"
+MAX_DAYS = 30
+
+
+def sign(body: bytes) -> str:
+    digest = hmac.new(CHANNEL_SECRET.encode("utf-8"), body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode("utf-8")
+
+
+def text_event(text: str, user_id: str, group_id: Optional[str] = None) -> Dict[str, Any]:
+    source = {"type": "group", "groupId": group_id, "userId": user_id} if group_id else \
+        {"type": "user", "userId": user_id}
+    return {
+        "type": "message",
+        "mode": "active",
+        "timestamp": int(time.time() * 1000),
+        "source": source,
+        "webhookEventId": uuid.uuid4().hex,
+        "deliveryContext": {"isRedelivery": False},
+        "replyToken": uuid.uuid4().hex,
+        "message": {"type": "text", "id": str(uuid.uuid4().int)[:18], "text": text}
+    }
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class WebhookClient:
+    """每個執行緒一條 keep-alive 連線，記錄每個請求的延遲"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.latencies: List[float] = []
+        self.statuses: Dict[int, int] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def post(self, event: Dict[str, Any]) -> int:
+        body = json.dumps({"destination": "Ubench", "events": [event]}).encode("utf-8")
+        headers = {"Content-Type": "application/json", "X-Line-Signature": sign(body)}
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port)
+        start = time.perf_counter()
+        conn.request("POST", "/callback", body, headers)
+        response = conn.getresponse()
+        response.read()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies.append(elapsed)
+            self.statuses[response.status] = self.statuses.get(response.status, 0) + 1
+        return response.status
+
+
+class GameDriver:
+    """以機器人玩家驅動一個群組的完整遊戲"""
+
+    def __init__(self, handler, client: WebhookClient, index: int, players: int, seed: int):
+        self.handler = handler
+        self.client = client
+        self.group_id = f"C{index:032x}"
+        self.user_ids = [f"U{index:016x}{seat:016x}" for seat in range(players)]
+        self.rng = random.Random(seed + index)
+        self.events = 0
+
+    def group(self, user_id: str, text: str):
+        self.events += 1
+        self.client.post(text_event(text, user_id, self.group_id))
+
+    def private(self, user_id: str, text: str):
+        self.events += 1
+        self.client.post(text_event(text, user_id))
+
+    def room(self):
+        return self.handler.rooms.peek(self.group_id)
+
+    def run(self) -> Dict[str, Any]:
+        from src.game.state import GameState
+
+        for user_id in self.user_ids:
+            self.group(user_id, "/join")
+        for user_id in self.user_ids:
+            self.group(user_id, "/ready")
+        self.group(self.user_ids[0], "/start")
+
+        outcome = "stalled"
+        while True:
+            room = self.room()
+            if room is None:
+                outcome = "completed"
+                break
+            if room.day_count > MAX_DAYS:
+                break
+            progress = self.progress(room)
+            if room.game_state == GameState.NIGHT:
+                self.play_night(room)
+            elif room.game_state == GameState.VOTING:
+                self.play_vote(room)
+            room = self.room()
+            if room is not None and self.progress(room) == progress:
+                break
+        return {"outcome": outcome, "events": self.events}
+
+    @staticmethod
+    def progress(room):
+        # 每一輪夜晚或投票都應推進階段（平票重新投票時候選人會改變）
+        return room.game_state, room.day_count, tuple(room.vote_candidates or ())
+
+    def play_night(self, room):
+        from src.game.role import GUARD, SEER, WEREWOLF, WITCH, WOLF_CODES
+
+        alive = room.get_alive_players()
+        villagers = [p for p in alive if p.role.code not in WOLF_CODES]
+        actors = {code: [p for p in alive if p.role.code == code] for code in (GUARD, WEREWOLF, WITCH, SEER)}
+        for guard in actors[GUARD]:
+            self.private(guard.user_id, f"/skill @{self.rng.choice(alive).user_id}")
+        for wolf in actors[WEREWOLF][:1]:
+            if villagers:
+                self.private(wolf.user_id, f"/skill @{self.rng.choice(villagers).user_id}")
+        killed = room.night_actions.get("werewolf_kill")
+        for witch in actors[WITCH]:
+            if killed and room.witch_potion["heal"]:
+                self.private(witch.user_id, f"/skill @{killed}")
+        for seer in actors[SEER]:
+            others = [p for p in alive if p is not seer]
+            self.private(seer.user_id, f"/skill @{self.rng.choice(others).user_id}")
+
+    def play_vote(self, room):
+        candidates = room.vote_candidates
+        for voter in room.get_alive_players():
+            if self.room() is not room or room.game_state.name != "VOTING":
+                return
+            choices = candidates or [p.user_id for p in room.get_alive_players() if p is not voter]
+            self.group(voter.user_id, f"/vote @{self.rng.choice(choices)}")
+
+
+class MemorySampler:
+    def __init__(self, handler, interval: float):
+        self.handler = handler
+        self.interval = interval
+        self.samples: List[Dict[str, Any]] = []
+        self._stop = threading.Event()
+        self._start = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        self.samples.append({
+            "t": round(time.perf_counter() - self._start, 3),
+            "rss_bytes": rss_bytes(),
+            "resident_rooms": len(self.handler.rooms)
+        })
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._sample()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--groups", type=int, default=20, help="同時進行遊戲的群組數")
+    parser.add_argument("--players", type=int, default=9)
+    parser.add_argument("--concurrency", type=int, default=8, help="送出 webhook 的執行緒數")
+    parser.add_argument("--latency", type=float, default=20, help="假 LINE API 的回應延遲（毫秒）")
+    parser.add_argument("--jitter", type=float, default=10, help="延遲的隨機變動範圍（毫秒）")
+    parser.add_argument("--messenger", choices=("sync", "async"), default="sync")
+    parser.add_argument("--sample-interval", type=float, default=0.5, help="記憶體取樣間隔（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="webhook_bench.json")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+
+    fake = FakeLineApi(args.latency / 1000, args.jitter / 1000).start()
+    # 存檔與紀錄寫到暫存目錄；必須在載入 src.app 之前設定環境變數
+    os.chdir(tempfile.mkdtemp(prefix="werewolf-bench-"))
+    os.environ.update({
+        "LINE_CHANNEL_SECRET": CHANNEL_SECRET,
+        "LINE_CHANNEL_ACCESS_TOKEN": "bench-access-token",
+        "LINE_API_ENDPOINT": fake.endpoint,
+        "LINE_MESSENGER": args.messenger,
+        "ASYNC_WEBHOOK": "0",
+        "ROOM_WORKERS": "0",
+        "SHARD_ADDRESSES": "",
+        "MAX_RESIDENT_ROOMS": str(max(1000, args.groups)),
+    })
+    import logging
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    from src import app as app_module
+
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = WebhookClient("127.0.0.1", server.server_port)
+    handler = app_module.message_handler
+
+    sampler = MemorySampler(handler, args.sample_interval)
+    sampler.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(
+            lambda index: GameDriver(handler, client, index, args.players, args.seed).run(),
+            range(args.groups)
+        ))
+    duration = time.perf_counter() - start
+    sampler.stop()
+    server.shutdown()
+
+    completed = sum(1 for result in results if result["outcome"] == "completed")
+    events = sum(result["events"] for result in results)
+    api = fake.get_stats()
+    total_calls = sum(api["calls"].values())
+    report = {
+        "config": vars(args),
+        "games": {"started": len(results), "completed": completed, "stalled": len(results) - completed},
+        "events": events,
+        "duration_sec": round(duration, 3),
+        "events_per_sec": round(events / duration, 1),
+        "http_status": client.statuses,
+        "latency_ms": {
+            name: round(value * 1000, 2) for name, value in (
+                ("p50", percentile(client.latencies, 50)),
+                ("p95", percentile(client.latencies, 95)),
+                ("p99", percentile(client.latencies, 99)),
+                ("max", max(client.latencies, default=0.0)),
+                ("mean", sum(client.latencies) / len(client.latencies) if client.latencies else 0.0),
+            )
+        },
+        "api_calls": api["calls"],
+        "api_messages": api["messages"],
+        "api_calls_per_game": round(total_calls / len(results), 1) if results else 0,
+        "delivery": handler.messenger.get_call_stats(),
+        "memory": sampler.samples,
+    }
+    fake.close()
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    latency = report["latency_ms"]
+    print(f"{args.groups} 個群組 × {args.players} 人，完成 {completed} 局，{events:,} 個事件，{duration:.2f} 秒")
+    print(f"每秒事件數: {report['events_per_sec']:,}")
+    print(f"webhook 延遲 p50 {latency['p50']} ms / p95 {latency['p95']} ms / p99 {latency['p99']} ms")
+    print(f"每局 API 呼叫數: {report['api_calls_per_game']}  {api['calls']}")
+    peak = max(sample["rss_bytes"] for sample in sampler.samples)
+    print(f"RSS 峰值: {peak / 1024 / 1024:.1f} MB")
+    print(f"結果已寫入 {output}")
+
+
+if __name__ == "__main__":
+    main()
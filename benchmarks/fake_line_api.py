@@ -0,0 +1,110 @@
+"""
+假的 LINE Messaging API - 記錄機器人送出的 API 呼叫，並可加入固定或隨機的回應延遲
+
+將 LINE_API_ENDPOINT 指向 FakeLineApi.endpoint 即可讓 LineBotApi / AsyncMessenger 改送到本機。
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+PROFILE_PATH = re.compile(r"^/v2/bot/(?:group/[^/]+/member|profile)/([^/?]+)")
+
+
+def endpoint_kind(method: str, path: str) -> str:
+    """reply / push / multicast / profile 等呼叫種類"""
+    if PROFILE_PATH.match(path):
+        return "profile"
+    if path.startswith("/v2/bot/message/"):
+        return path.rsplit("/", 1)[-1]
+    return f"{method} {path}"
+
+
+class FakeLineApi:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency  # 秒
+        self.jitter = jitter  # 秒，延遲在 latency ± jitter 之間均勻分布
+        self.calls: Counter = Counter()
+        self.messages: Counter = Counter()  # 各種呼叫送出的訊息則數
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeLineApi":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.messages.clear()
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {"calls": dict(self.calls), "messages": dict(self.messages)}
+
+    def _delay(self):
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+    def _record(self, method: str, path: str, body: bytes):
+        kind = endpoint_kind(method, path)
+        payload = {}
+        if body:
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                pass
+        with self._lock:
+            self.calls[kind] += 1
+            self.messages[kind] += len(payload.get("messages", []))
+
+    def _make_handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, data: Dict):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                api._record("GET", self.path, b"")
+                api._delay()
+                match = PROFILE_PATH.match(self.path)
+                if match:
+                    user_id = match.group(1)
+                    self._reply({"userId": user_id, "displayName": f"Player {user_id[-4:]}"})
+                else:
+                    self._reply({})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                api._record("POST", self.path, self.rfile.read(length))
+                api._delay()
+                self._reply({})
+
+        return Handler
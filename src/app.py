@@ -1,23 +1,97 @@
-from flask import Flask, request, abort
-from linebot import LineBotApi, WebhookHandler
+from flask import Flask, Response, request, abort, jsonify
+from linebot import WebhookHandler
 from linebot.exceptions import InvalidSignatureError
 from linebot.models import MessageEvent, TextMessage
+from werkzeug.exceptions import HTTPException
+import atexit
+import hmac
 import os
-from src.bot.handler import MessageHandler
+import time
+from src.bot.dispatcher import EventDispatcher, event_group_key
+from src.bot.factory import create_message_handler
+from src.bot.sharding import ShardRouter, parse_addresses
 from src.utils.config import Config
+from src.utils.metrics import metrics
+from src.utils.profiler import profiler
 
 app = Flask(__name__)
 
 config = Config()
-line_bot_api = LineBotApi(config.CHANNEL_ACCESS_TOKEN)
 handler = WebhookHandler(config.CHANNEL_SECRET)
-message_handler = MessageHandler(line_bot_api)
+metrics.enabled = config.METRICS_ENABLED
+profiler.max_duration = config.PROFILER_MAX_SECONDS
+
+# 設定分片位址時，房間由各分片行程持有，本行程只負責轉送事件
+router = None
+message_handler = None
+if config.SHARD_ADDRESSES:
+    router = ShardRouter(parse_addresses(config.SHARD_ADDRESSES), config.SHARD_AUTHKEY)
+    router.start_health_checks(config.SHARD_HEALTH_INTERVAL)
+    atexit.register(router.close)
+else:
+    message_handler = create_message_handler(config)
+
+def dispatch_event(event) -> bool:
+    if isinstance(event, MessageEvent) and isinstance(event.message, TextMessage):
+        if router:
+            return router.route(event)
+        message_handler.handle_text_message(event)
+    return True
+
+dispatcher = None
+if config.ASYNC_WEBHOOK and not router:
+    dispatcher = EventDispatcher(
+        dispatch_event,
+        event_group_key,
+        workers=config.WEBHOOK_WORKERS,
+        max_queue=config.WEBHOOK_QUEUE_SIZE
+    )
+
+# 讀取 /metrics 時才計算的量表（處理器的量表在建立時註冊）
+metrics.gauge("werewolf_queued_events", "背景佇列中等待處理的事件數",
+              lambda: dispatcher.queue_depth() if dispatcher else 0)
 
 @app.route("/callback", methods=['POST'])
 def callback():
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = handle_callback()
+        status = 200
+        return response
+    except HTTPException as e:
+        status = e.code
+        raise
+    finally:
+        metrics.observe("werewolf_webhook_seconds", time.perf_counter() - start)
+        metrics.inc("werewolf_webhook_requests_total", status=str(status))
+
+def handle_callback():
     signature = request.headers['X-Line-Signature']
     body = request.get_data(as_text=True)
 
+    if router:
+        # 轉送給各房間所屬的分片，分片無法連線時回應 503 讓 LINE 重送；
+        # 重送時已轉送過的事件由分片依 webhookEventId 略過
+        try:
+            events = handler.parser.parse(body, signature)
+        except InvalidSignatureError:
+            abort(400)
+        if not all([dispatch_event(event) for event in events]):
+            abort(503)
+        return 'OK'
+
+    if dispatcher:
+        # 只驗證簽章並排入佇列，立即回應 LINE；佇列放不下整批事件時一個都不排入，
+        # 回應 503 讓 LINE 重送整批
+        try:
+            events = handler.parser.parse(body, signature)
+        except InvalidSignatureError:
+            abort(400)
+        if not dispatcher.submit_all(events):
+            abort(503)
+        return 'OK'
+
     try:
         handler.handle(body, signature)
     except InvalidSignatureError:
@@ -25,9 +99,77 @@ def callback():
 
     return 'OK'
 
+@app.route("/queue", methods=['GET'])
+def queue_stats():
+    if not dispatcher:
+        return jsonify({"enabled": False})
+    return jsonify(dict(enabled=True, **dispatcher.get_stats()))
+
+@app.route("/delivery", methods=['GET'])
+def delivery_stats():
+    # 各遊戲階段與每局實際花費的推播 / multicast 呼叫數；?room=<群組 ID> 查看該房間目前這一局
+    if router:
+        return jsonify({address: stats.get("delivery") for address, stats in router.get_stats().items()})
+    messenger = message_handler.messenger
+    room_id = request.args.get('room')
+    if room_id:
+        return jsonify(messenger.get_game_stats(room_id))
+    return jsonify(dict(phases=messenger.get_call_stats(), **messenger.get_game_stats()))
+
+@app.route("/metrics", methods=['GET'])
+def metrics_endpoint():
+    # Prometheus 文字格式；分片模式下一併輸出各分片的指標，以 shard 標籤區分
+    remote = router.collect_metrics() if router else None
+    return Response(metrics.render(remote), mimetype="text/plain; version=0.0.4")
+
+def require_profiler_token():
+    # 未設定權杖時視為沒有這些端點
+    if not config.PROFILER_TOKEN:
+        abort(404)
+    supplied = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(supplied.encode('utf-8'), f"Bearer {config.PROFILER_TOKEN}".encode('utf-8')):
+        abort(403)
+
+@app.route("/profiler/start", methods=['POST'])
+def profiler_start():
+    require_profiler_token()
+    started = profiler.start(
+        interval=request.args.get('interval', type=float),
+        duration=request.args.get('duration', type=float)
+    )
+    return jsonify(dict(started=started, **profiler.get_stats())), 200 if started else 409
+
+@app.route("/profiler/stop", methods=['POST'])
+def profiler_stop():
+    require_profiler_token()
+    profiler.stop()
+    return jsonify(profiler.get_stats())
+
+@app.route("/profiler/status", methods=['GET'])
+def profiler_status():
+    require_profiler_token()
+    return jsonify(profiler.get_stats())
+
+@app.route("/profiler", methods=['GET'])
+def profiler_dump():
+    # collapsed stack 格式，可交給 flamegraph.pl 或 speedscope 繪製火焰圖
+    require_profiler_token()
+    text = profiler.collapsed(
+        command=request.args.get('command'),
+        room_id=request.args.get('room'),
+        by_room=request.args.get('by_room', '1') != '0'
+    )
+    return Response(text, mimetype="text/plain")
+
+@app.route("/shards", methods=['GET'])
+def shard_stats():
+    if not router:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, "shards": router.get_stats()})
+
 @handler.add(MessageEvent, message=TextMessage)
 def handle_message(event):
-    message_handler.handle_text_message(event)
+    dispatch_event(event)
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
@@ -0,0 +1,65 @@
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from ..game.room import GameRoom
+from ..utils.timer import GameTimer
+
+DIGEST_TIMER = "vote_digest"
+
+
+class VoteDigest:
+    """投票彙整
+
+    將同一房間短時間內的投票暫存起來，在防抖視窗（window）結束、
+    或距離第一張未公告的票超過最大延遲（max_latency）時，
+    只發送一則彙整後的票數統計，取代每一票都廣播一次。
+    到期時以 get_room(room_id) 取得目前的房間，房間被重新讀取後仍以最新的票數彙整。
+    """
+
+    def __init__(self, timer: GameTimer, schedule: Callable[[str, Callable], None],
+                 flush_callback: Callable[[GameRoom, List[Tuple[str, str]]], None],
+                 get_room: Callable[[str], Optional[GameRoom]] = None):
+        self.timer = timer
+        # schedule(room_id, fn)：將到期的彙整送回房間的執行通道
+        self.schedule = schedule
+        self.flush_callback = flush_callback
+        self.get_room = get_room
+        self._pending: Dict[str, List[Tuple[str, str]]] = {}
+        self._first_vote_at: Dict[str, float] = {}
+
+    def add(self, room: GameRoom, voter_id: str, target_id: str, window: float, max_latency: float):
+        room_id = room.room_id
+        now = time.monotonic()
+        if room_id not in self._pending:
+            self._pending[room_id] = []
+            self._first_vote_at[room_id] = now
+        self._pending[room_id].append((voter_id, target_id))
+
+        # 每來一票重新計時，但不超過第一張票起算的最大延遲
+        deadline = min(now + window, self._first_vote_at[room_id] + max_latency)
+        self.timer.schedule(
+            room_id, DIGEST_TIMER, max(0, deadline - now),
+            lambda: self.schedule(room_id, lambda: self._flush_expired(room_id, room))
+        )
+
+    def _flush_expired(self, room_id: str, room: GameRoom):
+        current = self.get_room(room_id) if self.get_room else room
+        if current is None:
+            self.discard(room_id)
+        else:
+            self.flush(current)
+
+    def has_pending(self, room_id: str) -> bool:
+        return room_id in self._pending
+
+    def flush(self, room: GameRoom):
+        room_id = room.room_id
+        self.timer.cancel(room_id, DIGEST_TIMER)
+        votes = self._pending.pop(room_id, None)
+        self._first_vote_at.pop(room_id, None)
+        if votes:
+            self.flush_callback(room, votes)
+
+    def discard(self, room_id: str):
+        self.timer.cancel(room_id, DIGEST_TIMER)
+        self._pending.pop(room_id, None)
+        self._first_vote_at.pop(room_id, None)
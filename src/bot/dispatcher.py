@@ -0,0 +1,155 @@
+import queue
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+
+
+class EventDispatcher:
+    """背景事件派送器
+
+    Webhook 只負責驗證簽章並把事件放入佇列，實際處理交給背景工作執行緒。
+    每個工作執行緒擁有自己的有界佇列，同一個 key（群組 ID）的事件
+    永遠落在同一條佇列上，因此同群組的事件會依序處理。
+    """
+
+    def __init__(self, handle_event: Callable[[Any], None],
+                 key_func: Callable[[Any], str],
+                 workers: int = 4, max_queue: int = 1000,
+                 enqueue_timeout: float = 0.5):
+        self.handle_event = handle_event
+        self.key_func = key_func
+        self.enqueue_timeout = enqueue_timeout
+        self.queues: List[queue.Queue] = [
+            queue.Queue(maxsize=max(1, max_queue // max(1, workers)))
+            for _ in range(max(1, workers))
+        ]
+        self._stats_lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._processed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._latency_last = 0.0
+        self._running = True
+        self._threads = []
+        for index, lane in enumerate(self.queues):
+            thread = threading.Thread(
+                target=self._worker, args=(lane,),
+                name=f"webhook-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _lane_index(self, key: str) -> int:
+        # 使用穩定的雜湊，避免 hash() 隨程序變動
+        return zlib.crc32(key.encode('utf-8')) % len(self.queues)
+
+    def _lane_for(self, key: str) -> queue.Queue:
+        return self.queues[self._lane_index(key)]
+
+    def submit(self, event: Any) -> bool:
+        """將事件放入對應佇列，佇列已滿時最多等待 enqueue_timeout 秒，仍滿則回傳 False"""
+        key = self.key_func(event) or ""
+        try:
+            with self._submit_lock:
+                self._lane_for(key).put((time.monotonic(), event), timeout=self.enqueue_timeout)
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self._rejected += 1
+            return False
+
+    def submit_all(self, events: List[Any]) -> bool:
+        """整批事件全部排入或全部不排入，不等待
+
+        webhook 回應 503 時 LINE 會重送整批事件，只排入一部分會讓這些事件被處理兩次，
+        因此先確認每條佇列都放得下這批事件才排入。
+        """
+        batches: Dict[int, List[Any]] = {}
+        for event in events:
+            batches.setdefault(self._lane_index(self.key_func(event) or ""), []).append(event)
+        with self._submit_lock:
+            # 只有持有此鎖時才會放入事件，工作執行緒只會取出，檢查後空間不會變少
+            if any(self.queues[index].qsize() + len(batch) > self.queues[index].maxsize
+                   for index, batch in batches.items()):
+                with self._stats_lock:
+                    self._rejected += len(events)
+                return False
+            enqueued_at = time.monotonic()
+            for index, batch in batches.items():
+                for event in batch:
+                    self.queues[index].put_nowait((enqueued_at, event))
+        return True
+
+    def _worker(self, lane: queue.Queue):
+        while True:
+            item = lane.get()
+            if item is None:
+                lane.task_done()
+                break
+
+            enqueued_at, event = item
+            failed = False
+            try:
+                self.handle_event(event)
+            except Exception as e:
+                failed = True
+                print(f"處理事件失敗: {str(e)}")
+            finally:
+                latency = time.monotonic() - enqueued_at
+                with self._stats_lock:
+                    self._processed += 1
+                    if failed:
+                        self._failed += 1
+                    self._latency_total += latency
+                    self._latency_last = latency
+                    self._latency_max = max(self._latency_max, latency)
+                lane.task_done()
+
+    def queue_depth(self) -> int:
+        return sum(lane.qsize() for lane in self.queues)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得佇列深度與事件處理延遲（秒，含排隊時間）"""
+        with self._stats_lock:
+            processed = self._processed
+            return {
+                "workers": len(self.queues),
+                "queue_depth": self.queue_depth(),
+                "lane_depths": [lane.qsize() for lane in self.queues],
+                "processed": processed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "latency_avg": self._latency_total / processed if processed else 0.0,
+                "latency_max": self._latency_max,
+                "latency_last": self._latency_last,
+            }
+
+    def join(self):
+        """等待所有已排入的事件處理完畢"""
+        for lane in self.queues:
+            lane.join()
+
+    def shutdown(self, wait: bool = True):
+        if not self._running:
+            return
+        self._running = False
+        for lane in self.queues:
+            lane.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+def event_group_key(event: Any) -> Optional[str]:
+    """以群組（或聊天室、私訊用戶）作為事件排序的 key"""
+    source = getattr(event, 'source', None)
+    if source is None:
+        return None
+    for attr in ('group_id', 'room_id', 'user_id'):
+        value = getattr(source, attr, None)
+        if value:
+            return value
+    return None
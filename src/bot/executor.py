@@ -0,0 +1,146 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+
+class RoomExecutor:
+    """以房間為單位的序列執行器（actor / mailbox）
+
+    同一個 room_id 的所有工作（群組指令、私訊 /skill、計時器到期）
+    都會依序在該房間的執行通道上執行；不同房間則由工作執行緒池平行處理。
+
+    workers 為 0 時使用同步模式：呼叫端執行緒直接執行工作，
+    但仍以每個房間各自的鎖保證同房間的工作不會交錯；鎖在沒有執行緒使用時即移除，
+    已結束或移出記憶體的房間不會留下鎖。執行中的工作提交給其他房間的工作
+    （例如註冊房間時觸發另一個房間移出記憶體）會排到目前工作結束、放開鎖之後才執行，
+    不會在持有一個房間的鎖時等待另一個房間的鎖。
+    """
+
+    def __init__(self, workers: int = 0, batch_size: int = 32):
+        self.workers = workers
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._room_locks: Dict[str, List] = {}  # room_id -> [鎖, 使用中的執行緒數]
+        self._mailboxes: Dict[str, Deque[Tuple[Future, Callable, tuple, dict]]] = {}
+        self._scheduled: Set[str] = set()
+        self._ready: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._threads = []
+        for index in range(workers):
+            thread = threading.Thread(
+                target=self._worker, name=f"room-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def current_room(self) -> Optional[str]:
+        """目前執行緒正在處理的房間"""
+        return getattr(self._local, 'room_id', None)
+
+    def submit(self, room_id: str, fn: Callable, *args, **kwargs) -> Future:
+        future = Future()
+
+        # 已在該房間的執行通道上（例如處理指令時觸發的後續動作），直接執行
+        current = self.current_room()
+        if current == room_id or not self.workers:
+            if current is not None and current != room_id:
+                self._deferred().append((room_id, future, fn, args, kwargs))
+            else:
+                self._run_inline(room_id, future, fn, args, kwargs)
+            return future
+
+        with self._lock:
+            mailbox = self._mailboxes.setdefault(room_id, deque())
+            mailbox.append((future, fn, args, kwargs))
+            if room_id not in self._scheduled:
+                self._scheduled.add(room_id)
+                self._ready.put(room_id)
+        return future
+
+    def _acquire_room_lock(self, room_id: str) -> threading.RLock:
+        with self._lock:
+            entry = self._room_locks.get(room_id)
+            if entry is None:
+                entry = self._room_locks[room_id] = [threading.RLock(), 0]
+            entry[1] += 1
+        entry[0].acquire()
+        return entry[0]
+
+    def _release_room_lock(self, room_id: str):
+        with self._lock:
+            entry = self._room_locks[room_id]
+            entry[0].release()
+            entry[1] -= 1
+            if not entry[1]:
+                del self._room_locks[room_id]
+
+    def _deferred(self) -> Deque[Tuple[str, Future, Callable, tuple, dict]]:
+        """同步模式下等待目前工作結束後才執行的其他房間工作（每個執行緒各自一份）"""
+        deferred = getattr(self._local, 'deferred', None)
+        if deferred is None:
+            deferred = self._local.deferred = deque()
+        return deferred
+
+    def _run_inline(self, room_id: str, future: Future, fn: Callable, args: tuple, kwargs: dict):
+        self._acquire_room_lock(room_id)
+        previous = self.current_room()
+        self._local.room_id = room_id
+        try:
+            self._run(future, fn, args, kwargs)
+        finally:
+            self._local.room_id = previous
+            self._release_room_lock(room_id)
+        if previous is None:
+            deferred = self._deferred()
+            while deferred:
+                self._run_inline(*deferred.popleft())
+
+    @staticmethod
+    def _run(future: Future, fn: Callable, args: tuple, kwargs: dict):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            print(f"房間工作執行失敗: {str(e)}")
+            future.set_exception(e)
+
+    def _worker(self):
+        while True:
+            room_id = self._ready.get()
+            if room_id is None:
+                break
+
+            self._local.room_id = room_id
+            try:
+                for _ in range(self.batch_size):
+                    with self._lock:
+                        mailbox = self._mailboxes.get(room_id)
+                        if not mailbox:
+                            break
+                        future, fn, args, kwargs = mailbox.popleft()
+                    self._run(future, fn, args, kwargs)
+            finally:
+                self._local.room_id = None
+                with self._lock:
+                    if self._mailboxes.get(room_id):
+                        # 還有工作，重新排隊讓其他房間也有機會執行
+                        self._ready.put(room_id)
+                    else:
+                        self._mailboxes.pop(room_id, None)
+                        self._scheduled.discard(room_id)
+
+    def pending(self) -> int:
+        """尚未執行的工作數量"""
+        with self._lock:
+            return sum(len(mailbox) for mailbox in self._mailboxes.values())
+
+    def shutdown(self, wait: bool = True):
+        for _ in self._threads:
+            self._ready.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads = []
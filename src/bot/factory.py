@@ -0,0 +1,57 @@
+import atexit
+from linebot import LineBotApi
+from .executor import RoomExecutor
+from .handler import MessageHandler
+from .messenger import create_messenger
+from ..utils.backend import create_backend
+from ..utils.config import Config
+from ..utils.journal import RoomJournal
+from ..utils.logger import GameLogger
+from ..utils.metrics import InstrumentedApi, metrics
+from ..utils.storage import GameStorage
+
+
+def create_message_handler(config: Config) -> MessageHandler:
+    """依設定建立訊息處理器與推播、儲存等元件，並註冊結束時的清理"""
+    # 每個 LINE API 呼叫都記錄延遲
+    line_bot_api = InstrumentedApi(
+        LineBotApi(config.CHANNEL_ACCESS_TOKEN, endpoint=config.LINE_API_ENDPOINT), metrics
+    )
+    messenger = create_messenger(
+        line_bot_api,
+        mode=config.LINE_MESSENGER,
+        access_token=config.CHANNEL_ACCESS_TOKEN,
+        endpoint=config.LINE_API_ENDPOINT,
+        pool_size=config.LINE_HTTP_POOL_SIZE
+    )
+    atexit.register(messenger.close)
+    backend = create_backend(config.STORAGE_BACKEND, config.SQLITE_PATH, config.LOG_MAX_BYTES,
+                             config.REDIS_URL, config.REDIS_PREFIX)
+    atexit.register(backend.close)
+    journal = None
+    if config.EVENT_JOURNAL:
+        journal = RoomJournal(config.JOURNAL_DIR, fsync=config.JOURNAL_FSYNC)
+        atexit.register(journal.close)
+    message_handler = MessageHandler(
+        line_bot_api,
+        RoomExecutor(config.ROOM_WORKERS),
+        messenger,
+        max_resident_rooms=config.MAX_RESIDENT_ROOMS,
+        room_idle_ttl=config.ROOM_IDLE_TTL,
+        storage=GameStorage(flush_interval=config.STORAGE_FLUSH_INTERVAL, backend=backend, journal=journal),
+        backend=backend,
+        logger=GameLogger(backend=backend, flush_interval=config.LOG_FLUSH_INTERVAL)
+    )
+    atexit.register(message_handler.storage.close)
+    atexit.register(message_handler.logger.close)
+    register_gauges(message_handler)
+    return message_handler
+
+
+def register_gauges(message_handler: MessageHandler):
+    """讀取 /metrics 時才計算的量表；分片行程也會註冊，由路由端合併輸出"""
+    metrics.gauge("werewolf_resident_rooms", "常駐記憶體的房間數", lambda: len(message_handler.rooms))
+    metrics.gauge("werewolf_active_timers", "進行中的計時器數", message_handler.timer.active_count)
+    metrics.gauge("werewolf_spectators", "觀戰者人數",
+                  lambda: sum(len(users) for users in message_handler.spectators.values()))
+    metrics.gauge("werewolf_pending_saves", "等待寫入的房間存檔數", message_handler.storage.pending_count)
@@ -1,26 +1,68 @@
 from linebot import LineBotApi
 from linebot.models import MessageEvent, TextMessage, TextSendMessage
-from typing import Dict, List
-import threading
+from typing import Callable, Dict, List, Optional
+from ..game.deck import DeckError, parse_deck_text
 from ..game.room import GameRoom
 from ..game.state import GameState
 from ..game.errors import GameError
-from ..game.role import RoleType
+from ..game.role import WOLF_CODES, RoleType
 from .message import GameMessage
+from .executor import RoomExecutor
+from .messenger import SyncMessenger
+from .digest import VoteDigest
+from .registry import RoomRegistry
+from ..utils.backend import StorageBackend
 from ..utils.storage import GameStorage
 from ..utils.logger import GameLogger
+from ..utils.metrics import metrics
+from ..utils.profiler import profiler
 from ..utils.statistics import PlayerStats
 from ..utils.timer import GameTimer
 
 class MessageHandler:
-    def __init__(self, line_bot_api: LineBotApi):
+    # 不需要遊戲房間的指令，不會觸發讀取磁碟
+    ROOMLESS_COMMANDS = {'/help', '/tip', '/stats'}
+    # 會改變遊戲狀態、需要保存的指令
+    STATEFUL_COMMANDS = {'/join', '/ready', '/start', '/skill', '/vote', '/exit'}
+    RESIDENCY_SWEEP = ("__residency__", "sweep")
+    # 指標依指令分類，其他輸入歸為 other，避免標籤數量無限增加
+    COMMANDS = ROOMLESS_COMMANDS | STATEFUL_COMMANDS | {
+        '/spectate', '/history', '/time', '/status', '/config'
+    }
+
+    def __init__(self, line_bot_api: LineBotApi, executor: RoomExecutor = None, messenger=None,
+                 max_resident_rooms: int = 1000, room_idle_ttl: float = 1800,
+                 storage: GameStorage = None, backend: StorageBackend = None,
+                 logger: GameLogger = None):
         self.line_bot_api = line_bot_api
-        self.rooms: Dict[str, GameRoom] = {}
-        self.storage = GameStorage()
-        self.logger = GameLogger()
+        # 推播後端：預設同步逐一發送，可替換為並行的 AsyncMessenger
+        self.messenger = messenger or SyncMessenger(line_bot_api)
+        # 每個房間的指令、私訊與計時器都在同一條序列通道上執行
+        self.executor = executor or RoomExecutor()
+        # 常駐記憶體的房間，超量或閒置時寫回磁碟並移出
+        self.rooms = RoomRegistry(
+            max_resident_rooms, room_idle_ttl,
+            on_evict=self._request_room_eviction,
+            can_evict=self._can_evict_room
+        )
+        self._sweep_scheduled = False
+        self.player_rooms: Dict[str, str] = {}  # user_id -> room_id，私訊路由用
+        # 玩家所在房間改變時的回呼 (user_id, room_id 或 None)，分片時用來同步路由端的索引
+        self.on_membership: Callable[[str, Optional[str]], None] = None
+        # 存檔、遊戲紀錄與玩家統計共用同一個儲存後端
+        self.storage = storage or GameStorage(backend=backend)
+        self.logger = logger or GameLogger(backend=backend)
         self.spectators: Dict[str, List[str]] = {}  # group_id -> List[user_id]
-        self.player_stats = PlayerStats()
+        self.player_stats = PlayerStats(backend=backend)
         self.timer = GameTimer()
+        # 多個 worker 共用房間狀態時，計時器到期後通知其他 worker 重新讀取房間
+        self.timer.on_expire = self._publish_timer
+        self.storage.backend.subscribe_timers(self._on_remote_timer)
+        # 其他 worker 寫入房間後捨棄本地的舊房間；自己寫入時版本衝突則重新讀取
+        self.storage.backend.subscribe_saves(self._on_remote_save)
+        self.storage.on_conflict = self._on_save_conflict
+        self.vote_digest = VoteDigest(self.timer, self.executor.submit, self.broadcast_vote_digest,
+                                      get_room=self._resident_room)
 
     def handle_text_message(self, event: MessageEvent):
         # 區分群組訊息和私聊訊息
@@ -41,16 +83,32 @@ class MessageHandler:
         message = event.message.text
 
         if message.startswith('/'):
-            self.handle_command(message, group_id, user_id, event.reply_token)
+            self.executor.submit(
+                group_id, self.handle_command,
+                message, group_id, user_id, event.reply_token
+            )
 
     def handle_command(self, message: str, group_id: str, user_id: str, reply_token: str):
-        # 嘗試讀取已存在的遊戲
-        if group_id not in self.rooms:
-            loaded_room = self.storage.load_game(group_id)
-            if loaded_room:
-                self.rooms[group_id] = loaded_room
-
         command = message.lower().split()[0]
+        try:
+            label = command if command in self.COMMANDS else "other"
+            with profiler.tag(group_id, label), metrics.time("werewolf_command_seconds", command=label):
+                self.run_command(command, message, group_id, user_id, reply_token)
+        finally:
+            # 在每次重要操作後標記遊戲狀態，由存檔層合併寫入
+            if command in self.STATEFUL_COMMANDS:
+                self.save_room(group_id)
+
+    def save_room(self, group_id: str):
+        room = self.rooms.peek(group_id)
+        if room:
+            self.storage.mark_dirty(room)
+
+    def run_command(self, command: str, message: str, group_id: str, user_id: str, reply_token: str):
+
+        # 只有需要房間的指令才嘗試讀取已保存的遊戲
+        if command not in self.ROOMLESS_COMMANDS and group_id not in self.rooms:
+            self.load_room(group_id)
 
         if command == '/help':
             self.line_bot_api.reply_message(
@@ -61,12 +119,13 @@ class MessageHandler:
 
         if command == '/join':
             if group_id not in self.rooms:
-                self.rooms[group_id] = GameRoom(group_id)
+                self.register_room(group_id, GameRoom(group_id))
 
             room = self.rooms[group_id]
             user_profile = self.line_bot_api.get_group_member_profile(group_id, user_id)
             
             if room.add_player(user_id, user_profile.display_name):
+                self._index_player(user_id, room.room_id)
                 self.line_bot_api.reply_message(
                     reply_token,
                     GameMessage.get_join_success(user_profile.display_name)
@@ -76,8 +135,7 @@ class MessageHandler:
         if command == '/ready':
             if group_id in self.rooms:
                 room = self.rooms[group_id]
-                if user_id in room.players:
-                    room.players[user_id].toggle_ready()
+                if room.toggle_ready(user_id):
                     self.update_game_status(room, reply_token)
             return
 
@@ -120,11 +178,12 @@ class MessageHandler:
 
         if command == '/history':
             if group_id in self.rooms:
-                history = self.logger.get_game_history(group_id)
+                # 只顯示最近10條記錄
+                history = self.logger.get_game_history(group_id, limit=10)
                 if history:
                     self.line_bot_api.reply_message(
                         reply_token,
-                        TextMessage(text="".join(history[-10:]))  # 只顯示最近10條記錄
+                        TextMessage(text="".join(history))
                     )
             return
 
@@ -161,6 +220,7 @@ class MessageHandler:
                     if room.game_state == GameState.WAITING:
                         # 遊戲未開始，允許離開
                         if room.remove_player(user_id):
+                            self._unindex_player(user_id, room.room_id)
                             user_profile = self.line_bot_api.get_group_member_profile(group_id, user_id)
                             self.line_bot_api.reply_message(
                                 reply_token,
@@ -188,15 +248,194 @@ class MessageHandler:
         if command == '/config':
             if group_id in self.rooms:
                 room = self.rooms[group_id]
+                args = message.split()[1:]
+                if args and args[0].lower() == 'deck':
+                    self.handle_deck_config(room, args[1:], reply_token)
+                    return
                 self.line_bot_api.reply_message(
                     reply_token,
                     GameMessage.get_config_status(room.config.config)
                 )
             return
 
-        # 在每次重要操作後保存遊戲狀態
-        if group_id in self.rooms:
-            self.storage.save_game(self.rooms[group_id])
+    def handle_deck_config(self, room: GameRoom, args: List[str], reply_token: str):
+        """/config deck <配置> 設定群組的角色配置，reset 恢復預設，未帶參數時顯示目前的配置"""
+        if args:
+            if room.game_state != GameState.WAITING:
+                self.line_bot_api.reply_message(reply_token, GameMessage.get_error_message("wrong_phase"))
+                return
+            try:
+                spec = None if [arg.lower() for arg in args] == ['reset'] else \
+                    parse_deck_text(" ".join(args), room.config.config)
+                room.change_deck(spec)
+            except DeckError as e:
+                self.line_bot_api.reply_message(reply_token, GameMessage.get_deck_error(str(e)))
+                return
+            self.save_room(room.room_id)
+        self.line_bot_api.reply_message(reply_token, GameMessage.get_deck_status(room.active_deck))
+
+    def register_room(self, group_id: str, room: GameRoom):
+        """加入房間並建立玩家索引"""
+        self.rooms[group_id] = room
+        self.storage.attach(room)
+        for user_id in room.players:
+            self._index_player(user_id, room.room_id)
+        if not self._sweep_scheduled:
+            self._sweep_scheduled = True
+            self._schedule_residency_sweep()
+
+    def load_room(self, group_id: str) -> GameRoom:
+        """從磁碟讀取已保存的遊戲；沒有保存紀錄的群組不會讀取磁碟"""
+        if not self.storage.has_game(group_id):
+            return None
+        room = self.storage.load_game(group_id)
+        if room:
+            self.register_room(group_id, room)
+        return room
+
+    def _can_evict_room(self, room_id: str, room: GameRoom) -> bool:
+        # 計時中的房間由計時器回呼持有，不移出記憶體
+        if self.timer.has_timers(room_id):
+            return False
+        # 進行中的遊戲不因 LRU 超量移出，只在閒置超過 TTL 後才寫回；
+        # 快照包含夜晚行動、投票與延遲動作，讀回後可從同一個階段繼續
+        if room.game_state in (GameState.WAITING, GameState.ENDED):
+            return True
+        return self.rooms.idle_seconds(room_id) >= self.rooms.idle_ttl
+
+    def _request_room_eviction(self, room_id: str):
+        self.executor.submit(room_id, self._evict_room, room_id)
+
+    def _evict_room(self, room_id: str):
+        room = self.rooms.peek(room_id)
+        if room is None or not self._can_evict_room(room_id, room):
+            return
+        # 寫回磁碟後移出記憶體，玩家索引保留以便之後延遲載入
+        self.storage.save_game(room)
+        self.rooms.pop(room_id, None)
+        self.logger.discard(room_id)
+
+    def _schedule_residency_sweep(self):
+        def sweep():
+            self.rooms.evict_idle()
+            self._schedule_residency_sweep()
+
+        self.timer.schedule(*self.RESIDENCY_SWEEP, min(60, self.rooms.idle_ttl), sweep)
+
+    def unregister_room(self, group_id: str):
+        room = self.rooms.pop(group_id, None)
+        if room:
+            for user_id in room.players:
+                self._unindex_player(user_id, room.room_id)
+
+    def _index_player(self, user_id: str, room_id: str):
+        self.player_rooms[user_id] = room_id
+        if self.on_membership:
+            self.on_membership(user_id, room_id)
+
+    def _unindex_player(self, user_id: str, room_id: str):
+        # 玩家可能已加入其他群組的遊戲，只移除指向此房間的索引
+        if self.player_rooms.get(user_id) == room_id:
+            del self.player_rooms[user_id]
+            if self.on_membership:
+                self.on_membership(user_id, None)
+
+    def release_room(self, room_id: str) -> bool:
+        """將房間交給其他分片：停止計時、寫回存檔並移出記憶體"""
+        room = self.rooms.peek(room_id)
+        if room is None:
+            return False
+        self.vote_digest.flush(room)
+        self.timer.cancel_timer(room_id)
+        self.storage.save_game(room)
+        self.logger.flush()
+        self.logger.discard(room_id)
+        self.rooms.pop(room_id, None)
+        for user_id in room.players:
+            if self.player_rooms.get(user_id) == room_id:
+                del self.player_rooms[user_id]
+        return True
+
+    def adopt_room(self, room_id: str) -> GameRoom:
+        """接手其他分片交出的房間，投票中的房間重新開始計時"""
+        self.storage.refresh(room_id)
+        room = self.rooms.get(room_id) or self.load_room(room_id)
+        if room and room.game_state == GameState.VOTING:
+            self._arm_voting_timers(room, room_id)
+        return room
+
+    def _publish_timer(self, room_id: str, name: str):
+        if room_id != self.RESIDENCY_SWEEP[0]:
+            self.storage.backend.publish_timer(room_id, name)
+
+    def _on_remote_timer(self, room_id: str, name: str):
+        self.executor.submit(room_id, self.drop_stale_room, room_id)
+
+    def _on_remote_save(self, room_id: str):
+        self.storage.invalidate(room_id)
+        self.executor.submit(room_id, self.drop_stale_room, room_id)
+
+    def _on_save_conflict(self, room_ids: List[str]):
+        for room_id in room_ids:
+            self.executor.submit(room_id, self.reload_room, room_id)
+
+    def reload_room(self, room_id: str) -> GameRoom:
+        """存檔版本衝突：本地房間已過期，捨棄後重新讀取，剛才的指令不生效
+
+        計時器保留原本的到期時間，到期時會取得重新讀取的房間。
+        """
+        if self.rooms.peek(room_id) is None:
+            return None
+        self.vote_digest.discard(room_id)
+        self.logger.discard(room_id)
+        self.unregister_room(room_id)
+        self.storage.refresh(room_id)
+        room = self.load_room(room_id)
+        self.messenger.push_message(room_id, GameMessage.get_error_message("state_conflict"))
+        return room
+
+    def drop_stale_room(self, room_id: str) -> bool:
+        """其他 worker 已推進房間狀態，捨棄記憶體中的舊房間，下次使用時重新讀取
+
+        計時器以 room_id 取得房間，不必為了計時器保留舊房間。
+        """
+        if self.rooms.peek(room_id) is None:
+            return False
+        self.rooms.pop(room_id, None)
+        self.logger.discard(room_id)
+        return True
+
+    def _resident_room(self, room_id: str) -> Optional[GameRoom]:
+        return self.rooms.get(room_id) or self.load_room(room_id)
+
+    def _current_room(self, room_id: str) -> Optional[GameRoom]:
+        """計時器到期時取得最新的房間
+
+        共用後端時其他 worker 可能已推進房間，而更新通知不一定已送達，
+        因此先寫出本地的變更再重新讀取，不以過期的房間結算。
+        """
+        if self.storage.backend.shared and self.rooms.peek(room_id) is not None:
+            if not self.storage.flush(room_id):
+                # 版本衝突時 on_conflict 已在此通道上重新讀取房間
+                return self.rooms.peek(room_id)
+            self.rooms.pop(room_id, None)
+        return self._resident_room(room_id)
+
+    def get_group_id(self, room: GameRoom) -> str:
+        """房間對應的群組 ID（房間以群組 ID 建立，房間已結束則回傳 None）"""
+        if self.rooms.get(room.room_id) is room:
+            return room.room_id
+        return None
+
+    def find_player_room(self, user_id: str) -> GameRoom:
+        """以索引找出玩家所在的房間"""
+        room_id = self.player_rooms.get(user_id)
+        if room_id is None:
+            return None
+        room = self.rooms.get(room_id) or self.load_room(room_id)
+        if room is None or user_id not in room.players:
+            return None
+        return room
 
     def parse_target_user_id(self, message: str) -> str:
         # 從 @提及中提取用戶ID
@@ -209,22 +448,18 @@ class MessageHandler:
         """記錄遊戲事件並廣播給玩家和觀戰者"""
         self.logger.log_game_event(room.room_id, message)
         
-        for group_id, game_room in self.rooms.items():
-            if game_room == room:
-                # 發送給群組
-                self.line_bot_api.push_message(
-                    group_id,
-                    TextMessage(text=message)
-                )
-                
-                # 發送給觀戰者
-                if group_id in self.spectators:
-                    for spectator_id in self.spectators[group_id]:
-                        self.line_bot_api.push_message(
-                            spectator_id,
-                            TextMessage(text=f"[觀戰] {message}")
-                        )
-                break
+        group_id = self.get_group_id(room)
+        if group_id:
+            # 發送給群組
+            pushes = [(group_id, TextMessage(text=message))]
+            
+            # 發送給觀戰者
+            if group_id in self.spectators:
+                for spectator_id in self.spectators[group_id]:
+                    pushes.append((spectator_id, TextMessage(text=f"[觀戰] {message}")))
+
+            # 觀戰者收到相同內容，會合併成 multicast
+            self.messenger.push_many(pushes, phase=room.game_state.name.lower(), room_id=room.room_id)
 
     def handle_skill_usage(self, room: GameRoom, user_id: str, target_id: str, reply_token: str):
         try:
@@ -244,7 +479,6 @@ class MessageHandler:
                 raise GameError("wrong_phase")
                 
             result = room.use_skill(player, target)
-            room.night_action_count += 1
             
             # 檢查夜晚階段是否結束
             if room.check_night_complete():
@@ -266,20 +500,59 @@ class MessageHandler:
         if not voter.is_alive():
             return
 
-        room.cast_vote(voter_id, target_id)
+        if not room.cast_vote(voter_id, target_id):
+            # 重新投票時只能投給平票的玩家
+            self.line_bot_api.reply_message(reply_token, GameMessage.get_error_message("invalid_target"))
+            return
         self.line_bot_api.reply_message(
             reply_token,
             TextSendMessage(text=f"{voter.display_name} 投票給了 {target.display_name}")
         )
 
-        self.log_and_broadcast(
-            room,
-            f"{voter.display_name} 投票給了 {target.display_name}"
-        )
+        digest_config = room.config.config.get("vote_digest", {})
+        if digest_config.get("enabled"):
+            # 彙整模式：先記錄，稍後一次廣播票數統計
+            self.logger.log_game_event(
+                room.room_id, f"{voter.display_name} 投票給了 {target.display_name}"
+            )
+            self.vote_digest.add(
+                room, voter_id, target_id,
+                digest_config.get("window", 3),
+                digest_config.get("max_latency", 10)
+            )
+        else:
+            self.log_and_broadcast(
+                room,
+                f"{voter.display_name} 投票給了 {target.display_name}"
+            )
 
         if room.check_voting_complete():
             self.handle_voting_result(room)
 
+    def broadcast_vote_digest(self, room: GameRoom, votes: List[tuple]):
+        """廣播一段時間內的投票與目前票數"""
+        if room.game_state != GameState.VOTING:
+            return
+
+        def name_of(user_id: str) -> str:
+            player = room.players.get(user_id)
+            return player.display_name if player else user_id
+
+        tally = sorted(room.get_vote_results().items(), key=lambda item: -item[1])
+        message = GameMessage.get_vote_digest(
+            [f"{name_of(voter_id)} → {name_of(target_id)}" for voter_id, target_id in votes],
+            [(name_of(target_id), count) for target_id, count in tally],
+            len(room.votes),
+            len(room.get_alive_players())
+        )
+
+        group_id = self.get_group_id(room)
+        if group_id:
+            pushes = [(group_id, message)]
+            for spectator_id in self.spectators.get(group_id, []):
+                pushes.append((spectator_id, TextSendMessage(text=f"[觀戰] {message.text}")))
+            self.messenger.push_many(pushes, phase="voting", room_id=room.room_id)
+
     def update_game_status(self, room: GameRoom, reply_token: str):
         # 準備玩家列表資訊
         players_info = "\n".join([
@@ -299,63 +572,65 @@ class MessageHandler:
         )
 
     def start_game(self, room: GameRoom, reply_token: str):
+        self.messenger.call_stats.begin_game(room.room_id)
         # 發送遊戲開始通知
         self.line_bot_api.reply_message(
             reply_token,
             GameMessage.get_night_phase(room.day_count)
         )
         
-        # 私下通知每個玩家他們的角色
-        for player in room.players.values():
-            self.line_bot_api.push_message(
+        # 私下通知每個玩家他們的角色（並行發送）
+        self.messenger.push_many([
+            (
                 player.user_id,
                 GameMessage.get_role_notice(
                     player.display_name,
                     player.role.get_role_name()
                 )
             )
+            for player in room.players.values()
+        ], phase="start", room_id=room.room_id)
 
     def start_day_phase(self, room: GameRoom):
         # 處理夜晚行動結果
         room.start_day_phase()
         
         # 廣播夜晚死亡訊息
-        for group_id, game_room in self.rooms.items():
-            if game_room == room:
-                # 公告昨晚死亡的玩家
-                dead_players = []
-                for player in room.players.values():
-                    if not player.is_alive() and player.user_id in room.night_actions.values():
-                        dead_players.append(player)
-                
-                if dead_players:
-                    for player in dead_players:
-                        self.line_bot_api.push_message(
-                            group_id,
-                            GameMessage.get_death_announcement(
-                                player.display_name,
-                                player.role.get_role_name()
-                            )
-                        )
-                else:
-                    self.line_bot_api.push_message(
+        group_id = self.get_group_id(room)
+        if group_id:
+            # 公告昨晚死亡的玩家
+            dead_players = []
+            for player in room.players.values():
+                if not player.is_alive() and player.user_id in room.night_actions.values():
+                    dead_players.append(player)
+            
+            pushes = []
+            if dead_players:
+                for player in dead_players:
+                    pushes.append((
                         group_id,
-                        TextSendMessage(text="昨晚是平安夜，沒有玩家死亡。")
-                    )
-                
-                # 發送白天階段訊息
-                self.line_bot_api.push_message(
-                    group_id,
-                    GameMessage.get_day_phase(room.day_count)
-                )
-                
-                # 發送存活玩家列表
-                alive_players = room.get_alive_players()
-                self.line_bot_api.push_message(
+                        GameMessage.get_death_announcement(
+                            player.display_name,
+                            player.role.get_role_name()
+                        )
+                    ))
+            else:
+                pushes.append((
                     group_id,
-                    GameMessage.get_game_summary(alive_players, room.day_count)
-                )
-                break
+                    TextSendMessage(text="昨晚是平安夜，沒有玩家死亡。")
+                ))
+            
+            # 發送白天階段訊息
+            pushes.append((group_id, GameMessage.get_day_phase(room.day_count)))
+            
+            # 發送存活玩家列表
+            alive_players = room.get_alive_players()
+            pushes.append((
+                group_id,
+                GameMessage.get_game_summary(alive_players, room.day_count)
+            ))
+            # 同一群組的多則訊息會合併成一次推播
+            self.messenger.push_many(pushes, phase="day", room_id=room.room_id)
         
         # 檢查遊戲是否結束
         winner = room.check_game_end()
@@ -367,27 +642,31 @@ class MessageHandler:
         self.start_voting_phase(room)
 
     def start_voting_phase(self, room: GameRoom):
-        room.game_state = GameState.VOTING
+        room.start_voting_phase()
+        # 階段切換時寫入緩衝中的遊戲紀錄
+        self.logger.flush()
         
         # 找到群組ID
-        group_id = None
-        for gid, game_room in self.rooms.items():
-            if game_room == room:
-                group_id = gid
-                break
-        
+        group_id = self.get_group_id(room)
         if not group_id:
             return
         
         # 發送投票開始訊息
-        self.line_bot_api.push_message(
+        self.messenger.push_message(
             group_id,
-            GameMessage.get_voting_start()
+            GameMessage.get_voting_start(),
+            phase="voting", room_id=room.room_id
         )
         
-        # 設置投票計時器
+        self._arm_voting_timers(room, group_id)
+
+    def _arm_voting_timers(self, room: GameRoom, group_id: str):
+        # 計時器只記住房間與第幾輪投票，到期時重新取得房間，避免以過期或已重新讀取的房間結算
+        room_id, vote_round = room.room_id, room.vote_round
+
+        # 設置投票計時器（到期後回到該房間的執行通道處理）
         def voting_timeout():
-            self.handle_voting_result(room)
+            self.executor.submit(room_id, self._on_voting_timeout, room_id, vote_round)
             
         self.timer.start_timer(
             room.room_id,
@@ -397,74 +676,146 @@ class MessageHandler:
         )
         
         # 設置30秒警告
-        def warning_callback():
-            self.line_bot_api.push_message(
+        def send_warning():
+            if self._voting_room(room_id, vote_round, self._resident_room) is None:
+                return
+            self.messenger.push_message(
                 group_id,
-                GameMessage.get_timeout_warning("vote")
+                GameMessage.get_timeout_warning("vote"),
+                phase="voting", room_id=room_id
             )
+
+        def warning_callback():
+            self.executor.submit(room_id, send_warning)
             
         warning_time = room.config.config["vote_timeout"] - 30
         if warning_time > 0:
-            threading.Timer(warning_time, warning_callback).start()
+            self.timer.schedule(room.room_id, "warning", warning_time, warning_callback)
+
+    @staticmethod
+    def _voting_room(room_id: str, vote_round: int, get_room: Callable[[str], Optional[GameRoom]]):
+        # 已結算或已開始平票重投時，這一輪已不是計時的那一輪
+        room = get_room(room_id)
+        if room is None or room.game_state != GameState.VOTING or room.vote_round != vote_round:
+            return None
+        return room
+
+    def _on_voting_timeout(self, room_id: str, vote_round: int):
+        room = self._voting_room(room_id, vote_round, self._current_room)
+        if room:
+            self.handle_voting_result(room)
 
     def handle_voting_result(self, room: GameRoom):
+        # 投票可能已提前結束（或計時器與最後一票同時觸發），避免重複結算
+        if room.game_state != GameState.VOTING:
+            return
+        # 先送出尚未公告的投票彙整
+        self.vote_digest.flush(room)
+        self.timer.cancel_timer(room.room_id)
+
+        tied = [room.players[user_id].display_name for user_id in room.seats
+                if user_id in room.tally.leaders] if room.tally.is_tie() else []
         eliminated_player = room.process_votes()
         
-        for group_id, game_room in self.rooms.items():
-            if game_room == room:
-                if eliminated_player:
-                    self.line_bot_api.push_message(
-                        group_id,
-                        TextSendMessage(text=f"{eliminated_player.display_name} 被投票處決了！")
-                    )
-                
-                # 檢查遊戲是否結束
-                winner = room.check_game_end()
-                if winner:
-                    self.announce_winner(room, winner)
-                else:
-                    room.start_night_phase()
-                    self.line_bot_api.push_message(
-                        group_id,
-                        GameMessage.get_night_phase(room.day_count)
-                    )
-                break
-
-    def announce_winner(self, room: GameRoom, winner: str):
-        for group_id, game_room in self.rooms.items():
-            if game_room == room:
-                self.line_bot_api.push_message(
+        group_id = self.get_group_id(room)
+        if group_id:
+            candidates = room.vote_candidates
+            if tied:
+                self.messenger.push_message(
                     group_id,
-                    TextSendMessage(text=f"遊戲結束！{winner}獲勝！")
+                    GameMessage.get_vote_tie(tied, revote=bool(candidates)),
+                    phase="voting", room_id=room.room_id
                 )
-                del self.rooms[group_id]
-                break
+            if candidates:
+                # 平票者之間重新投票
+                self.start_voting_phase(room)
+                return
+            if eliminated_player:
+                self.messenger.push_message(
+                    group_id,
+                    TextSendMessage(text=f"{eliminated_player.display_name} 被投票處決了！"),
+                    phase="voting", room_id=room.room_id
+                )
+            
+            # 檢查遊戲是否結束
+            winner = room.check_game_end()
+            if winner:
+                self.announce_winner(room, winner)
+            else:
+                room.start_night_phase()
+                self.messenger.push_message(
+                    group_id,
+                    GameMessage.get_night_phase(room.day_count),
+                    phase="night", room_id=room.room_id
+                )
+                self.logger.flush()
+                self.save_room(group_id)
 
-    def end_game(self, room: GameRoom, winner: str):
-        # 更新玩家統計
-        for player in room.players.values():
-            self.player_stats.update_player_stats(
-                player.user_id,
-                {
-                    "won": (
-                        (winner == "好人陣營" and player.role.role_type != RoleType.WEREWOLF) or
-                        (winner == "狼人陣營" and player.role.role_type == RoleType.WEREWOLF)
-                    ),
-                    "role": player.role.get_role_name()
-                }
+    def announce_winner(self, room: GameRoom, winner: str):
+        group_id = self.get_group_id(room)
+        if group_id:
+            self.messenger.push_message(
+                group_id,
+                TextSendMessage(text=f"遊戲結束！{winner}獲勝！"),
+                phase="end", room_id=room.room_id
             )
+            self.end_game(room, winner)
+            self.timer.cancel_timer(room.room_id)
+            self.vote_digest.discard(room.room_id)
+            self.logger.flush()
+            self.logger.discard(room.room_id)
+            self.unregister_room(group_id)
+            self.storage.delete_game(room.room_id)
+
+    def end_game(self, room: GameRoom, winner: str):
+        # 遊戲結束後才寫入亂數種子（進行中可由種子推算身分），回報問題時可重現同一局
+        self.logger.log_game_event(room.room_id, f"遊戲結束，亂數種子: {room.rng.seed}")
+        self.messenger.call_stats.end_game(room.room_id)
+        # 更新玩家統計，整場遊戲一次寫入
+        self.player_stats.record_game_results({
+            player.user_id: {
+                "won": (
+                    (winner == "好人陣營" and player.role.code not in WOLF_CODES) or
+                    (winner == "狼人陣營" and player.role.code in WOLF_CODES)
+                ),
+                "role": player.role.get_role_name()
+            }
+            for player in room.players.values() if player.role
+        })
 
     def handle_private_message(self, event: MessageEvent):
         user_id = event.source.user_id
-        message = event.message.text
-        
-        # 尋找玩家所在的遊戲房間
-        current_room = None
-        for room in self.rooms.values():
-            if user_id in room.players:
-                current_room = room
-                break
         
+        # 以索引找出玩家所在的遊戲房間
+        room_id = self.player_rooms.get(user_id)
+        if room_id is None:
+            self.line_bot_api.reply_message(
+                event.reply_token,
+                GameMessage.get_error_message("not_in_game")
+            )
+            return
+
+        # 私訊指令同樣交由該房間的執行通道處理
+        self.executor.submit(room_id, self.handle_private_command, event)
+
+    def handle_private_command(self, event: MessageEvent):
+        words = event.message.text.lower().split()
+        label = words[0] if words and words[0] in self.COMMANDS else "other"
+        room_id = self.player_rooms.get(event.source.user_id, "")
+        try:
+            with profiler.tag(room_id, f"private:{label}"), metrics.time("werewolf_private_message_seconds"):
+                self.run_private_command(event)
+        finally:
+            room_id = self.player_rooms.get(event.source.user_id)
+            if room_id:
+                self.save_room(room_id)
+
+    def run_private_command(self, event: MessageEvent):
+        user_id = event.source.user_id
+        message = event.message.text
+
+        # 在房間通道內確認（必要時從磁碟載入）房間，排隊期間玩家可能已離開
+        current_room = self.find_player_room(user_id)
         if not current_room:
             self.line_bot_api.reply_message(
                 event.reply_token,
@@ -1,7 +1,7 @@
 from linebot.models import TextSendMessage, TemplateSendMessage, ButtonsTemplate, MessageAction
 from ..game.state import GameState
 from ..game.role import RoleType
-import random
+from ..utils.rng import thread_rng
 from typing import List, Dict, Any
 
 class GameMessage:
@@ -25,7 +25,8 @@ class GameMessage:
             "/stats - 查看個人統計\n"
             "/time - 查看剩餘時間\n"
             "/tip - 獲得遊戲小提示\n"
-            "/config - 查看遊戲配置"
+            "/config - 查看遊戲配置\n"
+            "/config deck 6-8:2/3 9+:3/4 - 設定角色配置（狼人數/神職數，reset 恢復預設）"
         )
         return TextSendMessage(text=help_text)
 
@@ -42,6 +43,7 @@ class GameMessage:
             "not_your_turn": "現在不是您的回合！請等待通知。",
             "invalid_command": "無效的私訊命令。請使用 /skill 來使用技能。",
             "werewolf_must_wait": "狼人必須等待所有狼人一起行動。",
+            "state_conflict": "遊戲狀態已被其他伺服器更新，剛才的指令沒有生效，請重新輸入。",
         }
         return TextSendMessage(text=error_messages.get(error_type, "發生未知錯誤！"))
 
@@ -92,6 +94,20 @@ class GameMessage:
     def get_voting_result(player_name: str, vote_count: int) -> TextSendMessage:
         return TextSendMessage(text=f"{player_name} 獲得了 {vote_count} 票，被處決！")
 
+    @staticmethod
+    def get_vote_tie(names: List[str], revote: bool) -> TextSendMessage:
+        text = f"⚖️ {'、'.join(names)} 平票！"
+        text += "\n請在平票的玩家之間重新投票" if revote else "\n本輪無人被處決"
+        return TextSendMessage(text=text)
+
+    @staticmethod
+    def get_vote_digest(new_votes: List[str], tally: List[tuple], voted: int, total: int) -> TextSendMessage:
+        """投票彙整訊息"""
+        digest_text = "🗳️ 最新投票：\n" + "\n".join(new_votes)
+        digest_text += f"\n\n📊 目前票數（{voted}/{total} 已投票）：\n"
+        digest_text += "\n".join([f"{name}：{count} 票" for name, count in tally])
+        return TextSendMessage(text=digest_text)
+
     @staticmethod
     def get_game_over(winner: str) -> TextSendMessage:
         return TextSendMessage(text=f"遊戲結束！{winner}獲得勝利！🎉")
@@ -140,7 +156,7 @@ class GameMessage:
             "💡 女巫的解藥要謹慎使用。",
             "💡 獵人臨死前的一槍可能扭轉局勢！"
         ]
-        return TextSendMessage(text=random.choice(tips))
+        return TextSendMessage(text=thread_rng().choice(tips))
 
     @staticmethod
     def get_config_status(config: Dict[str, Any]) -> TextSendMessage:
@@ -159,6 +175,18 @@ class GameMessage:
         )
         return TextSendMessage(text=config_text)
 
+    @staticmethod
+    def get_deck_status(deck) -> TextSendMessage:
+        lines = ["🃏 角色配置\n"]
+        for count in range(deck.min_players, deck.max_players + 1):
+            roles = "、".join(f"{name}x{amount}" for name, amount in deck.distribution(count).items())
+            lines.append(f"{count}人：{roles}")
+        return TextSendMessage(text="\n".join(lines))
+
+    @staticmethod
+    def get_deck_error(reason: str) -> TextSendMessage:
+        return TextSendMessage(text=f"❌ 角色配置無效：{reason}")
+
     @staticmethod
     def get_timer_message(phase: str, remaining: int) -> TextSendMessage:
         return TextSendMessage(text=f"⏰ {phase}階段還剩 {remaining} 秒")
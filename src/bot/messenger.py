@@ -0,0 +1,334 @@
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - aiohttp 為選用依賴
+    aiohttp = None
+
+from linebot import LineBotApi
+from ..utils.metrics import metrics
+
+DEFAULT_ENDPOINT = "https://api.line.me"
+MAX_MESSAGES_PER_REQUEST = 5    # 單次 push / multicast 最多 5 則訊息
+MAX_MULTICAST_RECIPIENTS = 500  # 單次 multicast 最多 500 位收件者
+
+Push = Tuple[str, Any]  # (收件者 ID, 訊息或訊息列表)
+
+
+class Delivery(NamedTuple):
+    """一次實際的 API 呼叫"""
+    kind: str              # "push" 或 "multicast"
+    to: Any                # push 為收件者 ID，multicast 為收件者 ID 列表
+    messages: List[Any]
+    push_indices: Tuple[int, ...]  # 這次呼叫涵蓋的原始推播
+
+
+def _as_list(messages: Any) -> list:
+    return list(messages) if isinstance(messages, (list, tuple)) else [messages]
+
+
+def _payload_key(messages: List[Any]) -> str:
+    return json.dumps(
+        [m.as_json_dict() if hasattr(m, 'as_json_dict') else repr(m) for m in messages],
+        sort_keys=True, ensure_ascii=False, default=repr
+    )
+
+
+def _is_user(to: str) -> bool:
+    # multicast 只接受用戶 ID（U 開頭），群組與聊天室仍需使用 push
+    return to.startswith('U')
+
+
+def plan_deliveries(pushes: Sequence[Push],
+                    max_messages: int = MAX_MESSAGES_PER_REQUEST,
+                    max_recipients: int = MAX_MULTICAST_RECIPIENTS) -> List[List[Delivery]]:
+    """將推播整理成最少的 API 呼叫
+
+    同一收件者的訊息依序合併，每次最多 max_messages 則；
+    內容完全相同的用戶推播合併為 multicast。
+    回傳多個回合，同一回合內的呼叫可以並行，回合之間需依序執行，
+    以確保每位收件者收到訊息的順序不變。
+    """
+    per_recipient: "OrderedDict[str, List[Tuple[Any, int]]]" = OrderedDict()
+    for index, (to, messages) in enumerate(pushes):
+        per_recipient.setdefault(to, []).extend((m, index) for m in _as_list(messages))
+
+    rounds: List[List[Delivery]] = []
+    round_index = 0
+    while True:
+        start = round_index * max_messages
+        chunks = [
+            (to, items[start:start + max_messages])
+            for to, items in per_recipient.items()
+            if len(items) > start
+        ]
+        if not chunks:
+            break
+
+        deliveries: List[Delivery] = []
+        multicast_groups: "OrderedDict[str, List[Tuple[str, List[Tuple[Any, int]]]]]" = OrderedDict()
+        for to, chunk in chunks:
+            if _is_user(to):
+                key = _payload_key([m for m, _ in chunk])
+                multicast_groups.setdefault(key, []).append((to, chunk))
+            else:
+                deliveries.append(Delivery(
+                    "push", to, [m for m, _ in chunk], tuple(sorted({i for _, i in chunk}))
+                ))
+
+        for group in multicast_groups.values():
+            messages = [m for m, _ in group[0][1]]
+            for offset in range(0, len(group), max_recipients):
+                part = group[offset:offset + max_recipients]
+                indices = tuple(sorted({i for _, chunk in part for _, i in chunk}))
+                if len(part) == 1:
+                    deliveries.append(Delivery("push", part[0][0], messages, indices))
+                else:
+                    deliveries.append(Delivery(
+                        "multicast", [to for to, _ in part], messages, indices
+                    ))
+
+        rounds.append(deliveries)
+        round_index += 1
+    return rounds
+
+
+class _CallStats:
+    """統計實際花費的 API 呼叫數
+
+    全部呼叫依遊戲階段累計；帶有 room_id 的呼叫另外記在該房間目前這一局，
+    遊戲結束時併入已結束遊戲的總計，可以看出每局實際花費的呼叫數。
+    """
+
+    MAX_GAMES = 10000  # 進行中遊戲的統計上限，超過時捨棄最久沒有呼叫的房間
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._games: "OrderedDict[str, Dict[str, Dict[str, int]]]" = OrderedDict()
+        self._finished = {"games": 0, "push": 0, "multicast": 0, "messages": 0, "recipients": 0}
+
+    @staticmethod
+    def _add(stats: Dict[str, Dict[str, int]], phase: Optional[str], delivery: Delivery):
+        counts = stats.setdefault(phase or "other", {
+            "push": 0, "multicast": 0, "messages": 0, "recipients": 0
+        })
+        counts[delivery.kind] += 1
+        counts["messages"] += len(delivery.messages)
+        counts["recipients"] += len(delivery.to) if delivery.kind == "multicast" else 1
+
+    def record(self, phase: Optional[str], delivery: Delivery, room_id: str = None):
+        with self._lock:
+            self._add(self._stats, phase, delivery)
+            if room_id is None:
+                return
+            game = self._games.get(room_id)
+            if game is None:
+                game = self._games[room_id] = {}
+                if len(self._games) > self.MAX_GAMES:
+                    self._games.popitem(last=False)
+            else:
+                self._games.move_to_end(room_id)
+            self._add(game, phase, delivery)
+
+    def begin_game(self, room_id: str):
+        with self._lock:
+            self._games.pop(room_id, None)
+
+    def end_game(self, room_id: str) -> Dict[str, Dict[str, int]]:
+        """結束該房間這一局的統計，回傳各階段的呼叫數"""
+        with self._lock:
+            game = self._games.pop(room_id, {})
+            self._finished["games"] += 1
+            for counts in game.values():
+                for key, value in counts.items():
+                    self._finished[key] += value
+            return game
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {phase: dict(stats) for phase, stats in self._stats.items()}
+
+    def game_snapshot(self, room_id: str = None) -> Dict[str, Any]:
+        """已結束遊戲的總計與平均每局呼叫數；指定 room_id 時回傳該房間目前這一局各階段的呼叫數"""
+        with self._lock:
+            if room_id is not None:
+                return {phase: dict(counts) for phase, counts in self._games.get(room_id, {}).items()}
+            finished = dict(self._finished)
+            games = finished["games"]
+            finished["calls_per_game"] = round((finished["push"] + finished["multicast"]) / games, 2) if games else 0
+            return {
+                "finished": finished,
+                "in_progress": {
+                    room_id: sum(counts["push"] + counts["multicast"] for counts in game.values())
+                    for room_id, game in self._games.items()
+                }
+            }
+
+
+def _collect_results(pushes: Sequence[Push], deliveries: List[Delivery], outcomes: List[bool]) -> List[bool]:
+    results = [True] * len(pushes)
+    for delivery, ok in zip(deliveries, outcomes):
+        if not ok:
+            for index in delivery.push_indices:
+                results[index] = False
+    return results
+
+
+class SyncMessenger:
+    """透過 LineBotApi 同步發送推播"""
+
+    def __init__(self, line_bot_api: LineBotApi):
+        self.line_bot_api = line_bot_api
+        self.call_stats = _CallStats()
+
+    def push_message(self, to: str, messages: Any, phase: str = None, room_id: str = None) -> bool:
+        return self.push_many([(to, messages)], phase, room_id)[0]
+
+    def push_many(self, pushes: Sequence[Push], phase: str = None, room_id: str = None) -> List[bool]:
+        deliveries, outcomes = [], []
+        for round_deliveries in plan_deliveries(pushes):
+            for delivery in round_deliveries:
+                deliveries.append(delivery)
+                outcomes.append(self._send(delivery))
+                self.call_stats.record(phase, delivery, room_id)
+        return _collect_results(pushes, deliveries, outcomes)
+
+    def _send(self, delivery: Delivery) -> bool:
+        messages = delivery.messages[0] if len(delivery.messages) == 1 else delivery.messages
+        try:
+            if delivery.kind == "multicast":
+                self.line_bot_api.multicast(delivery.to, messages)
+            else:
+                self.line_bot_api.push_message(delivery.to, messages)
+            return True
+        except Exception as e:
+            print(f"推播訊息失敗: {str(e)}")
+            return False
+
+    def get_call_stats(self) -> Dict[str, Dict[str, int]]:
+        return self.call_stats.snapshot()
+
+    def get_game_stats(self, room_id: str = None) -> Dict[str, Any]:
+        return self.call_stats.game_snapshot(room_id)
+
+    def close(self):
+        pass
+
+
+class AsyncMessenger:
+    """以 aiohttp 連線池並行發送推播
+
+    在背景執行緒維持一個事件迴圈與持久的 HTTP 連線池（keep-alive），
+    同一回合內的呼叫並行發送，同一收件者的訊息仍依序送出。
+    無法建立連線時改用同步的 LineBotApi 補送；請求送出後逾時或中斷時，
+    LINE 可能已經收到，補送會造成重複訊息，因此只記錄失敗。
+    """
+
+    def __init__(self, access_token: str, fallback: Optional[LineBotApi] = None,
+                 endpoint: str = DEFAULT_ENDPOINT, pool_size: int = 32,
+                 timeout: float = 10.0):
+        if aiohttp is None:
+            raise RuntimeError("AsyncMessenger 需要安裝 aiohttp")
+
+        self.endpoint = endpoint.rstrip('/')
+        self.fallback = SyncMessenger(fallback) if fallback is not None else None
+        self.call_stats = _CallStats()
+        self._headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json",
+        }
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="line-messenger", daemon=True
+        )
+        self._thread.start()
+        self._session = self._call(self._create_session())
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def _create_session(self):
+        connector = aiohttp.TCPConnector(limit=self._pool_size, keepalive_timeout=60)
+        return aiohttp.ClientSession(
+            connector=connector,
+            headers=self._headers,
+            timeout=aiohttp.ClientTimeout(total=self._timeout)
+        )
+
+    async def _post(self, path: str, payload: dict) -> bool:
+        async with self._session.post(f"{self.endpoint}{path}", json=payload) as response:
+            if response.status >= 400:
+                body = await response.text()
+                print(f"LINE API 錯誤 {response.status}: {body}")
+                return False
+            await response.read()
+            return True
+
+    async def _send(self, delivery: Delivery) -> bool:
+        payload = {"to": delivery.to, "messages": [m.as_json_dict() for m in delivery.messages]}
+        path = "/v2/bot/message/multicast" if delivery.kind == "multicast" else "/v2/bot/message/push"
+        method = "multicast" if delivery.kind == "multicast" else "push_message"
+        try:
+            # 與同步路徑的 LineBotApi 方法名稱使用相同的標籤
+            with metrics.time("werewolf_line_api_seconds", method=method):
+                return await self._post(path, payload)
+        except aiohttp.ClientConnectorError as e:
+            if self.fallback is None:
+                print(f"推播訊息失敗: {str(e)}")
+                return False
+            # 請求尚未送出，改走同步路徑
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.fallback._send, delivery)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"推播訊息失敗: {str(e) or type(e).__name__}")
+            return False
+
+    async def _send_all(self, rounds: List[List[Delivery]]) -> Tuple[List[Delivery], List[bool]]:
+        deliveries, outcomes = [], []
+        for round_deliveries in rounds:
+            deliveries.extend(round_deliveries)
+            outcomes.extend(await asyncio.gather(*[self._send(d) for d in round_deliveries]))
+        return deliveries, outcomes
+
+    def push_message(self, to: str, messages: Any, phase: str = None, room_id: str = None) -> bool:
+        return self.push_many([(to, messages)], phase, room_id)[0]
+
+    def push_many(self, pushes: Sequence[Push], phase: str = None, room_id: str = None) -> List[bool]:
+        """合併並行發送多筆推播，等待全部完成後回傳各筆結果"""
+        if not pushes:
+            return []
+        deliveries, outcomes = self._call(self._send_all(plan_deliveries(pushes)))
+        for delivery in deliveries:
+            self.call_stats.record(phase, delivery, room_id)
+        return _collect_results(pushes, deliveries, outcomes)
+
+    def get_call_stats(self) -> Dict[str, Dict[str, int]]:
+        return self.call_stats.snapshot()
+
+    def get_game_stats(self, room_id: str = None) -> Dict[str, Any]:
+        return self.call_stats.game_snapshot(room_id)
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        self._call(self._session.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def create_messenger(line_bot_api: LineBotApi, mode: str = "sync",
+                     access_token: str = None, endpoint: str = DEFAULT_ENDPOINT,
+                     pool_size: int = 32):
+    """依設定建立推播後端；無法使用 aiohttp 時退回同步模式"""
+    if mode == "async" and aiohttp is not None:
+        return AsyncMessenger(access_token, fallback=line_bot_api,
+                              endpoint=endpoint, pool_size=pool_size)
+    return SyncMessenger(line_bot_api)
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterator, List, MutableMapping, Optional
+from ..game.room import GameRoom
+
+
+class RoomRegistry(MutableMapping):
+    """常駐記憶體的遊戲房間
+
+    以 LRU 順序保存房間並記錄最後存取時間。房間數超過 max_resident，
+    或閒置超過 idle_ttl 秒時，會透過 on_evict 要求將房間寫回磁碟並移出記憶體；
+    can_evict 可排除仍在計時中或遊戲進行中的房間（在鎖內呼叫，只能使用 peek 與 idle_seconds）。
+    """
+
+    def __init__(self, max_resident: int = 1000, idle_ttl: float = 1800,
+                 on_evict: Callable[[str], None] = None,
+                 can_evict: Callable[[str, GameRoom], bool] = None):
+        self.max_resident = max_resident
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict
+        self.can_evict = can_evict
+        self._rooms: "OrderedDict[str, GameRoom]" = OrderedDict()
+        self._last_access = {}
+        # 不同房間的執行通道會同時存取，LRU 順序需要上鎖；
+        # on_evict 一律在鎖外呼叫，避免與房間通道互相等待
+        self._lock = threading.Lock()
+
+    def __getitem__(self, room_id: str) -> GameRoom:
+        with self._lock:
+            room = self._rooms[room_id]
+            self._touch(room_id)
+            return room
+
+    def __setitem__(self, room_id: str, room: GameRoom):
+        with self._lock:
+            self._rooms[room_id] = room
+            self._touch(room_id)
+            excess = len(self._rooms) - self.max_resident
+            # 由最久未使用的房間開始
+            candidates = self._candidates(excess, exclude=room_id) if excess > 0 else []
+        for candidate in candidates:
+            self._request_evict(candidate)
+
+    def __delitem__(self, room_id: str):
+        with self._lock:
+            del self._rooms[room_id]
+            self._last_access.pop(room_id, None)
+
+    def __contains__(self, room_id) -> bool:
+        # 只檢查是否常駐，不更新存取時間
+        return room_id in self._rooms
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._rooms))
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def _touch(self, room_id: str):
+        self._rooms.move_to_end(room_id)
+        self._last_access[room_id] = time.monotonic()
+
+    def peek(self, room_id: str) -> Optional[GameRoom]:
+        """取得房間但不更新存取時間"""
+        return self._rooms.get(room_id)
+
+    def idle_seconds(self, room_id: str) -> float:
+        """距離最後一次存取的秒數"""
+        return time.monotonic() - self._last_access.get(room_id, 0)
+
+    def _evictable(self, room_id: str) -> bool:
+        room = self._rooms.get(room_id)
+        if room is None:
+            return False
+        return self.can_evict is None or self.can_evict(room_id, room)
+
+    def _candidates(self, limit: int, idle_before: float = None, exclude: str = None) -> List[str]:
+        candidates = []
+        for room_id in self._rooms:
+            if len(candidates) >= limit:
+                break
+            if room_id == exclude:
+                continue
+            if idle_before is not None and self._last_access.get(room_id, 0) > idle_before:
+                break  # LRU 順序，之後的房間都較新
+            if self._evictable(room_id):
+                candidates.append(room_id)
+        return candidates
+
+    def _request_evict(self, room_id: str):
+        if self.on_evict:
+            self.on_evict(room_id)
+        else:
+            self.pop(room_id, None)
+
+    def evict_idle(self) -> List[str]:
+        """要求移出閒置超過 idle_ttl 的房間"""
+        with self._lock:
+            expired = self._candidates(len(self._rooms), time.monotonic() - self.idle_ttl)
+        for room_id in expired:
+            self._request_evict(room_id)
+        return expired
@@ -0,0 +1,536 @@
+import bisect
+import hashlib
+import os
+import queue
+import socket
+import threading
+from collections import OrderedDict
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from ..utils.metrics import MetricsRegistry, metrics
+
+# 分片位址：(host, port)
+Address = Tuple[str, int]
+
+
+def _require_authkey(authkey: bytes) -> bytes:
+    # 連線上傳送的是 pickle，未驗證的連線等同允許任意執行程式碼
+    if not authkey:
+        raise ValueError("分片連線必須設定 SHARD_AUTHKEY")
+    return authkey
+
+
+class HashRing:
+    """一致性雜湊環
+
+    每個節點在環上放置 replicas 個虛擬節點，key 落在順時針方向的第一個
+    虛擬節點上。節點增減時只有約 1/N 的 key 會換到別的節點。
+    """
+
+    def __init__(self, nodes: Iterable[Any] = (), replicas: int = 100):
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, Any] = {}
+        self.nodes: List[Any] = []
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+    def add(self, node: Any):
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for i in range(self.replicas):
+            point = self._hash(f"{node}#{i}")
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove(self, node: Any):
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        self._points = [point for point in self._points if self._owners[point] != node]
+        self._owners = {point: self._owners[point] for point in self._points}
+
+    def node_for(self, key: str) -> Optional[Any]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+    def copy(self) -> "HashRing":
+        ring = HashRing(replicas=self.replicas)
+        ring.nodes = list(self.nodes)
+        ring._points = list(self._points)
+        ring._owners = dict(self._owners)
+        return ring
+
+
+class ShardServer:
+    """持有一部分房間的分片行程
+
+    透過 multiprocessing.connection 接收路由端轉送的事件與搬移房間的指令：
+    ("event", event)、("release", room_ids)、("adopt", room_ids)、("rooms",)、("stored",)、("versioned",)、
+    ("stats",)、("metrics",)、("ping",)。
+    除了 event 與 members 以外都會回覆 ("reply", 結果)。玩家加入或離開房間時，
+    會以 ("member", user_id, room_id) 通知所有路由端更新私訊索引；路由端連線後
+    送出 ("members",)，分片以 ("members", {user_id: room_id}) 回傳目前完整的索引。
+
+    同一批 webhook 只有部分事件轉送成功時路由端回應 503，LINE 會重送整批事件，
+    因此分片記住最近處理過的 webhookEventId，重送的事件不會執行第二次。
+    """
+
+    RECENT_EVENTS = 10000
+
+    def __init__(self, message_handler, address: Address = ("127.0.0.1", 0), authkey: bytes = b"",
+                 registry: MetricsRegistry = metrics):
+        self.message_handler = message_handler
+        self.registry = registry
+        self.listener = Listener(address, authkey=_require_authkey(authkey))
+        self.address: Address = self.listener.address
+        self._connections: Dict[Connection, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._seen: "OrderedDict[str, None]" = OrderedDict()  # 最近處理過的 webhookEventId
+        message_handler.on_membership = self._broadcast_membership
+
+    def serve_forever(self):
+        while not self._closed:
+            try:
+                conn = self.listener.accept()
+            except Exception as e:
+                if self._closed:
+                    return
+                print(f"分片連線失敗: {str(e)}")
+                continue
+            with self._lock:
+                self._connections[conn] = threading.Lock()
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def start(self) -> "ShardServer":
+        threading.Thread(target=self.serve_forever, name="shard-server", daemon=True).start()
+        return self
+
+    def _send(self, conn: Connection, message: Tuple):
+        lock = self._connections.get(conn)
+        if lock is None:
+            return
+        with lock:
+            conn.send(message)
+
+    def _broadcast_membership(self, user_id: str, room_id: Optional[str]):
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            try:
+                self._send(conn, ("member", user_id, room_id))
+            except (OSError, EOFError):
+                pass
+
+    def _first_delivery(self, event) -> bool:
+        event_id = getattr(event, 'webhook_event_id', None)
+        if not event_id:
+            return True
+        with self._lock:
+            if event_id in self._seen:
+                return False
+            self._seen[event_id] = None
+            if len(self._seen) > self.RECENT_EVENTS:
+                self._seen.popitem(last=False)
+        return True
+
+    def _serve(self, conn: Connection):
+        try:
+            while True:
+                message = conn.recv()
+                kind = message[0]
+                if kind == "event":
+                    if not self._first_delivery(message[1]):
+                        continue
+                    try:
+                        self.message_handler.handle_text_message(message[1])
+                    except Exception as e:
+                        print(f"分片處理事件失敗: {str(e)}")
+                    continue
+                if kind == "members":
+                    # 與 member 通知走同一條連線，路由端可依到達順序合併
+                    self._send(conn, ("members", dict(self.message_handler.player_rooms)))
+                    continue
+                self._send(conn, ("reply", self._handle_request(kind, *message[1:])))
+        except (EOFError, OSError, TypeError):
+            pass
+        finally:
+            with self._lock:
+                self._connections.pop(conn, None)
+            conn.close()
+
+    def _handle_request(self, kind: str, *args) -> Any:
+        handler = self.message_handler
+        if kind == "release":
+            return [room_id for room_id in args[0]
+                    if handler.executor.submit(room_id, handler.release_room, room_id).result()]
+        if kind == "adopt":
+            return [room_id for room_id in args[0]
+                    if handler.executor.submit(room_id, handler.adopt_room, room_id).result()]
+        if kind == "ping":
+            return "pong"
+        if kind == "rooms":
+            return list(handler.rooms)
+        if kind == "stored":
+            return list(handler.storage.backend.room_ids())
+        if kind == "versioned":
+            return handler.storage.backend.versioned
+        if kind == "metrics":
+            return self.registry.snapshot()
+        if kind == "stats":
+            return {
+                "rooms": len(handler.rooms),
+                "players": len(handler.player_rooms),
+                "delivery": dict(phases=handler.messenger.get_call_stats(), **handler.messenger.get_game_stats())
+            }
+        return None
+
+    def close(self):
+        self._closed = True
+        # 先連線一次喚醒阻塞在 accept 的執行緒，關閉後位址才會立即釋放
+        try:
+            socket.create_connection(self.address, timeout=1).close()
+        except OSError:
+            pass
+        self.listener.close()
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            conn.close()
+
+
+class _ShardLink:
+    """路由端到單一分片的連線；背景執行緒接收回覆與成員變動通知
+
+    連線後先向分片取得完整的玩家索引，新的路由端或重新連線時不會漏掉
+    連線前的成員變動。快照送出期間收到的 member 通知比快照新，合併時以通知為準。
+    """
+
+    SYNC_TIMEOUT = 5
+
+    def __init__(self, address: Address, authkey: bytes, on_member, on_members):
+        self.address = address
+        self.conn = Client(address, authkey=_require_authkey(authkey))
+        self.on_member = on_member
+        self.on_members = on_members
+        self._send_lock = threading.Lock()
+        self._request_lock = threading.Lock()
+        self._replies: "queue.Queue" = queue.Queue()
+        self._touched = set()  # 等待快照期間收到通知的玩家
+        self._synced = threading.Event()
+        self.alive = True
+        threading.Thread(target=self._read_loop, daemon=True).start()
+        self.send(("members",))
+        if not self._synced.wait(self.SYNC_TIMEOUT):
+            print(f"同步分片玩家索引逾時: {address[0]}:{address[1]}")
+
+    def _read_loop(self):
+        try:
+            while True:
+                message = self.conn.recv()
+                if message[0] == "member":
+                    if not self._synced.is_set():
+                        self._touched.add(message[1])
+                    self.on_member(message[1], message[2])
+                elif message[0] == "members":
+                    self.on_members(self.address, message[1], self._touched)
+                    self._touched = set()
+                    self._synced.set()
+                elif message[0] == "reply":
+                    self._replies.put(message[1])
+        except (EOFError, OSError, TypeError):
+            # TypeError：連線在 recv 途中被其他執行緒關閉
+            self.alive = False
+            self._replies.put(None)
+
+    def send(self, message: Tuple):
+        with self._send_lock:
+            self.conn.send(message)
+
+    def request(self, message: Tuple, timeout: float = 30) -> Any:
+        with self._request_lock:
+            self.send(message)
+            try:
+                return self._replies.get(timeout=timeout)
+            except queue.Empty:
+                # 逾時的回覆之後才到會與下一個請求錯開，直接放棄這條連線
+                self.close()
+                raise
+
+    def close(self):
+        self.alive = False
+        self.conn.close()
+
+
+class ShardRouter:
+    """以一致性雜湊把事件轉送給房間所屬的分片
+
+    群組事件以 group_id 決定分片；私訊依分片回報的玩家索引找到所在的房間，
+    不在任何房間的玩家以 user_id 決定分片。節點增減時 rebalance 會請舊的
+    分片寫回存檔並交出房間，再由新的分片接手。
+
+    start_health_checks 後會定期 ping 所有設定的分片：連續失敗的分片移出環，
+    由其他分片從存檔接手房間；恢復回應的分片再加回環上。每個 webhook worker
+    各自判斷分片是否存活，環短暫不一致時同一個房間可能由兩個分片持有，因此只有
+    存檔會比對版本時（過期的寫入被拒絕並重新讀取）才自動移除分片。
+    """
+
+    HEALTH_FAILURES = 3  # 連續失敗幾次視為離線
+
+    def __init__(self, addresses: Iterable[Address] = (), authkey: bytes = b"", replicas: int = 100):
+        self.authkey = _require_authkey(authkey)
+        self.ring = HashRing([tuple(address) for address in addresses], replicas)
+        self.player_rooms: Dict[str, str] = {}  # user_id -> room_id，由分片通知更新
+        self._links: Dict[Address, _ShardLink] = {}
+        self._pid = os.getpid()
+        self._lock = threading.RLock()
+        self.members: List[Address] = list(self.ring.nodes)  # 設定的所有分片，包含離線的
+        self._failures: Dict[Address, int] = {}
+        self._versioned: Optional[bool] = None  # 分片的存檔是否比對版本，第一次需要時詢問
+        self._health_interval = 0.0
+        self._health_pid = None
+        self._health_stop = threading.Event()
+
+    def _on_member(self, user_id: str, room_id: Optional[str]):
+        if room_id is None:
+            self.player_rooms.pop(user_id, None)
+        else:
+            self.player_rooms[user_id] = room_id
+
+    def _on_members(self, address: Address, members: Dict[str, str], touched: set):
+        """合併分片回傳的完整索引；指向此分片房間但已不在快照中的玩家視為已離開"""
+        # 由連線的讀取執行緒呼叫，建立連線的執行緒正持有 _lock 等待快照，這裡不能取鎖
+        owned = {room_id for room_id in set(self.player_rooms.values())
+                 if self.ring.node_for(room_id) == address}
+        for user_id, room_id in list(self.player_rooms.items()):
+            if room_id in owned and user_id not in members and user_id not in touched:
+                self.player_rooms.pop(user_id, None)
+        for user_id, room_id in members.items():
+            if user_id not in touched:
+                self.player_rooms[user_id] = room_id
+
+    def _link(self, address: Address) -> _ShardLink:
+        with self._lock:
+            if self._pid != os.getpid():
+                # fork 後的子行程不能共用父行程的連線
+                self._links = {}
+                self._pid = os.getpid()
+            link = self._links.get(address)
+            if link is None or not link.alive:
+                link = self._links[address] = _ShardLink(
+                    address, self.authkey, self._on_member, self._on_members
+                )
+            return link
+
+    def _connect_all(self):
+        """確保與環上每個分片都已連線（連線時會同步玩家索引）"""
+        with self._lock:
+            addresses = list(self.ring.nodes)
+        for address in addresses:
+            try:
+                self._link(address)
+            except (OSError, EOFError, ConnectionError) as e:
+                print(f"連線分片失敗: {str(e)}")
+
+    def route_key(self, event) -> str:
+        source = event.source
+        if source.type == 'user':
+            # 玩家可能在其他路由端加入遊戲，私訊前先確認索引已與所有分片同步
+            self._connect_all()
+            return self.player_rooms.get(source.user_id, source.user_id)
+        return getattr(source, 'group_id', None) or source.user_id
+
+    def owner(self, key: str) -> Optional[Address]:
+        with self._lock:
+            return self.ring.node_for(key)
+
+    def start_health_checks(self, interval: float = 5.0) -> "ShardRouter":
+        """定期檢查分片是否存活；執行緒在第一次轉送時才建立，fork 出的 worker 各自檢查"""
+        self._health_interval = interval
+        self._ensure_health_thread()
+        return self
+
+    def _ensure_health_thread(self):
+        if self._health_interval <= 0 or self._health_pid == os.getpid():
+            return
+        with self._lock:
+            if self._health_pid == os.getpid():
+                return
+            self._health_pid = os.getpid()
+            threading.Thread(target=self._health_loop, name="shard-health", daemon=True).start()
+
+    def _health_loop(self):
+        while not self._health_stop.wait(self._health_interval):
+            self.check_health()
+
+    def _ping(self, address: Address) -> bool:
+        try:
+            return self._link(address).request(("ping",), timeout=2) == "pong"
+        except (OSError, EOFError, ConnectionError, queue.Empty):
+            return False
+
+    def check_health(self) -> Dict[str, Address]:
+        """ping 所有設定的分片並依結果加入或移除節點，回傳搬移的房間"""
+        moves: Dict[str, Address] = {}
+        for address in list(self.members):
+            if self._ping(address):
+                self._failures[address] = 0
+                if address not in self.ring.nodes:
+                    print(f"分片恢復連線: {address[0]}:{address[1]}")
+                    moves.update(self.add_node(address))
+                continue
+            self._failures[address] = self._failures.get(address, 0) + 1
+            if address in self.ring.nodes and self._failures[address] >= self.HEALTH_FAILURES:
+                if not self.storage_versioned():
+                    # 無法避免兩個分片同時寫入同一個房間，事件回應 503 等待分片恢復
+                    if self._failures[address] == self.HEALTH_FAILURES:
+                        print(f"分片無回應，存檔不比對版本，保留在雜湊環上: {address[0]}:{address[1]}")
+                    continue
+                print(f"分片無回應，移出雜湊環: {address[0]}:{address[1]}")
+                with self._lock:
+                    # 無法連線的分片不必交出房間，由新的擁有者從存檔接手
+                    link = self._links.pop(address, None)
+                    if link:
+                        link.close()
+                moves.update(self.remove_node(address))
+        return moves
+
+    def storage_versioned(self) -> bool:
+        """詢問分片的存檔是否比對版本；沒有分片可回應時視為否"""
+        if self._versioned is None:
+            for address in list(self.members):
+                try:
+                    self._versioned = bool(self._link(address).request(("versioned",), timeout=5))
+                    break
+                except (OSError, EOFError, ConnectionError, queue.Empty):
+                    continue
+        return bool(self._versioned)
+
+    def route(self, event) -> bool:
+        """轉送事件，分片無法連線時回傳 False"""
+        self._ensure_health_thread()
+        key = self.route_key(event)
+        address = self.owner(key)
+        if address is None:
+            return False
+        try:
+            self._link(address).send(("event", event))
+            return True
+        except (OSError, EOFError, ConnectionError) as e:
+            print(f"轉送事件失敗: {str(e)}")
+            return False
+
+    def add_node(self, address: Address) -> Dict[str, Address]:
+        with self._lock:
+            if tuple(address) not in self.members:
+                self.members.append(tuple(address))
+            old_ring = self.ring.copy()
+            self.ring.add(tuple(address))
+            return self.rebalance(old_ring)
+
+    def remove_node(self, address: Address) -> Dict[str, Address]:
+        with self._lock:
+            old_ring = self.ring.copy()
+            self.ring.remove(tuple(address))
+            # 仍可連線的分片先交出房間，之後才關閉連線
+            moves = self.rebalance(old_ring)
+            link = self._links.pop(tuple(address), None)
+            if link:
+                link.close()
+            return moves
+
+    def rebalance(self, old_ring: HashRing) -> Dict[str, Address]:
+        """搬移擁有者改變的房間，回傳 room_id -> 新分片"""
+        rooms = set()
+        lost = []  # 已無法連線的舊分片
+        for address in old_ring.nodes:
+            if address in self.ring.nodes or address in self._links:
+                try:
+                    rooms.update(self._link(address).request(("rooms",)) or [])
+                except (OSError, EOFError, queue.Empty) as e:
+                    print(f"查詢分片房間失敗: {str(e)}")
+            else:
+                lost.append(address)
+        if lost:
+            # 離線的分片無法回報持有的房間，改由存檔找出原本屬於它的房間
+            for room_id in self._stored_rooms():
+                if old_ring.node_for(room_id) in lost:
+                    rooms.add(room_id)
+
+        moves: Dict[str, Tuple[Optional[Address], Address]] = {}
+        for room_id in rooms:
+            old, new = old_ring.node_for(room_id), self.ring.node_for(room_id)
+            if new is not None and old != new:
+                moves[room_id] = (old, new)
+
+        # 舊分片仍在環上時先寫回並交出房間；已移除的分片由存檔接手
+        by_old: Dict[Address, List[str]] = {}
+        by_new: Dict[Address, List[str]] = {}
+        for room_id, (old, new) in moves.items():
+            if old in self.ring.nodes or old in self._links:
+                by_old.setdefault(old, []).append(room_id)
+            by_new.setdefault(new, []).append(room_id)
+        for address, room_ids in by_old.items():
+            try:
+                self._link(address).request(("release", room_ids))
+            except (OSError, EOFError, queue.Empty) as e:
+                print(f"分片交出房間失敗: {str(e)}")
+        for address, room_ids in by_new.items():
+            try:
+                self._link(address).request(("adopt", room_ids))
+            except (OSError, EOFError, queue.Empty) as e:
+                print(f"分片接手房間失敗: {str(e)}")
+        return {room_id: new for room_id, (_, new) in moves.items()}
+
+    def _stored_rooms(self) -> List[str]:
+        for address in list(self.ring.nodes):
+            try:
+                return self._link(address).request(("stored",)) or []
+            except (OSError, EOFError, ConnectionError, queue.Empty) as e:
+                print(f"查詢存檔房間失敗: {str(e)}")
+        return []
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {}
+        for address in list(self.ring.nodes):
+            try:
+                stats[f"{address[0]}:{address[1]}"] = self._link(address).request(("stats",), timeout=5)
+            except (OSError, EOFError, queue.Empty) as e:
+                stats[f"{address[0]}:{address[1]}"] = {"error": str(e)}
+        return stats
+
+    def collect_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """各分片的指標快照 {"host:port": snapshot}，無法連線的分片略過"""
+        snapshots = {}
+        for address in list(self.ring.nodes):
+            try:
+                snapshots[f"{address[0]}:{address[1]}"] = self._link(address).request(("metrics",), timeout=5)
+            except (OSError, EOFError, queue.Empty) as e:
+                print(f"讀取分片指標失敗: {str(e)}")
+        return snapshots
+
+    def close(self):
+        self._health_stop.set()
+        with self._lock:
+            for link in self._links.values():
+                link.close()
+            self._links = {}
+
+
+def parse_addresses(value: str) -> List[Address]:
+    """解析 "host:port,host:port" 格式的分片位址"""
+    addresses = []
+    for item in value.split(','):
+        item = item.strip()
+        if item:
+            host, port = item.rsplit(':', 1)
+            addresses.append((host, int(port)))
+    return addresses
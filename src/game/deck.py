@@ -0,0 +1,178 @@
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from ..utils.rng import thread_rng
+from .role import GUARD, HUNTER, ROLE_CODES, ROLE_TYPES, SEER, VILLAGER, WEREWOLF, WITCH, WOLF_KING, RoleType
+
+# special_roles 依序取用的神職；未啟用特殊角色時只使用前三個
+SPECIAL_ROLES = (SEER, WITCH, HUNTER, GUARD)
+BASIC_SPECIAL_ROLES = 3
+# 狼人陣營達到此人數時，其中一位為狼王
+WOLF_KING_THRESHOLD = 4
+# 影響牌組的設定欄位，用來判斷兩份設定能否共用編譯結果
+DECK_KEYS = ("min_players", "max_players", "enable_special_roles", "role_distribution")
+
+
+class DeckError(ValueError):
+    """角色配置設定有誤"""
+
+
+def parse_range(key: str) -> Tuple[int, Optional[int]]:
+    """"6-7" -> (6, 7)，"10+" -> (10, None)，"8" -> (8, 8)"""
+    try:
+        if key.endswith('+'):
+            return int(key[:-1]), None
+        if '-' in key:
+            low, high = key.split('-', 1)
+            return int(low), int(high)
+        return int(key), int(key)
+    except ValueError:
+        raise DeckError(f"無效的人數範圍: {key}")
+
+
+class RoleDeck:
+    """依人數預先編譯好的角色牌組
+
+    table[人數] 為該人數要發的角色代碼，發牌時只需複製後洗牌一次。
+    每個人數區間可設定 {"werewolf": 狼人陣營人數, "special_roles": 神職數}，
+    或以 {"roles": {"狼人": 2, "守衛": 1, ...}} 明確列出角色，其餘皆為平民。
+    """
+
+    __slots__ = ("min_players", "max_players", "table", "spec")
+
+    def __init__(self, min_players: int, max_players: int,
+                 table: Dict[int, Tuple[int, ...]], spec: Dict[str, Any]):
+        self.min_players = min_players
+        self.max_players = max_players
+        self.table = table
+        self.spec = spec  # 編譯前的設定，存檔時保存自訂牌組用
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RoleDeck":
+        spec = {key: config[key] for key in DECK_KEYS if key in config}
+        min_players = spec.get("min_players", 6)
+        max_players = spec.get("max_players", 12)
+        if min_players < 1 or max_players < min_players:
+            raise DeckError(f"無效的人數上下限: {min_players}-{max_players}")
+        special = spec.get("enable_special_roles", True)
+
+        ranges = []
+        for key, entry in spec.get("role_distribution", {}).items():
+            low, high = parse_range(key)
+            ranges.append((low, high if high is not None else max_players, entry))
+
+        table = {}
+        for count in range(min_players, max_players + 1):
+            entries = [entry for low, high, entry in ranges if low <= count <= high]
+            if len(entries) != 1:
+                raise DeckError(f"{count} 人的角色配置{'重複' if entries else '不存在'}")
+            table[count] = cls._compile_entry(count, entries[0], special)
+        return cls(min_players, max_players, table, spec)
+
+    @staticmethod
+    def _compile_entry(count: int, entry: Dict[str, Any], special: bool) -> Tuple[int, ...]:
+        if "roles" in entry:
+            roles = []
+            for name, amount in entry["roles"].items():
+                try:
+                    roles += [ROLE_CODES[RoleType(name)]] * amount
+                except ValueError:
+                    raise DeckError(f"未知的角色: {name}")
+        else:
+            wolves = entry.get("werewolf", 0)
+            if special and wolves >= WOLF_KING_THRESHOLD:
+                roles = [WEREWOLF] * (wolves - 1) + [WOLF_KING]
+            else:
+                roles = [WEREWOLF] * wolves
+            available = SPECIAL_ROLES if special else SPECIAL_ROLES[:BASIC_SPECIAL_ROLES]
+            roles += available[:entry.get("special_roles", 0)]
+
+        wolves = sum(1 for code in roles if code in (WEREWOLF, WOLF_KING))
+        if len(roles) > count:
+            raise DeckError(f"{count} 人的角色數量超過玩家人數")
+        if wolves == 0 or wolves * 2 >= count:
+            raise DeckError(f"{count} 人的狼人數量無效: {wolves}")
+        return tuple(roles) + (VILLAGER,) * (count - len(roles))
+
+    def roles_for(self, player_count: int) -> Optional[Tuple[int, ...]]:
+        return self.table.get(player_count)
+
+    def deal(self, player_count: int, rng=None) -> Optional[List[int]]:
+        """發牌：回傳洗好的角色代碼，人數不在牌組範圍內時回傳 None"""
+        roles = self.table.get(player_count)
+        if roles is None:
+            return None
+        roles = list(roles)
+        (rng or thread_rng()).shuffle(roles)
+        return roles
+
+    def distribution(self, player_count: int) -> Dict[str, int]:
+        """各角色的數量（角色名稱 -> 張數）"""
+        counts: Dict[str, int] = {}
+        for code in self.table.get(player_count, ()):
+            name = ROLE_TYPES[code].value
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+
+def parse_deck_text(text: str, base: Dict[str, Any]) -> Dict[str, Any]:
+    """解析群組指令中的角色配置，例如 "6-8:2/3 9+:3/4" 或 "6-7:狼人1,狼王1,守衛1"
+
+    每段為「人數範圍:狼人數/神職數」或「人數範圍:角色數量,...」；人數上下限取自各段範圍，
+    開放範圍（10+）的上限與是否啟用特殊角色沿用 base 的設定。
+    """
+    distribution: Dict[str, Dict[str, Any]] = {}
+    lows, highs = [], []
+    for part in text.split():
+        key, _, value = part.partition(':')
+        if not value:
+            raise DeckError(f"無效的角色配置: {part}")
+        low, high = parse_range(key)
+        lows.append(low)
+        highs.append(high if high is not None else max(low, base.get("max_players", 12)))
+        if '/' in value:
+            wolves, special = value.split('/', 1)
+            if not (wolves.isdigit() and special.isdigit()):
+                raise DeckError(f"無效的角色配置: {part}")
+            distribution[key] = {"werewolf": int(wolves), "special_roles": int(special)}
+            continue
+        roles: Dict[str, int] = {}
+        for item in value.split(','):
+            match = re.fullmatch(r"(\D+?)(\d+)", item)
+            if not match:
+                raise DeckError(f"無效的角色數量: {item}")
+            roles[match.group(1)] = roles.get(match.group(1), 0) + int(match.group(2))
+        distribution[key] = {"roles": roles}
+    if not distribution:
+        raise DeckError("請指定角色配置，例如 6-8:2/3 9+:3/4")
+    return {
+        "min_players": min(lows),
+        "max_players": max(highs),
+        "enable_special_roles": base.get("enable_special_roles", True),
+        "role_distribution": distribution
+    }
+
+
+# 編譯結果的 LRU 快取；牌組可由 /config 任意設定，只保留最近使用的 DECK_CACHE_SIZE 份
+DECK_CACHE_SIZE = 256
+_decks: "OrderedDict[str, RoleDeck]" = OrderedDict()
+_decks_lock = threading.Lock()
+
+
+def compile_deck(config: Dict[str, Any]) -> RoleDeck:
+    """編譯牌組；相同設定只編譯一次，所有房間共用結果"""
+    key = json.dumps({k: config.get(k) for k in DECK_KEYS}, sort_keys=True, ensure_ascii=False)
+    with _decks_lock:
+        deck = _decks.get(key)
+        if deck is not None:
+            _decks.move_to_end(key)
+            return deck
+    deck = RoleDeck.from_config(config)
+    with _decks_lock:
+        deck = _decks.setdefault(key, deck)
+        _decks.move_to_end(key)
+        while len(_decks) > DECK_CACHE_SIZE:
+            _decks.popitem(last=False)
+    return deck
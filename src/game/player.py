@@ -1,12 +1,23 @@
+from typing import List, Optional
 from .role import Role
 
 class Player:
+    """玩家
+
+    加入房間後 seat 為玩家在房間中的座位（小整數），seats 為房間共用的座位表。
+    投給此玩家的人以座位位元遮罩記錄，不需為每位玩家保留一個串列。
+    """
+
+    __slots__ = ("user_id", "display_name", "role", "is_ready", "seat", "seats", "_voters")
+
     def __init__(self, user_id: str, display_name: str):
         self.user_id = user_id
         self.display_name = display_name
         self.role = None
         self.is_ready = False
-        self.voted_by = []
+        self.seat = -1
+        self.seats: Optional[List[str]] = None
+        self._voters = 0
 
     def set_role(self, role: Role):
         self.role = role
@@ -17,11 +28,36 @@ class Player:
     def toggle_ready(self):
         self.is_ready = not self.is_ready
 
+    def _seat_of(self, user_id: str) -> int:
+        if self.seats is None:
+            # 尚未加入房間的玩家使用自己的座位表
+            self.seats = []
+        try:
+            return self.seats.index(user_id)
+        except ValueError:
+            self.seats.append(user_id)
+            return len(self.seats) - 1
+
     def add_vote(self, voter_id: str):
-        self.voted_by.append(voter_id)
+        self._voters |= 1 << self._seat_of(voter_id)
+
+    def remove_vote(self, voter_id: str):
+        if self.seats and voter_id in self.seats:
+            self._voters &= ~(1 << self.seats.index(voter_id))
+
+    @property
+    def voted_by(self) -> List[str]:
+        voters, seats = self._voters, self.seats
+        return [seats[i] for i in range(voters.bit_length()) if voters >> i & 1]
+
+    @voted_by.setter
+    def voted_by(self, voter_ids: List[str]):
+        self._voters = 0
+        for voter_id in voter_ids:
+            self.add_vote(voter_id)
 
     def clear_votes(self):
-        self.voted_by = []
+        self._voters = 0
 
     def get_vote_count(self) -> int:
-        return len(self.voted_by)
\ No newline at end of file
+        return self._voters.bit_count()
@@ -1,5 +1,6 @@
 from enum import Enum
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Union
 
 class RoleType(Enum):
     VILLAGER = "平民"
@@ -10,47 +11,124 @@ class RoleType(Enum):
     WOLF_KING = "狼王"  # 新增角色
     GUARD = "守衛"      # 新增角色
 
+    @property
+    def code(self) -> int:
+        return ROLE_CODES[self]
+
+# 角色代碼：房間邏輯以小整數比較角色，不需每次查詢 Enum
+VILLAGER, WEREWOLF, SEER, WITCH, HUNTER, WOLF_KING, GUARD = range(7)
+ROLE_TYPES = tuple(RoleType)  # 代碼 -> RoleType
+ROLE_CODES = {role_type: code for code, role_type in enumerate(ROLE_TYPES)}
+WOLF_CODES = frozenset((WEREWOLF, WOLF_KING))
+ONE_SHOT_CODES = frozenset((WITCH, HUNTER))  # 技能只能使用一次的角色
+
+# 沒有特殊效果的角色共用同一個唯讀的空字典
+_NO_EFFECTS: Mapping[str, Any] = MappingProxyType({})
+
 class Role:
-    def __init__(self, role_type: RoleType):
-        self.role_type = role_type
-        self.is_alive = True
-        self.skill_used = False
-        self.protected_by_guard = False
-        self.special_effects = {}  # 存儲特殊效果
+    """角色狀態
+
+    存活、技能已使用、被守衛保護以位元旗標存在 flags 中；
+    特殊效果字典只在第一次加上效果時建立。
+    """
+
+    __slots__ = ("code", "flags", "_effects")
+
+    ALIVE = 1
+    SKILL_USED = 2
+    PROTECTED = 4
+
+    def __init__(self, role_type: Union[RoleType, int]):
+        self.code = role_type if isinstance(role_type, int) else ROLE_CODES[role_type]
+        self.flags = self.ALIVE
+        self._effects = None  # 存儲特殊效果
+
+    @property
+    def role_type(self) -> RoleType:
+        return ROLE_TYPES[self.code]
+
+    @role_type.setter
+    def role_type(self, role_type: RoleType):
+        self.code = ROLE_CODES[role_type]
+
+    def _set_flag(self, flag: int, value: bool):
+        if value:
+            self.flags |= flag
+        else:
+            self.flags &= ~flag
+
+    @property
+    def is_alive(self) -> bool:
+        return bool(self.flags & self.ALIVE)
+
+    @is_alive.setter
+    def is_alive(self, value: bool):
+        self._set_flag(self.ALIVE, value)
+
+    @property
+    def skill_used(self) -> bool:
+        return bool(self.flags & self.SKILL_USED)
+
+    @skill_used.setter
+    def skill_used(self, value: bool):
+        self._set_flag(self.SKILL_USED, value)
+
+    @property
+    def protected_by_guard(self) -> bool:
+        return bool(self.flags & self.PROTECTED)
+
+    @protected_by_guard.setter
+    def protected_by_guard(self, value: bool):
+        self._set_flag(self.PROTECTED, value)
+
+    @property
+    def special_effects(self) -> Mapping[str, Dict[str, Any]]:
+        """目前的特殊效果（唯讀，請以 add_effect 加入）"""
+        return self._effects if self._effects is not None else _NO_EFFECTS
+
+    @special_effects.setter
+    def special_effects(self, effects: Dict[str, Dict[str, Any]]):
+        self._effects = dict(effects) if effects else None
 
     def use_skill(self) -> bool:
         if not self.can_use_skill():
             return False
-        if self.role_type in [RoleType.WITCH, RoleType.HUNTER]:
-            self.skill_used = True
+        if self.code in ONE_SHOT_CODES:
+            self.flags |= self.SKILL_USED
         return True
 
     def can_use_skill(self) -> bool:
-        if not self.is_alive:
+        if not self.flags & self.ALIVE:
             return False
-        if self.role_type in [RoleType.WITCH, RoleType.HUNTER] and self.skill_used:
+        if self.code in ONE_SHOT_CODES and self.flags & self.SKILL_USED:
             return False
         return True
 
     def add_effect(self, effect_name: str, duration: int):
-        self.special_effects[effect_name] = {
+        if self._effects is None:
+            self._effects = {}
+        self._effects[effect_name] = {
             "duration": duration,
             "applied_at": 0
         }
 
     def process_effects(self, current_turn: int):
+        if not self._effects:
+            return
         expired_effects = []
-        for effect, data in self.special_effects.items():
+        for effect, data in self._effects.items():
             if current_turn - data["applied_at"] >= data["duration"]:
                 expired_effects.append(effect)
-        
+
         for effect in expired_effects:
-            del self.special_effects[effect]
+            del self._effects[effect]
+        if not self._effects:
+            self._effects = None
 
     def kill(self):
         """殺死此角色"""
-        self.is_alive = False
+        self.flags &= ~self.ALIVE
 
     def get_role_name(self) -> str:
         """獲取角色名稱"""
-        return self.role_type.value
\ No newline at end of file
+        return ROLE_TYPES[self.code].value
@@ -1,14 +1,36 @@
-from typing import Dict, List, Optional
-import random
+from typing import Any, Callable, Dict, List, Optional
 from .player import Player
-from .role import Role, RoleType
+from .role import (
+    GUARD, HUNTER, SEER, WEREWOLF, WITCH, WOLF_KING, Role, RoleType
+)
 from .state import GameState
+from .deck import DeckError, RoleDeck, compile_deck
+from .vote import TIE_NO_ELIMINATION, VoteTally
 from ..utils.config import GameConfig
+from ..utils.rng import RoomRandom
 
 class GameRoom:
-    def __init__(self, room_id: str):
+    # 常駐房間可能有數千個，以 __slots__ 省去每個實例的 __dict__
+    __slots__ = (
+        "room_id", "players", "seats", "game_state", "day_count", "night_actions", "witch_potion",
+        "current_turn", "delayed_actions", "night_action_count", "is_werewolf_action_time",
+        "config", "deck", "tally", "rng", "event_seq", "on_event", "_replaying", "alive_mask", "_role_masks",
+        "vote_round"
+    )
+
+    # 重播時直接以相同參數呼叫同名方法的事件
+    REPLAYABLE_EVENTS = {
+        "add_player", "remove_player", "toggle_ready", "cast_vote", "retract_vote", "change_deck",
+        "process_night_actions", "start_night_phase", "start_day_phase", "start_voting_phase"
+    }
+
+    def __init__(self, room_id: str, seed: Optional[int] = None):
         self.room_id = room_id
         self.players: Dict[str, Player] = {}
+        self.seats: List[str] = []  # 座位 -> user_id，與 players 的順序相同
+        # 以座位位元遮罩維護的存活玩家與各角色，只在分配角色與死亡時更新
+        self.alive_mask = 0
+        self._role_masks = [0] * len(RoleType)
         self.game_state = GameState.WAITING
         self.day_count = 0
         self.night_actions = {}  # 存儲夜晚行動
@@ -18,52 +40,141 @@ class GameRoom:
         self.night_action_count = 0  # 夜晚行動計數
         self.is_werewolf_action_time = False  # 是否是狼人行動時間
         self.config = GameConfig()  # 遊戲配置
-        self.votes = {}  # 投票記錄
+        self.deck: Optional[RoleDeck] = None  # 群組自訂的角色配置
+        self.tally = VoteTally()  # 投票記錄與計數
+        self.vote_round = 0  # 第幾輪投票（平票重投也算一輪），計時器以此判斷是否仍是同一輪
+        # 房間專用的亂數，種子隨存檔保存，洗牌與隨機事件都可重現
+        self.rng = RoomRandom(seed)
+        # 狀態改變的事件序號與回呼 (room, seq, op, args)，供事件日誌使用
+        self.event_seq = 0
+        self.on_event: Optional[Callable[["GameRoom", int, str, Dict[str, Any]], None]] = None
+        self._replaying = False
+
+    def _emit(self, op: str, **args):
+        self.event_seq += 1
+        if self.on_event and not self._replaying:
+            self.on_event(self, self.event_seq, op, args)
 
     def add_player(self, user_id: str, display_name: str) -> bool:
-        if user_id not in self.players and self.game_state == GameState.WAITING:
-            self.players[user_id] = Player(user_id, display_name)
+        if (user_id not in self.players and self.game_state == GameState.WAITING
+                and len(self.players) < self.active_deck.max_players):
+            self.seat_player(Player(user_id, display_name))
+            self._emit("add_player", user_id=user_id, display_name=display_name)
             return True
         return False
 
     def remove_player(self, user_id: str) -> bool:
         if user_id in self.players and self.game_state == GameState.WAITING:
-            del self.players[user_id]
+            # 等待中沒有投票紀錄，直接讓後面的玩家往前遞補座位
+            player = self.players.pop(user_id)
+            self._untrack(player)
+            seat = player.seat
+            del self.seats[seat]
+            for player in self.players.values():
+                if player.seat > seat:
+                    player.seat -= 1
+            self.alive_mask = self._drop_seat(self.alive_mask, seat)
+            self._role_masks = [self._drop_seat(mask, seat) for mask in self._role_masks]
+            self._emit("remove_player", user_id=user_id)
             return True
         return False
 
+    def seat_player(self, player: Player):
+        """讓玩家入座，players 與 seats 同步加入"""
+        player.seat = len(self.seats)
+        player.seats = self.seats
+        self.seats.append(player.user_id)
+        self.players[player.user_id] = player
+        self._track(player)
+
+    def _track(self, player: Player):
+        if player.role:
+            bit = 1 << player.seat
+            self._role_masks[player.role.code] |= bit
+            if player.role.is_alive:
+                self.alive_mask |= bit
+
+    def _untrack(self, player: Player):
+        if player.role:
+            bit = ~(1 << player.seat)
+            self._role_masks[player.role.code] &= bit
+            self.alive_mask &= bit
+
+    @staticmethod
+    def _drop_seat(mask: int, seat: int) -> int:
+        # 移除座位 seat 的位元，後面的位元往前遞補
+        return (mask & ((1 << seat) - 1)) | (mask >> (seat + 1) << seat)
+
+    def set_player_role(self, player: Player, role: Role):
+        self._untrack(player)
+        player.set_role(role)
+        self._track(player)
+
+    def kill_player(self, player: Player):
+        player.role.kill()
+        self.alive_mask &= ~(1 << player.seat)
+
+    def _seated(self, mask: int) -> List[Player]:
+        seats = self.seats
+        return [self.players[seats[i]] for i in range(mask.bit_length()) if mask >> i & 1]
+
+    def alive_count(self, code: int = None) -> int:
+        """存活人數；指定角色代碼時為該角色的存活人數"""
+        if code is None:
+            return self.alive_mask.bit_count()
+        return (self._role_masks[code] & self.alive_mask).bit_count()
+
+    def alive_wolf_count(self) -> int:
+        return ((self._role_masks[WEREWOLF] | self._role_masks[WOLF_KING]) & self.alive_mask).bit_count()
+
+    def toggle_ready(self, user_id: str) -> bool:
+        if user_id not in self.players:
+            return False
+        self.players[user_id].toggle_ready()
+        self._emit("toggle_ready", user_id=user_id)
+        return True
+
     def assign_roles(self):
-        players_count = len(self.players)
-        if players_count < 6:
+        if not self._assign_roles():
             return False
+        self._emit("assign_roles", roles=self._role_map(), seed=self.rng.seed)
+        return True
 
-        # 根據玩家人數調整角色分配
-        roles = []
-        if players_count <= 7:
-            # 6-7人局：2狼人
-            roles = [RoleType.WEREWOLF] * 2
-        elif players_count <= 9:
-            # 8-9人局：3狼人
-            roles = [RoleType.WEREWOLF] * 3
-        else:
-            # 10人以上：3狼人+1狼王
-            roles = [RoleType.WEREWOLF] * 3 + [RoleType.WOLF_KING]
-
-        # 神職配置
-        roles.extend([
-            RoleType.SEER,
-            RoleType.WITCH,
-            RoleType.HUNTER
-        ])
-
-        # 剩餘玩家為平民
-        while len(roles) < players_count:
-            roles.append(RoleType.VILLAGER)
-
-        random.shuffle(roles)
-        
-        for player, role_type in zip(self.players.values(), roles):
-            player.set_role(Role(role_type))
+    def _role_map(self) -> Dict[str, str]:
+        return {user_id: player.role.role_type.value for user_id, player in self.players.items()}
+
+    def _set_roles(self, roles: Dict[str, str]):
+        for user_id, role_value in roles.items():
+            self.set_player_role(self.players[user_id], Role(RoleType(role_value)))
+
+    @property
+    def active_deck(self) -> RoleDeck:
+        """群組自訂的牌組，沒有時使用遊戲設定的牌組"""
+        return self.deck or self.config.deck
+
+    def set_deck(self, spec: Optional[Dict[str, Any]]):
+        """設定群組自訂的角色配置（格式同 GameConfig），None 為恢復預設；相同設定只編譯一次"""
+        self.deck = compile_deck(spec) if spec else None
+
+    def change_deck(self, spec: Optional[Dict[str, Any]]) -> bool:
+        """等待階段更換角色配置；設定有誤或已加入的人數超過新牌組上限時拋出 DeckError"""
+        if self.game_state != GameState.WAITING:
+            return False
+        deck = compile_deck(spec) if spec else self.config.deck
+        if len(self.players) > deck.max_players:
+            raise DeckError(f"已有 {len(self.players)} 位玩家，超過牌組上限 {deck.max_players} 人")
+        self.set_deck(spec)
+        self._emit("change_deck", spec=spec)
+        return True
+
+    def _assign_roles(self) -> bool:
+        # 依人數查表取得角色後洗牌一次
+        roles = self.active_deck.deal(len(self.players), self.rng.at(self.event_seq + 1))
+        if roles is None:
+            return False
+
+        for player, code in zip(self.players.values(), roles):
+            self.set_player_role(player, Role(code))
 
         return True
 
@@ -71,42 +182,61 @@ class GameRoom:
         if not all(player.is_ready for player in self.players.values()):
             return False
         
-        if not self.assign_roles():
+        if not self._assign_roles():
             return False
 
+        self._begin_game()
+        # 角色分配是隨機的，記錄分配結果讓重播得到相同的房間；
+        # 同時記錄亂數種子，只靠事件日誌重建的房間之後的隨機事件也會一致
+        self._emit("start_game", roles=self._role_map(), seed=self.rng.seed)
+        return True
+
+    def _begin_game(self):
         self.game_state = GameState.NIGHT
         self.day_count = 1
-        return True
+        # 第一晚同樣由狼人先行動
+        self.is_werewolf_action_time = True
 
     def get_alive_players(self) -> List[Player]:
-        return [p for p in self.players.values() if p.is_alive()]
+        return self._seated(self.alive_mask)
 
     def get_werewolves(self) -> List[Player]:
-        return [p for p in self.players.values() 
-                if p.is_alive() and p.role.role_type == RoleType.WEREWOLF]
+        return self._seated(self._role_masks[WEREWOLF] & self.alive_mask)
 
     def use_skill(self, player: Player, target: Player) -> str:
-        if player.role.role_type == RoleType.WEREWOLF:
+        self.rng.at(self.event_seq + 1)
+        result = self._use_skill(player, target)
+        self.night_action_count += 1
+        self._emit("use_skill", user_id=player.user_id, target_id=target.user_id)
+        return result
+
+    def _use_skill(self, player: Player, target: Player) -> str:
+        code = player.role.code
+        if code == WEREWOLF:
             return self.handle_werewolf_kill(player, target)
-        elif player.role.role_type == RoleType.SEER:
+        elif code == SEER:
             return self.handle_seer_check(player, target)
-        elif player.role.role_type == RoleType.WITCH:
+        elif code == WITCH:
             return self.handle_witch_action(player, target)
-        elif player.role.role_type == RoleType.HUNTER:
+        elif code == HUNTER:
             return self.handle_hunter_shoot(player, target)
-        elif player.role.role_type == RoleType.GUARD:
+        elif code == GUARD:
             return self.handle_guard_protect(player, target)
         return "您沒有特殊技能可以使用"
 
     def handle_werewolf_kill(self, player: Player, target: Player) -> str:
-        if target.role.role_type == RoleType.WEREWOLF:
+        if target.role.code == WEREWOLF:
             return "狼人不能殺死自己人！"
         
         self.night_actions["werewolf_kill"] = target.user_id
         return f"你選擇了要殺死 {target.display_name}"
 
     def handle_seer_check(self, player: Player, target: Player) -> str:
-        is_werewolf = target.role.role_type == RoleType.WEREWOLF
+        is_werewolf = target.role.code == WEREWOLF
+        # 查驗結果有機率被干擾而顛倒
+        chance = self.config.config["special_effects"].get("seer_fake_result_chance", 0)
+        if chance and self.rng.random() < chance:
+            is_werewolf = not is_werewolf
         self.night_actions["seer_check"] = True
         return f"你查驗的結果是：{target.display_name} 是{'狼人' if is_werewolf else '好人'}"
 
@@ -149,6 +279,10 @@ class GameRoom:
         return f"你選擇保護 {target.display_name}"
 
     def process_night_actions(self):
+        self._resolve_night_actions()
+        self._emit("process_night_actions")
+
+    def _resolve_night_actions(self):
         self.current_turn += 1
         
         # 處理守衛保護
@@ -164,7 +298,7 @@ class GameRoom:
             # 檢查是否被守衛保護
             if not target.role.protected_by_guard:
                 if "witch_save" not in self.night_actions or self.night_actions["witch_save"] != target_id:
-                    target.role.kill()
+                    self.kill_player(target)
 
         # 處理女巫毒藥
         if "witch_kill" in self.night_actions:
@@ -175,7 +309,7 @@ class GameRoom:
                     "execute_turn": self.current_turn + self.config.config["special_effects"]["witch_poison_delay"]
                 })
             else:
-                self.players[self.night_actions["witch_kill"]].role.kill()
+                self.kill_player(self.players[self.night_actions["witch_kill"]])
 
         # 處理延遲的動作
         self._process_delayed_actions()
@@ -192,47 +326,78 @@ class GameRoom:
             if action["execute_turn"] <= self.current_turn:
                 if action["type"] == "poison":
                     target = self.players[action["target"]]
-                    target.role.kill()
+                    self.kill_player(target)
             else:
                 remaining_actions.append(action)
         self.delayed_actions = remaining_actions
 
-    def cast_vote(self, voter_id: str, target_id: str):
-        if voter_id in self.players and target_id in self.players:
-            self.players[target_id].add_vote(voter_id)
-            self.votes[voter_id] = target_id
+    @property
+    def votes(self) -> Dict[str, str]:
+        """voter_id -> target_id"""
+        return self.tally.votes
 
-    def process_votes(self) -> Optional[Player]:
-        max_votes = 0
-        eliminated_player = None
-        
-        for player in self.players.values():
-            if player.get_vote_count() > max_votes:
-                max_votes = player.get_vote_count()
-                eliminated_player = player
-            player.clear_votes()
+    @votes.setter
+    def votes(self, votes: Dict[str, str]):
+        self.tally.reset(votes)
+
+    def cast_vote(self, voter_id: str, target_id: str) -> bool:
+        """投票或改票；重新投票時只能投給平票的候選人"""
+        if voter_id not in self.players or target_id not in self.players:
+            return False
+        if not self.tally.allows(target_id):
+            return False
+        previous = self.tally.cast(voter_id, target_id)
+        if previous == target_id:
+            return True
+        if previous is not None:
+            self.players[previous].remove_vote(voter_id)
+        self.players[target_id].add_vote(voter_id)
+        self._emit("cast_vote", voter_id=voter_id, target_id=target_id)
+        return True
+
+    def retract_vote(self, voter_id: str) -> bool:
+        previous = self.tally.retract(voter_id)
+        if previous is None:
+            return False
+        self.players[previous].remove_vote(voter_id)
+        self._emit("retract_vote", voter_id=voter_id)
+        return True
+
+    @property
+    def vote_candidates(self) -> Optional[List[str]]:
+        """平票後重新投票的候選人（依座位順序），沒有重新投票時為 None"""
+        candidates = self.tally.candidates
+        if candidates is None:
+            return None
+        return [user_id for user_id in self.seats if user_id in candidates]
 
+    def process_votes(self) -> Optional[Player]:
+        """結算投票；平票時依 vote_tie_policy 處理，需要重新投票時回傳 None 並設定候選人"""
+        policy = self.config.config.get("vote_tie_policy", TIE_NO_ELIMINATION)
+        eliminated_id, candidates = self.tally.resolve(policy, self.rng.at(self.event_seq + 1))
+        return self._apply_vote_result(eliminated_id, candidates)
+
+    def _apply_vote_result(self, eliminated_id: Optional[str], candidates) -> Optional[Player]:
+        for target_id in self.tally.counts:
+            self.players[target_id].clear_votes()
+        eliminated_player = self.players.get(eliminated_id) if eliminated_id else None
         if eliminated_player:
-            eliminated_player.role.kill()
-        
-        # 清空投票記錄
-        self.votes.clear()
+            self.kill_player(eliminated_player)
 
+        # 清空投票記錄
+        self.tally.clear()
+        self.tally.candidates = set(candidates) if candidates else None
+        # 隨機處決的結果也一併記錄，重播時得到相同的房間
+        self._emit("process_votes", eliminated=eliminated_id, candidates=self.vote_candidates)
         return eliminated_player
 
     def check_game_end(self) -> Optional[str]:
-        werewolves = len([p for p in self.players.values() 
-                          if p.is_alive() and p.role.role_type in 
-                          [RoleType.WEREWOLF, RoleType.WOLF_KING]])
-        villagers = len([p for p in self.players.values() 
-                        if p.is_alive() and p.role.role_type not in 
-                        [RoleType.WEREWOLF, RoleType.WOLF_KING]])
-        
+        werewolves = self.alive_wolf_count()
+        villagers = self.alive_count() - werewolves
+
         # 特殊勝利條件：獵人復仇
-        hunter_revenge = any(p for p in self.players.values()
-                            if not p.is_alive() and 
-                            p.role.role_type == RoleType.HUNTER and 
-                            "hunter_shoot" in self.night_actions)
+        hunter_dead = self._role_masks[HUNTER] & ~self.alive_mask
+        hunter_revenge = bool(hunter_dead) and "hunter_shoot" in self.night_actions
 
         if werewolves == 0 or hunter_revenge:
             return "好人陣營"
@@ -249,29 +414,61 @@ class GameRoom:
         self.game_state = GameState.NIGHT
         self.day_count += 1
         self.night_actions.clear()
+        self.tally.candidates = None
         self.night_action_count = 0
         self.is_werewolf_action_time = True
+        self._emit("start_night_phase")
 
     def start_day_phase(self):
         """處理夜晚結束，進入白天"""
-        self.process_night_actions()
+        self._resolve_night_actions()
         self.game_state = GameState.DAY
         self.night_action_count = 0
         self.is_werewolf_action_time = False
+        self._emit("start_day_phase")
+
+    def start_voting_phase(self):
+        self.game_state = GameState.VOTING
+        self.vote_round += 1
+        self._emit("start_voting_phase")
+
+    def apply_event(self, seq: int, op: str, args: Dict[str, Any]):
+        """重播事件日誌中的一筆紀錄（不會再觸發 on_event）"""
+        self._replaying = True
+        # 與原本的呼叫使用相同的事件序號，亂數也會定位到相同的位置
+        self.event_seq = seq - 1
+        try:
+            if op in ("assign_roles", "start_game"):
+                if "seed" in args:
+                    self.rng = RoomRandom(args["seed"])
+                self._set_roles(args["roles"])
+                if op == "start_game":
+                    self._begin_game()
+            elif op == "process_votes":
+                if "eliminated" in args:
+                    self._apply_vote_result(args["eliminated"], args.get("candidates"))
+                else:
+                    self.process_votes()
+            elif op == "use_skill":
+                self.use_skill(self.players[args["user_id"]], self.players[args["target_id"]])
+            elif op in self.REPLAYABLE_EVENTS:
+                getattr(self, op)(**args)
+            else:
+                raise ValueError(f"未知的事件: {op}")
+        finally:
+            self._replaying = False
+        self.event_seq = seq
 
     def check_night_complete(self) -> bool:
         """檢查夜晚階段是否完成"""
         required_actions = set()
         
         # 檢查狼人是否行動
-        werewolves = self.get_werewolves()
-        if werewolves:
+        if self.alive_count(WEREWOLF):
             required_actions.add("werewolf_kill")
-        
+
         # 檢查預言家是否行動
-        seer = [p for p in self.players.values() 
-                if p.is_alive() and p.role.role_type == RoleType.SEER]
-        if seer:
+        if self.alive_count(SEER):
             required_actions.add("seer_check")
         
         # 女巫和獵人的行動是可選的
@@ -279,15 +476,9 @@ class GameRoom:
 
     def check_voting_complete(self) -> bool:
         """檢查投票是否完成"""
-        alive_players = self.get_alive_players()
-        voted_players = set(self.votes.keys())
-        
         # 所有存活玩家都已投票
-        return len(voted_players) >= len(alive_players)
+        return len(self.votes) >= self.alive_count()
 
     def get_vote_results(self) -> Dict[str, int]:
         """獲得投票結果統計"""
-        vote_counts = {}
-        for target_id in self.votes.values():
-            vote_counts[target_id] = vote_counts.get(target_id, 0) + 1
-        return vote_counts
\ No newline at end of file
+        return dict(self.tally.counts)
\ No newline at end of file
@@ -0,0 +1,108 @@
+from typing import Dict, Optional, Set, Tuple
+from ..utils.rng import thread_rng
+
+# 平票處理方式
+TIE_NO_ELIMINATION = "none"  # 平票無人出局
+TIE_REVOTE = "revote"  # 平票者之間重新投票一次，再平票則無人出局
+TIE_RANDOM = "random"  # 平票者中隨機處決一人
+TIE_POLICIES = (TIE_NO_ELIMINATION, TIE_REVOTE, TIE_RANDOM)
+
+_EMPTY: Set[str] = frozenset()
+
+
+class VoteTally:
+    """投票計數
+
+    votes 記錄每位投票者目前投給誰，counts 為每位被投票者的票數，
+    buckets 依票數分組被投票者。投票、改票與撤票都只移動一位被投票者
+    所在的分組，最高票數與平票名單隨時可直接取得，不需重新計票。
+    重新投票時 candidates 為可投票的對象。
+    """
+
+    __slots__ = ("votes", "counts", "buckets", "max_count", "candidates")
+
+    def __init__(self, votes: Dict[str, str] = None):
+        self.votes: Dict[str, str] = {}  # voter_id -> target_id
+        self.counts: Dict[str, int] = {}  # target_id -> 票數
+        self.buckets: Dict[int, Set[str]] = {}  # 票數 -> target_id
+        self.max_count = 0
+        self.candidates: Optional[Set[str]] = None
+        if votes:
+            self.reset(votes)
+
+    def reset(self, votes: Dict[str, str]):
+        """以既有的投票紀錄重建計數"""
+        self.clear()
+        for voter_id, target_id in votes.items():
+            self.cast(voter_id, target_id)
+
+    def clear(self):
+        self.votes = {}
+        self.counts = {}
+        self.buckets = {}
+        self.max_count = 0
+
+    def _move(self, target_id: str, delta: int):
+        count = self.counts.get(target_id, 0)
+        if count:
+            bucket = self.buckets[count]
+            bucket.discard(target_id)
+            if not bucket:
+                del self.buckets[count]
+        count += delta
+        if count:
+            self.counts[target_id] = count
+            self.buckets.setdefault(count, set()).add(target_id)
+            if count > self.max_count:
+                self.max_count = count
+        else:
+            del self.counts[target_id]
+        # 票數每次只變動 1，最高票的分組清空時下一個分組一定存在（或已無票）
+        if self.max_count not in self.buckets:
+            self.max_count = max(self.max_count - 1, 0)
+
+    def allows(self, target_id: str) -> bool:
+        return self.candidates is None or target_id in self.candidates
+
+    def cast(self, voter_id: str, target_id: str) -> Optional[str]:
+        """投票或改票，回傳原本投給的對象"""
+        previous = self.votes.get(voter_id)
+        if previous == target_id:
+            return previous
+        if previous is not None:
+            self._move(previous, -1)
+        self.votes[voter_id] = target_id
+        self._move(target_id, 1)
+        return previous
+
+    def retract(self, voter_id: str) -> Optional[str]:
+        """撤回投票，回傳原本投給的對象"""
+        previous = self.votes.pop(voter_id, None)
+        if previous is not None:
+            self._move(previous, -1)
+        return previous
+
+    def count(self, target_id: str) -> int:
+        return self.counts.get(target_id, 0)
+
+    @property
+    def leaders(self) -> Set[str]:
+        """目前最高票的對象（可能多於一人）"""
+        return self.buckets.get(self.max_count, _EMPTY)
+
+    def is_tie(self) -> bool:
+        return len(self.leaders) > 1
+
+    def resolve(self, policy: str = TIE_NO_ELIMINATION,
+                rng=None) -> Tuple[Optional[str], Optional[Set[str]]]:
+        """結算投票，回傳 (被處決者, 需要重新投票的候選人)"""
+        leaders = self.leaders
+        if not leaders:
+            return None, None
+        if len(leaders) == 1:
+            return next(iter(leaders)), None
+        if policy == TIE_RANDOM:
+            return (rng or thread_rng()).choice(sorted(leaders)), None
+        if policy == TIE_REVOTE and self.candidates is None:
+            return None, set(leaders)
+        return None, None
@@ -0,0 +1,39 @@
+"""
+分片行程 - 依 SHARD_ADDRESSES 在本機啟動持有房間的分片
+
+用法：
+    python -m src.shard        啟動 SHARD_ADDRESSES 中所有的分片（每個分片一個行程）
+    python -m src.shard 1      只啟動第 2 個位址的分片
+"""
+import multiprocessing
+import sys
+from src.bot.factory import create_message_handler
+from src.bot.sharding import Address, ShardServer, parse_addresses
+from src.utils.config import Config
+
+
+def run_shard(address: Address):
+    config = Config()
+    server = ShardServer(create_message_handler(config), address, config.SHARD_AUTHKEY)
+    print(f"分片已啟動: {address[0]}:{address[1]}")
+    server.serve_forever()
+
+
+def main():
+    addresses = parse_addresses(Config().SHARD_ADDRESSES)
+    if not addresses:
+        print("請設定 SHARD_ADDRESSES")
+        sys.exit(1)
+    if len(sys.argv) > 1:
+        run_shard(addresses[int(sys.argv[1])])
+        return
+
+    processes = [multiprocessing.Process(target=run_shard, args=(address,)) for address in addresses]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# src/sim/__init__.py
@@ -0,0 +1,61 @@
+"""
+遊戲模擬器 - 以機器人玩家大量進行完整遊戲，統計各人數牌組的勝率
+
+用法：
+    python -m src.sim --games 10000                  預設牌組 6-12 人各 10000 局
+    python -m src.sim --players 8-9 --policy informed --tie-policy revote
+    python -m src.sim --deck my_config.json --workers 4
+    python -m src.sim --engine numpy --games 1000000   以 NumPy 陣列整批模擬（需安裝 numpy）
+"""
+import argparse
+import json
+import os
+import time
+from src.game.deck import parse_range
+from src.sim.policy import POLICIES
+from src.sim.simulator import format_report, simulate
+from src.sim.vector import simulate_vectorized
+from src.utils.config import GameConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description="狼人殺遊戲模擬器")
+    parser.add_argument("--games", type=int, default=1000, help="每個人數的模擬局數")
+    parser.add_argument("--players", default=None, help="人數範圍，例如 6-12 或 8（預設為牌組支援的所有人數）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="工作行程數")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--deck", default=None, help="角色配置 JSON 檔（格式同 game_config.json）")
+    parser.add_argument("--tie-policy", default=None, help="平票處理：none / revote / random")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=("room", "numpy"), default="room",
+                        help="room 逐局操作 GameRoom，numpy 以陣列整批模擬")
+    args = parser.parse_args()
+
+    deck = None
+    if args.deck:
+        with open(args.deck, 'r', encoding='utf-8') as f:
+            deck = json.load(f)
+    spec = deck or GameConfig().config
+    if args.players:
+        low, high = parse_range(args.players)
+    else:
+        low, high = spec.get("min_players", 6), spec.get("max_players", 12)
+    rules = {"vote_tie_policy": args.tie_policy} if args.tie_policy else None
+
+    player_counts = range(low, (high or low) + 1)
+    start = time.perf_counter()
+    if args.engine == "numpy":
+        results = simulate_vectorized(player_counts, args.games, args.policy, deck, rules, args.seed)
+        args.workers = 1
+    else:
+        results = simulate(player_counts, args.games, args.workers, args.policy, deck, rules, args.seed)
+    elapsed = time.perf_counter() - start
+
+    print(format_report(results))
+    total = sum(stats.games for stats in results.values())
+    print(f"共 {total:,} 局，{elapsed:.2f} 秒，{total / elapsed:,.0f} 局/秒"
+          f"（{args.workers} 個行程，每核心 {total / elapsed / args.workers:,.0f} 局/秒）")
+
+
+if __name__ == "__main__":
+    main()
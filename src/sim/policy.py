@@ -0,0 +1,126 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Type
+from ..game.player import Player
+from ..game.role import GUARD, SEER, WEREWOLF, WITCH, WOLF_CODES
+from ..game.room import GameRoom
+from ..utils.rng import RoomRandom
+
+
+class Policy(ABC):
+    """機器人玩家的行動策略
+
+    每局建立一個實例，可以保存該局的記憶（例如預言家查驗過的結果）。
+    night_target 回傳夜晚技能的對象（None 表示不行動），vote 回傳投票對象。
+    """
+
+    def __init__(self, rng: RoomRandom):
+        self.rng = rng
+
+    @abstractmethod
+    def night_target(self, room: GameRoom, player: Player) -> Optional[Player]:
+        pass
+
+    @abstractmethod
+    def vote(self, room: GameRoom, player: Player) -> Optional[Player]:
+        pass
+
+    def learn(self, room: GameRoom, player: Player, target: Player, result: str):
+        """技能使用後的回覆，例如預言家的查驗結果"""
+
+    def _pick(self, players: List[Player]) -> Optional[Player]:
+        return self.rng.choice(players) if players else None
+
+    @staticmethod
+    def _others(room: GameRoom, player: Player) -> List[Player]:
+        return [p for p in room.get_alive_players() if p is not player]
+
+    @staticmethod
+    def _villagers(room: GameRoom) -> List[Player]:
+        return [p for p in room.get_alive_players() if p.role.code not in WOLF_CODES]
+
+
+class RandomPolicy(Policy):
+    """狼人隨機殺好人，其餘角色隨機選擇對象；女巫救被殺的人，毒藥隨機使用"""
+
+    POISON_CHANCE = 0.3
+
+    def night_target(self, room: GameRoom, player: Player) -> Optional[Player]:
+        code = player.role.code
+        if code == WEREWOLF:
+            return self._pick(self._villagers(room))
+        if code == SEER:
+            return self._pick(self._others(room, player))
+        if code == GUARD:
+            return self._pick(room.get_alive_players())
+        if code == WITCH:
+            return self.witch_target(room, player)
+        return None
+
+    def witch_target(self, room: GameRoom, player: Player) -> Optional[Player]:
+        killed = room.night_actions.get("werewolf_kill")
+        if killed and room.witch_potion["heal"]:
+            return room.players[killed]
+        if room.witch_potion["poison"] and self.rng.random() < self.POISON_CHANCE:
+            return self._pick(self._others(room, player))
+        return None
+
+    def vote(self, room: GameRoom, player: Player) -> Optional[Player]:
+        if player.role.code in WOLF_CODES:
+            choices = self._villagers(room)
+        else:
+            choices = self._others(room, player)
+        candidates = room.vote_candidates
+        if candidates is not None:
+            choices = [p for p in choices if p.user_id in candidates] or \
+                [room.players[user_id] for user_id in candidates]
+        return self._pick(choices)
+
+
+class InformedPolicy(RandomPolicy):
+    """預言家公開查驗結果：好人優先投票與毒殺已知的狼人，守衛守護預言家"""
+
+    def __init__(self, rng: RoomRandom):
+        super().__init__(rng)
+        self.checked: Dict[str, bool] = {}  # user_id -> 查驗結果是否為狼人
+
+    def night_target(self, room: GameRoom, player: Player) -> Optional[Player]:
+        code = player.role.code
+        if code == SEER:
+            unchecked = [p for p in self._others(room, player) if p.user_id not in self.checked]
+            return self._pick(unchecked)
+        if code == GUARD:
+            seers = [p for p in room.get_alive_players() if p.role.code == SEER]
+            if seers and room.night_actions.get("last_guard_protect") != seers[0].user_id:
+                return seers[0]
+        return super().night_target(room, player)
+
+    def witch_target(self, room: GameRoom, player: Player) -> Optional[Player]:
+        killed = room.night_actions.get("werewolf_kill")
+        if killed and room.witch_potion["heal"]:
+            return room.players[killed]
+        if room.witch_potion["poison"]:
+            return self._pick(self._suspects(room))
+        return None
+
+    def learn(self, room: GameRoom, player: Player, target: Player, result: str):
+        if player.role.code == SEER:
+            self.checked[target.user_id] = result.endswith("狼人")
+
+    def _suspects(self, room: GameRoom) -> List[Player]:
+        return [p for p in room.get_alive_players() if self.checked.get(p.user_id)]
+
+    def vote(self, room: GameRoom, player: Player) -> Optional[Player]:
+        if player.role.code not in WOLF_CODES:
+            suspects = [p for p in self._suspects(room) if p is not player]
+            candidates = room.vote_candidates
+            if candidates is not None:
+                suspects = [p for p in suspects if p.user_id in candidates]
+            if suspects:
+                return suspects[0]
+        return super().vote(room, player)
+
+
+POLICIES: Dict[str, Type[Policy]] = {
+    "random": RandomPolicy,
+    "informed": InformedPolicy,
+}
@@ -0,0 +1,177 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from ..game.role import GUARD, SEER, WEREWOLF, WITCH
+from ..game.room import GameRoom
+from ..utils.config import GameConfig
+from ..utils.rng import RoomRandom
+from .policy import POLICIES, Policy
+
+VILLAGE = "好人陣營"
+WEREWOLVES = "狼人陣營"
+DRAW = "平手"
+OUTCOMES = (VILLAGE, WEREWOLVES, DRAW)
+# 超過此天數仍未分出勝負視為平手（例如只剩沒有夜晚技能的狼王）
+MAX_DAYS = 30
+# 夜晚行動順序：守衛、狼人、預言家，女巫最後才知道誰被殺
+NIGHT_ORDER = (GUARD, WEREWOLF, SEER, WITCH)
+# 每個工作行程一次執行的局數
+CHUNK_SIZE = 250
+# 策略使用與房間不同的亂數序列
+_POLICY_SALT = 0x5EED5EED5EED5EED
+
+
+def wilson_interval(successes: int, trials: int, z: float = 1.96) -> Tuple[float, float]:
+    """勝率的 Wilson 信賴區間（預設 95%）"""
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+class DeckStats:
+    """同一人數（同一副牌組）的模擬結果"""
+
+    __slots__ = ("player_count", "games", "wins", "days")
+
+    def __init__(self, player_count: int):
+        self.player_count = player_count
+        self.games = 0
+        self.wins = dict.fromkeys(OUTCOMES, 0)
+        self.days = 0  # 所有局數的天數總和
+
+    def add(self, winner: str, days: int):
+        self.games += 1
+        self.wins[winner] += 1
+        self.days += days
+
+    def merge(self, other: "DeckStats"):
+        self.games += other.games
+        for outcome, count in other.wins.items():
+            self.wins[outcome] += count
+        self.days += other.days
+
+    def win_rate(self, outcome: str) -> float:
+        return self.wins[outcome] / self.games if self.games else 0.0
+
+    def interval(self, outcome: str) -> Tuple[float, float]:
+        return wilson_interval(self.wins[outcome], self.games)
+
+    @property
+    def average_days(self) -> float:
+        return self.days / self.games if self.games else 0.0
+
+
+def _play_night(room: GameRoom, policy: Policy):
+    alive = room.get_alive_players()
+    for code in NIGHT_ORDER:
+        actors = [player for player in alive if player.role.code == code]
+        # 狼人討論後由一人代表出刀
+        for player in actors[:1] if code == WEREWOLF else actors:
+            target = policy.night_target(room, player)
+            if target is not None:
+                policy.learn(room, player, target, room.use_skill(player, target))
+
+
+def _play_vote(room: GameRoom, policy: Policy):
+    while True:
+        for voter in room.get_alive_players():
+            target = policy.vote(room, voter)
+            if target is not None:
+                room.cast_vote(voter.user_id, target.user_id)
+        room.process_votes()
+        # 平票重新投票時 vote_candidates 會設定候選人
+        if room.vote_candidates is None:
+            return
+
+
+def play_game(player_count: int, seed: int, policy: str = "random",
+              deck: Optional[Dict[str, Any]] = None,
+              config: Optional[GameConfig] = None) -> Tuple[str, int]:
+    """以機器人玩家完整進行一局，回傳 (勝利陣營, 天數)；相同參數的結果相同"""
+    room = GameRoom("simulation", seed)
+    if config is not None:
+        room.config = config
+    room.set_deck(deck)
+    if room.active_deck.roles_for(player_count) is None:
+        raise ValueError(f"牌組不支援 {player_count} 人")
+    for seat in range(player_count):
+        room.add_player(f"bot_{seat}", f"Bot {seat}")
+        room.toggle_ready(f"bot_{seat}")
+    room.start_game()
+    bot = POLICIES[policy](RoomRandom(seed ^ _POLICY_SALT))
+
+    while room.day_count <= MAX_DAYS:
+        _play_night(room, bot)
+        room.start_day_phase()
+        winner = room.check_game_end()
+        if winner:
+            return winner, room.day_count
+        room.start_voting_phase()
+        _play_vote(room, bot)
+        winner = room.check_game_end()
+        if winner:
+            return winner, room.day_count
+        room.start_night_phase()
+    return DRAW, MAX_DAYS
+
+
+def run_batch(player_count: int, first_seed: int, games: int, policy: str = "random",
+              deck: Optional[Dict[str, Any]] = None,
+              rules: Optional[Dict[str, Any]] = None) -> DeckStats:
+    """連續模擬 games 局（種子為 first_seed 起算），工作行程的執行單位"""
+    config = GameConfig()
+    if rules:
+        config.config = dict(config.config, **rules)
+    stats = DeckStats(player_count)
+    for seed in range(first_seed, first_seed + games):
+        stats.add(*play_game(player_count, seed, policy, deck, config))
+    return stats
+
+
+def _run_task(task: Tuple) -> DeckStats:
+    return run_batch(*task)
+
+
+def simulate(player_counts: Iterable[int], games: int, workers: int = None,
+             policy: str = "random", deck: Optional[Dict[str, Any]] = None,
+             rules: Optional[Dict[str, Any]] = None, seed: int = 0) -> Dict[int, DeckStats]:
+    """每個人數模擬 games 局，分批交給行程池並行執行；workers=1 時在目前行程執行
+
+    第 n 局的種子為 seed + n，結果與 workers 數量無關。
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"未知的策略: {policy}")
+    tasks: List[Tuple] = []
+    results: Dict[int, DeckStats] = {}
+    for player_count in player_counts:
+        results[player_count] = DeckStats(player_count)
+        for start in range(0, games, CHUNK_SIZE):
+            tasks.append((player_count, seed + start, min(CHUNK_SIZE, games - start), policy, deck, rules))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for stats in map(_run_task, tasks):
+            results[stats.player_count].merge(stats)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for stats in pool.map(_run_task, tasks):
+                results[stats.player_count].merge(stats)
+    return results
+
+
+def format_report(results: Dict[int, DeckStats]) -> str:
+    lines = []
+    for player_count, stats in sorted(results.items()):
+        parts = [f"{player_count:>2} 人 {stats.games:,} 局"]
+        for outcome in (VILLAGE, WEREWOLVES):
+            low, high = stats.interval(outcome)
+            parts.append(f"{outcome} {stats.win_rate(outcome):6.1%} [{low:.1%}, {high:.1%}]")
+        parts.append(f"{DRAW} {stats.wins[DRAW]}")
+        parts.append(f"平均 {stats.average_days:.1f} 天")
+        lines.append("  ".join(parts))
+    return "\n".join(lines)
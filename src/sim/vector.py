@@ -0,0 +1,228 @@
+from typing import Any, Dict, Iterable, Optional
+from ..game.deck import compile_deck
+from ..game.role import GUARD, SEER, WEREWOLF, WITCH, WOLF_CODES
+from ..game.vote import TIE_NO_ELIMINATION, TIE_RANDOM, TIE_REVOTE
+from ..utils.config import GameConfig
+from .policy import InformedPolicy, POLICIES, RandomPolicy
+from .simulator import MAX_DAYS, OUTCOMES, DeckStats
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy 為選用依賴
+    np = None
+
+# OUTCOMES 的索引
+_VILLAGE, _WEREWOLVES, _DRAW = range(3)
+# 每批同時模擬的局數，限制陣列大小
+BATCH_SIZE = 50000
+
+
+class BatchGames:
+    """以 NumPy 陣列同時進行 N 局相同人數的遊戲
+
+    每局一列、每個座位一欄：roles 為角色代碼，alive 為存活狀態，
+    另以一維陣列保存藥水、延遲毒殺、天數與勝負。夜晚與投票都以整批的
+    陣列運算進行，規則與 GameRoom 搭配 simulator 的機器人策略相同，
+    所以相同的牌組與規則下勝率分布與逐局模擬一致。
+    """
+
+    def __init__(self, roles, games: int, rng, policy: str = "random",
+                 rules: Optional[Dict[str, Any]] = None):
+        if np is None:
+            raise RuntimeError("向量化模擬需要安裝 numpy")
+        if POLICIES.get(policy) not in (RandomPolicy, InformedPolicy):
+            raise ValueError(f"向量化模擬不支援的策略: {policy}")
+        rules = rules or GameConfig.DEFAULT_CONFIG
+        effects = rules["special_effects"]
+        self.poison_delay = effects.get("witch_poison_delay", 0)
+        self.fake_chance = effects.get("seer_fake_result_chance", 0)
+        self.tie_policy = rules.get("vote_tie_policy", TIE_NO_ELIMINATION)
+        self.informed = policy == "informed"
+        self.rng = rng
+
+        self.rows = np.arange(games)
+        self.roles = rng.permuted(np.tile(np.array(roles, dtype=np.int8), (games, 1)), axis=1)
+        self.is_wolf = np.isin(self.roles, list(WOLF_CODES))
+        self.alive = np.ones(self.roles.shape, dtype=bool)
+        self.heal = np.ones(games, dtype=bool)
+        self.poison = np.ones(games, dtype=bool)
+        self.pending_target = np.full(games, -1)  # 延遲生效的毒殺對象
+        self.pending_turn = np.zeros(games, dtype=np.int32)
+        self.turn = np.zeros(games, dtype=np.int32)
+        self.day = np.ones(games, dtype=np.int32)
+        self.active = np.ones(games, dtype=bool)
+        self.winner = np.full(games, _DRAW, dtype=np.int8)
+        self.days = np.full(games, MAX_DAYS, dtype=np.int32)
+        # informed 策略：預言家已查驗的座位與查驗結果
+        self.checked = np.zeros(self.roles.shape, dtype=bool)
+        self.suspect = np.zeros(self.roles.shape, dtype=bool)
+
+    def _pick(self, mask):
+        """每列在 mask 為 True 的座位中均勻選一個，沒有可選時為 -1"""
+        keys = self.rng.random(mask.shape)
+        keys[~mask] = -1.0
+        seats = keys.argmax(axis=1)
+        seats[~mask.any(axis=1)] = -1
+        return seats
+
+    @staticmethod
+    def _first(mask):
+        """每列第一個為 True 的座位，沒有時為 -1"""
+        seats = mask.argmax(axis=1)
+        seats[~mask.any(axis=1)] = -1
+        return seats
+
+    def _without(self, mask, seats):
+        """mask 中移除每列指定的座位（-1 不移除）"""
+        mask = mask.copy()
+        valid = seats >= 0
+        mask[self.rows[valid], seats[valid]] = False
+        return mask
+
+    def _kill(self, games, seats):
+        self.alive[self.rows[games], seats[games]] = False
+
+    def play_night(self):
+        alive, act = self.alive, self.active
+        alive_seer = self._first(alive & (self.roles == SEER))
+
+        # 守衛
+        guard = self._first(alive & (self.roles == GUARD))
+        protect = self._pick(alive)
+        if self.informed:
+            protect = np.where(alive_seer >= 0, alive_seer, protect)
+        protect[~(act & (guard >= 0))] = -1
+
+        # 狼人由一人代表出刀，狼王沒有夜晚技能
+        wolf = self._first(alive & (self.roles == WEREWOLF))
+        kill = self._pick(alive & ~self.is_wolf)
+        kill[~(act & (wolf >= 0))] = -1
+
+        # 預言家查驗，只影響 informed 策略
+        if self.informed:
+            target = self._pick(self._without(alive, alive_seer) & ~self.checked)
+            checks = act & (alive_seer >= 0) & (target >= 0)
+            result = self.roles[self.rows, target] == WEREWOLF
+            if self.fake_chance:
+                result ^= self.rng.random(len(result)) < self.fake_chance
+            games, seats = self.rows[checks], target[checks]
+            self.checked[games, seats] = True
+            self.suspect[games, seats] = result[checks]
+
+        # 女巫先救被殺的人，否則可能使用毒藥
+        witch = self._first(alive & (self.roles == WITCH))
+        has_witch = act & (witch >= 0)
+        save = has_witch & (kill >= 0) & self.heal
+        self.heal[save] = False
+        if self.informed:
+            poisoned = self._pick(alive & self.suspect)
+            use = has_witch & ~save & self.poison & (poisoned >= 0)
+        else:
+            poisoned = self._pick(self._without(alive, witch))
+            chance = self.rng.random(len(poisoned)) < RandomPolicy.POISON_CHANCE
+            use = has_witch & ~save & self.poison & chance & (poisoned >= 0)
+        self.poison[use] = False
+
+        # 結算（對應 GameRoom._resolve_night_actions）
+        self.turn[act] += 1
+        self._kill((kill >= 0) & ~save & (kill != protect), kill)
+        if self.poison_delay > 0:
+            self.pending_target[use] = poisoned[use]
+            self.pending_turn[use] = self.turn[use] + self.poison_delay
+        else:
+            self._kill(use, poisoned)
+        due = act & (self.pending_target >= 0) & (self.pending_turn <= self.turn)
+        self._kill(due, self.pending_target)
+        self.pending_target[due] = -1
+
+    def check_game_end(self):
+        alive = self.alive.sum(axis=1)
+        wolves = (self.alive & self.is_wolf).sum(axis=1)
+        village = self.active & (wolves == 0)
+        werewolves = self.active & ~village & (wolves >= alive - wolves)
+        self.winner[village] = _VILLAGE
+        self.winner[werewolves] = _WEREWOLVES
+        ended = village | werewolves
+        self.days[ended] = self.day[ended]
+        self.active &= ~ended
+
+    def _vote_round(self, voting, candidates=None):
+        """voting 中的每局由存活玩家依座位順序投票，回傳每局各座位的票數"""
+        counts = np.zeros(self.roles.shape, dtype=np.int16)
+        villagers = self.alive & ~self.is_wolf
+        for seat in range(self.roles.shape[1]):
+            voters = voting & self.alive[:, seat]
+            if not voters.any():
+                continue
+            wolf_voter = self.is_wolf[:, seat]
+            choices = np.where(wolf_voter[:, None], villagers, self.alive)
+            choices[:, seat] = False
+            if candidates is not None:
+                allowed = choices & candidates
+                choices = np.where(allowed.any(axis=1)[:, None], allowed, candidates)
+            target = self._pick(choices)
+            if self.informed:
+                # 好人優先投給座位最前面的已知狼人
+                suspects = self.alive & self.suspect
+                suspects[:, seat] = False
+                if candidates is not None:
+                    suspects &= candidates
+                known = self._first(suspects)
+                target = np.where(~wolf_voter & (known >= 0), known, target)
+            voters &= target >= 0
+            counts[self.rows[voters], target[voters]] += 1
+        return counts
+
+    def _resolve(self, voting, counts, candidates=None):
+        top = counts.max(axis=1)
+        leaders = (counts == top[:, None]) & (top > 0)[:, None]
+        leader_count = leaders.sum(axis=1)
+        single = voting & (leader_count == 1)
+        self._kill(single, leaders.argmax(axis=1))
+        tied = voting & (leader_count > 1)
+        if self.tie_policy == TIE_RANDOM:
+            self._kill(tied, self._pick(leaders))
+        elif self.tie_policy == TIE_REVOTE and candidates is None and tied.any():
+            # 平票者之間重新投票一次，再平票則無人出局
+            self._resolve(tied, self._vote_round(tied, leaders), leaders)
+
+    def play_vote(self):
+        self._resolve(self.active, self._vote_round(self.active))
+
+    def run(self):
+        while self.active.any():
+            self.play_night()
+            self.check_game_end()
+            self.play_vote()
+            self.check_game_end()
+            self.day[self.active] += 1
+            self.active &= self.day <= MAX_DAYS
+
+
+def simulate_vectorized(player_counts: Iterable[int], games: int, policy: str = "random",
+                        deck: Optional[Dict[str, Any]] = None,
+                        rules: Optional[Dict[str, Any]] = None, seed: int = 0,
+                        batch_size: int = BATCH_SIZE) -> Dict[int, DeckStats]:
+    """與 simulator.simulate 相同的統計，以陣列整批模擬；相同的 seed 得到相同的結果"""
+    if np is None:
+        raise RuntimeError("向量化模擬需要安裝 numpy")
+    config = GameConfig()
+    if rules:
+        config.config = dict(config.config, **rules)
+    role_deck = compile_deck(deck) if deck else config.deck
+
+    results: Dict[int, DeckStats] = {}
+    for player_count in player_counts:
+        roles = role_deck.roles_for(player_count)
+        if roles is None:
+            raise ValueError(f"牌組不支援 {player_count} 人")
+        stats = results[player_count] = DeckStats(player_count)
+        for batch, start in enumerate(range(0, games, batch_size)):
+            rng = np.random.default_rng([seed, player_count, batch])
+            state = BatchGames(roles, min(batch_size, games - start), rng, policy, config.config)
+            state.run()
+            stats.games += len(state.winner)
+            for index, outcome in enumerate(OUTCOMES):
+                stats.wins[outcome] += int((state.winner == index).sum())
+            stats.days += int(state.days.sum())
+    return results
@@ -0,0 +1,658 @@
+import glob
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+# (user_id, 是否獲勝, 角色名稱, 遊玩時間)
+StatResult = Tuple[str, bool, str, str]
+# (room_id, 時間戳記 "%Y-%m-%d %H:%M:%S", 事件內容)
+LogEntry = Tuple[str, str, str]
+
+
+def empty_stats() -> Dict[str, Any]:
+    return {
+        "games_played": 0,
+        "wins": 0,
+        "losses": 0,
+        "roles_played": {},
+        "last_played": None
+    }
+
+
+def apply_result(stats: Dict[str, Any], won: bool, role: str, played_at: str) -> Dict[str, Any]:
+    stats["games_played"] += 1
+    stats["last_played"] = played_at
+    if won:
+        stats["wins"] += 1
+    else:
+        stats["losses"] += 1
+    stats["roles_played"][role] = stats["roles_played"].get(role, 0) + 1
+    return stats
+
+
+def format_log_line(timestamp: str, event: str) -> str:
+    return f"[{timestamp}] {event}\n"
+
+
+def log_day(timestamp: str) -> str:
+    # "2024-01-02 03:04:05" -> "20240102"
+    return timestamp[:10].replace("-", "")
+
+
+class RoomConflict(Exception):
+    """房間已被其他 worker 更新，本地的快照不是最新版本"""
+
+    def __init__(self, room_ids: List[str]):
+        super().__init__(f"房間版本衝突: {', '.join(room_ids)}")
+        self.room_ids = room_ids
+
+
+class StorageBackend(ABC):
+    """遊戲存檔、玩家統計與遊戲紀錄共用的儲存介面
+
+    寫入方法一律接受批次資料，實作應在一次操作（檔案寫入或交易）內完成；
+    寫入失敗時直接拋出例外，由呼叫端決定如何處理。會比對版本的後端在
+    房間已被其他 worker 更新時拋出 RoomConflict，且不寫入任何房間。
+    """
+
+    # 是否可由多個行程同時使用；共用的後端不能依賴行程內的快取
+    shared = False
+    # 寫入時是否比對房間版本（過期的快照拋出 RoomConflict 而不是覆蓋）
+    versioned = False
+
+    # 遊戲存檔
+    @abstractmethod
+    def room_ids(self) -> Set[str]:
+        pass
+
+    def has_room(self, room_id: str) -> bool:
+        return room_id in self.room_ids()
+
+    @abstractmethod
+    def save_rooms(self, rooms: Dict[str, Dict[str, Any]]):
+        pass
+
+    @abstractmethod
+    def load_room(self, room_id: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def delete_room(self, room_id: str):
+        pass
+
+    # 玩家統計
+    @abstractmethod
+    def record_stats(self, results: List[StatResult]):
+        pass
+
+    @abstractmethod
+    def load_stats(self, user_id: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    # 遊戲紀錄
+    @abstractmethod
+    def append_logs(self, entries: List[LogEntry]):
+        pass
+
+    @abstractmethod
+    def read_logs(self, room_id: str, day: str) -> List[str]:
+        pass
+
+    def tail_logs(self, room_id: str, day: str, limit: int) -> List[str]:
+        return self.read_logs(room_id, day)[-limit:]
+
+    # 計時器到期通知；只有多個 worker 共用房間狀態的後端需要實作
+    def publish_timer(self, room_id: str, name: str):
+        pass
+
+    def subscribe_timers(self, callback: Callable[[str, str], None]):
+        pass
+
+    # 房間寫入通知：其他 worker 寫入房間後呼叫 callback(room_id)
+    def subscribe_saves(self, callback: Callable[[str], None]):
+        pass
+
+    def close(self):
+        pass
+
+
+class KeyedLog:
+    """以 key 查詢的 append-only 紀錄檔
+
+    每行為 `key<TAB>JSON`，同一個 key 以最後一筆為準。第一次存取時只掃描
+    各行的 key 建立「key -> 檔案位置」索引，讀取時 seek 到該行才解析 JSON，
+    不需載入整個歷史。過期紀錄超過 compact_ratio 倍且達 min_compact 筆時，
+    將每個 key 的最新紀錄重寫成新檔（原子替換）。
+    key 不可包含 tab 或換行。
+    """
+
+    def __init__(self, path: str, legacy_file: str = None,
+                 min_compact: int = 1000, compact_ratio: float = 2.0):
+        self.path = path
+        self.legacy_file = legacy_file
+        self.min_compact = min_compact
+        self.compact_ratio = compact_ratio
+        self._index: Optional[Dict[str, int]] = None
+        self._records = 0
+
+    def _encode(self, key: str, value: Any) -> bytes:
+        return f"{key}\t{json.dumps(value, ensure_ascii=False, separators=(',', ':'))}\n".encode('utf-8')
+
+    def _load_index(self) -> Dict[str, int]:
+        if self._index is not None:
+            return self._index
+        if not os.path.exists(self.path) and self.legacy_file and os.path.exists(self.legacy_file):
+            self._migrate_legacy()
+
+        index: Dict[str, int] = {}
+        records = 0
+        offset = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    key = line.split(b"\t", 1)[0].decode('utf-8')
+                    index[key] = offset
+                    records += 1
+                    offset += len(line)
+            if offset != os.path.getsize(self.path):
+                # 寫到一半就當機的最後一行，截掉
+                with open(self.path, 'r+b') as f:
+                    f.truncate(offset)
+        self._index = index
+        self._records = records
+        return index
+
+    def _migrate_legacy(self):
+        with open(self.legacy_file, 'r', encoding='utf-8') as f:
+            legacy = json.load(f)
+        self._rewrite(legacy)
+        os.replace(self.legacy_file, self.legacy_file + ".migrated")
+
+    def get(self, key: str) -> Optional[Any]:
+        offset = self._load_index().get(key)
+        if offset is None:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline().split(b"\t", 1)[1])
+
+    def put_many(self, items: Dict[str, Any]):
+        """一次附加多筆紀錄（一次寫入與 fsync）"""
+        if not items:
+            return
+        index = self._load_index()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'ab') as f:
+            offset = f.tell()
+            data = bytearray()
+            offsets = {}
+            for key, value in items.items():
+                offsets[key] = offset + len(data)
+                data += self._encode(key, value)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        index.update(offsets)
+        self._records += len(items)
+        if self._records >= self.min_compact and self._records > len(index) * self.compact_ratio:
+            self.compact()
+
+    def __len__(self) -> int:
+        return len(self._load_index())
+
+    def compact(self):
+        """只保留每個 key 的最新紀錄"""
+        index = self._load_index()
+        latest = {}
+        with open(self.path, 'rb') as f:
+            for key, offset in index.items():
+                f.seek(offset)
+                latest[key] = json.loads(f.readline().split(b"\t", 1)[1])
+        self._rewrite(latest)
+
+    def _rewrite(self, items: Dict[str, Any]):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".log")
+        index = {}
+        offset = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for key, value in items.items():
+                    line = self._encode(key, value)
+                    index[key] = offset
+                    offset += len(line)
+                    f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        self._index = index
+        self._records = len(index)
+
+
+class FileBackend(StorageBackend):
+    """檔案儲存：每個房間一個 JSON、玩家統計一個 append-only 紀錄檔、每房每日一個紀錄檔
+
+    紀錄檔超過 log_max_bytes（0 表示不限制）或換日後，會壓縮成
+    `{room_id}_{day}.{n}.log.gz` 分段保存。
+    只適用於單一行程；目錄在第一次寫入時才建立。
+    """
+
+    def __init__(self, storage_dir: str = "game_data", stats_file: str = "player_stats.json",
+                 log_dir: str = "game_logs", log_max_bytes: int = 1024 * 1024):
+        self.storage_dir = storage_dir
+        self.stats_file = stats_file
+        self.log_dir = log_dir
+        self.log_max_bytes = log_max_bytes
+        # room_id -> 目前寫入中的日期，換日時壓縮前一天的紀錄檔
+        self._log_days: Dict[str, str] = {}
+        # 統計改存於 append-only 的 .log，舊的 player_stats.json 第一次使用時轉換
+        self._stats = KeyedLog(os.path.splitext(stats_file)[0] + ".log", legacy_file=stats_file)
+        self._stats_lock = threading.Lock()
+        self._log_lock = threading.Lock()
+
+    def _room_path(self, room_id: str) -> str:
+        return os.path.join(self.storage_dir, f"{room_id}.json")
+
+    def _log_path(self, room_id: str, day: str) -> str:
+        return os.path.join(self.log_dir, f"{room_id}_{day}.log")
+
+    def room_ids(self) -> Set[str]:
+        if not os.path.isdir(self.storage_dir):
+            return set()
+        return {name[:-len(".json")] for name in os.listdir(self.storage_dir)
+                if name.endswith(".json") and not name.startswith(".tmp-")}
+
+    def has_room(self, room_id: str) -> bool:
+        return os.path.exists(self._room_path(room_id))
+
+    def save_rooms(self, rooms: Dict[str, Dict[str, Any]]):
+        os.makedirs(self.storage_dir, exist_ok=True)
+        for room_id, data in rooms.items():
+            self._atomic_write(self._room_path(room_id), data)
+
+    def load_room(self, room_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._room_path(room_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def delete_room(self, room_id: str):
+        try:
+            os.remove(self._room_path(room_id))
+        except FileNotFoundError:
+            pass
+
+    def _atomic_write(self, file_path: str, data: Any):
+        """寫入暫存檔並 fsync 後再 rename，避免寫到一半時當機造成檔案損毀"""
+        directory = os.path.dirname(file_path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def record_stats(self, results: List[StatResult]):
+        with self._stats_lock:
+            updated: Dict[str, Dict[str, Any]] = {}
+            for user_id, won, role, played_at in results:
+                stats = updated.get(user_id) or self._stats.get(user_id) or empty_stats()
+                updated[user_id] = apply_result(stats, won, role, played_at)
+            self._stats.put_many(updated)
+
+    def load_stats(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._stats_lock:
+            return self._stats.get(user_id)
+
+    def _segments(self, room_id: str, day: str) -> List[str]:
+        pattern = os.path.join(glob.escape(self.log_dir), f"{glob.escape(room_id)}_{day}.*.log.gz")
+
+        def number(path: str) -> int:
+            return int(path[:-len(".log.gz")].rsplit(".", 1)[1])
+
+        return sorted(glob.glob(pattern), key=number)
+
+    def _rotate_log(self, room_id: str, day: str):
+        """將目前的紀錄檔壓縮成下一個分段
+
+        先寫入暫存檔並 fsync，rename 成分段後才刪除原檔；中途當機時最多留下重複的紀錄，
+        不會出現寫到一半的分段或遺失紀錄。
+        """
+        path = self._log_path(room_id, day)
+        if not os.path.exists(path):
+            return
+        segment = os.path.join(self.log_dir, f"{room_id}_{day}.{len(self._segments(room_id, day)) + 1}.log.gz")
+        fd, tmp_path = tempfile.mkstemp(dir=self.log_dir, prefix=".tmp-", suffix=".gz")
+        try:
+            with os.fdopen(fd, 'wb') as raw:
+                with open(path, 'rb') as src, gzip.GzipFile(fileobj=raw, mode='wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                raw.flush()
+                os.fsync(raw.fileno())
+            os.replace(tmp_path, segment)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        os.remove(path)
+
+    def _rotate_previous_days(self, room_id: str, day: str):
+        previous = self._log_days.get(room_id)
+        if previous == day:
+            return
+        if previous is None:
+            # 本行程第一次寫入此房間，找出之前留下的未壓縮紀錄檔
+            pattern = os.path.join(glob.escape(self.log_dir), f"{glob.escape(room_id)}_*.log")
+            days = {os.path.basename(path)[len(room_id) + 1:-len(".log")] for path in glob.glob(pattern)}
+        else:
+            days = {previous}
+        for old_day in days:
+            if old_day != day and old_day.isdigit():
+                self._rotate_log(room_id, old_day)
+        # 全部壓縮成功後才記錄，失敗時下次寫入會再嘗試
+        self._log_days[room_id] = day
+
+    def append_logs(self, entries: List[LogEntry]):
+        os.makedirs(self.log_dir, exist_ok=True)
+        files: Dict[Tuple[str, str], List[str]] = {}
+        for room_id, timestamp, event in entries:
+            files.setdefault((room_id, log_day(timestamp)), []).append(format_log_line(timestamp, event))
+        with self._log_lock:
+            for (room_id, day), lines in files.items():
+                self._rotate_previous_days(room_id, day)
+                path = self._log_path(room_id, day)
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.writelines(lines)
+                    size = f.tell()
+                if self.log_max_bytes and size >= self.log_max_bytes:
+                    self._rotate_log(room_id, day)
+
+    def read_logs(self, room_id: str, day: str) -> List[str]:
+        with self._log_lock:
+            lines = []
+            for segment in self._segments(room_id, day):
+                with gzip.open(segment, 'rt', encoding='utf-8') as f:
+                    lines.extend(f.readlines())
+            path = self._log_path(room_id, day)
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    lines.extend(f.readlines())
+            return lines
+
+    def tail_logs(self, room_id: str, day: str, limit: int) -> List[str]:
+        with self._log_lock:
+            path = self._log_path(room_id, day)
+            lines = self._tail_file(path, limit) if os.path.exists(path) else []
+            # 目前的檔案剛分段，不足的部分由最後的壓縮分段補上
+            for segment in reversed(self._segments(room_id, day)):
+                if len(lines) >= limit:
+                    break
+                with gzip.open(segment, 'rt', encoding='utf-8') as f:
+                    lines = f.readlines()[-(limit - len(lines)):] + lines
+            return lines
+
+    @staticmethod
+    def _tail_file(path: str, limit: int, block_size: int = 4096) -> List[str]:
+        """從檔案尾端往前讀，只讀取最後 limit 行所需的區塊"""
+        with open(path, 'rb') as f:
+            pos = f.seek(0, os.SEEK_END)
+            data = b""
+            while pos > 0 and data.count(b"\n") <= limit:
+                step = min(block_size, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+        lines = data.splitlines(keepends=True)
+        if pos > 0:
+            lines = lines[1:]  # 第一行可能只讀到一半
+        return [line.decode('utf-8') for line in lines[-limit:]]
+
+
+class SQLiteBackend(StorageBackend):
+    """內嵌 SQLite（WAL 模式）儲存，可由多個 gunicorn worker 共用同一個資料庫檔
+
+    每個執行緒使用自己的連線；SQL 皆為固定字串搭配參數，由連線的
+    statement cache 重複使用編譯結果。寫入以 BEGIN IMMEDIATE 交易批次執行，
+    統計以 UPSERT 累加，不需先讀後寫，多個行程同時更新也不會遺失。
+    房間的 version 欄位與 RedisBackend 相同：寫入時以 `UPDATE ... WHERE version = ?`
+    比對本行程最後讀取或寫入的版本，不符時拋出 RoomConflict，整批交易不寫入。
+    """
+
+    shared = True
+    versioned = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS rooms (
+            room_id TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS player_stats (
+            user_id TEXT PRIMARY KEY,
+            games_played INTEGER NOT NULL DEFAULT 0,
+            wins INTEGER NOT NULL DEFAULT 0,
+            losses INTEGER NOT NULL DEFAULT 0,
+            last_played TEXT
+        );
+        CREATE TABLE IF NOT EXISTS player_roles (
+            user_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, role)
+        );
+        CREATE TABLE IF NOT EXISTS game_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            room_id TEXT NOT NULL,
+            day TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            event TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_game_logs_room_day ON game_logs (room_id, day, id);
+    """
+
+    INSERT_ROOM = ("INSERT INTO rooms (room_id, data, version, updated_at) VALUES (?, ?, 1, CURRENT_TIMESTAMP) "
+                   "ON CONFLICT(room_id) DO NOTHING")
+    UPDATE_ROOM = ("UPDATE rooms SET data = ?, version = version + 1, updated_at = CURRENT_TIMESTAMP "
+                   "WHERE room_id = ? AND version = ?")
+    LOAD_ROOM = "SELECT data, version FROM rooms WHERE room_id = ?"
+    HAS_ROOM = "SELECT 1 FROM rooms WHERE room_id = ?"
+    DELETE_ROOM = "DELETE FROM rooms WHERE room_id = ?"
+    ROOM_IDS = "SELECT room_id FROM rooms"
+    RECORD_STATS = ("INSERT INTO player_stats (user_id, games_played, wins, losses, last_played) "
+                    "VALUES (?, 1, ?, ?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET games_played = games_played + 1, "
+                    "wins = wins + excluded.wins, losses = losses + excluded.losses, "
+                    "last_played = excluded.last_played")
+    RECORD_ROLE = ("INSERT INTO player_roles (user_id, role, count) VALUES (?, ?, 1) "
+                   "ON CONFLICT(user_id, role) DO UPDATE SET count = count + 1")
+    LOAD_STATS = "SELECT games_played, wins, losses, last_played FROM player_stats WHERE user_id = ?"
+    LOAD_ROLES = "SELECT role, count FROM player_roles WHERE user_id = ?"
+    APPEND_LOG = "INSERT INTO game_logs (room_id, day, created_at, event) VALUES (?, ?, ?, ?)"
+    READ_LOGS = "SELECT created_at, event FROM game_logs WHERE room_id = ? AND day = ? ORDER BY id"
+    TAIL_LOGS = ("SELECT created_at, event FROM game_logs WHERE room_id = ? AND day = ? "
+                 "ORDER BY id DESC LIMIT ?")
+
+    def __init__(self, path: str = "game_data.db", timeout: float = 30):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        # room_id -> 本行程最後讀取或寫入的版本，不在其中的房間視為新房間
+        self._versions: Dict[str, int] = {}
+        self._versions_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(rooms)")}
+        if "version" not in columns:
+            # 舊版資料庫沒有 version 欄位
+            conn.execute("ALTER TABLE rooms ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None：由我們自行以 BEGIN IMMEDIATE 控制交易範圍
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                   check_same_thread=False, cached_statements=64)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _transaction(self, statements: List[Tuple[str, List[tuple]]]):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, rows in statements:
+                if rows:
+                    conn.executemany(sql, rows)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def room_ids(self) -> Set[str]:
+        return {row[0] for row in self._connection().execute(self.ROOM_IDS)}
+
+    def has_room(self, room_id: str) -> bool:
+        return self._connection().execute(self.HAS_ROOM, (room_id,)).fetchone() is not None
+
+    def save_rooms(self, rooms: Dict[str, Dict[str, Any]]):
+        if not rooms:
+            return
+        with self._versions_lock:
+            known = {room_id: self._versions.get(room_id) for room_id in rooms}
+        conn = self._connection()
+        conflicts: List[str] = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for room_id, data in rooms.items():
+                text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+                if known[room_id] is None:
+                    # 本行程沒讀過的房間只能新建，已存在表示其他 worker 先建立了
+                    cursor = conn.execute(self.INSERT_ROOM, (room_id, text))
+                else:
+                    cursor = conn.execute(self.UPDATE_ROOM, (text, room_id, known[room_id]))
+                if cursor.rowcount != 1:
+                    conflicts.append(room_id)
+            conn.execute("ROLLBACK" if conflicts else "COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if conflicts:
+            self._forget(conflicts)
+            raise RoomConflict(conflicts)
+        with self._versions_lock:
+            for room_id, version in known.items():
+                self._versions[room_id] = (version or 0) + 1
+
+    def _forget(self, room_ids: List[str]):
+        with self._versions_lock:
+            for room_id in room_ids:
+                self._versions.pop(room_id, None)
+
+    def load_room(self, room_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(self.LOAD_ROOM, (room_id,)).fetchone()
+        if row is None:
+            self._forget([room_id])
+            return None
+        with self._versions_lock:
+            self._versions[room_id] = row[1]
+        return json.loads(row[0])
+
+    def room_version(self, room_id: str) -> int:
+        """本行程最後讀取或寫入的房間版本"""
+        with self._versions_lock:
+            return self._versions.get(room_id, 0)
+
+    def delete_room(self, room_id: str):
+        self._transaction([(self.DELETE_ROOM, [(room_id,)])])
+        self._forget([room_id])
+
+    def record_stats(self, results: List[StatResult]):
+        self._transaction([
+            (self.RECORD_STATS, [(user_id, int(won), int(not won), played_at)
+                                 for user_id, won, _, played_at in results]),
+            (self.RECORD_ROLE, [(user_id, role) for user_id, _, role, _ in results]),
+        ])
+
+    def load_stats(self, user_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connection()
+        row = conn.execute(self.LOAD_STATS, (user_id,)).fetchone()
+        if row is None:
+            return None
+        games_played, wins, losses, last_played = row
+        return {
+            "games_played": games_played,
+            "wins": wins,
+            "losses": losses,
+            "roles_played": dict(conn.execute(self.LOAD_ROLES, (user_id,)).fetchall()),
+            "last_played": last_played
+        }
+
+    def append_logs(self, entries: List[LogEntry]):
+        self._transaction([
+            (self.APPEND_LOG, [(room_id, log_day(timestamp), timestamp, event)
+                               for room_id, timestamp, event in entries]),
+        ])
+
+    def read_logs(self, room_id: str, day: str) -> List[str]:
+        rows = self._connection().execute(self.READ_LOGS, (room_id, day)).fetchall()
+        return [format_log_line(timestamp, event) for timestamp, event in rows]
+
+    def tail_logs(self, room_id: str, day: str, limit: int) -> List[str]:
+        rows = self._connection().execute(self.TAIL_LOGS, (room_id, day, limit)).fetchall()
+        return [format_log_line(timestamp, event) for timestamp, event in reversed(rows)]
+
+    def close(self):
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+def create_backend(kind: str = "file", sqlite_path: str = "game_data.db",
+                   log_max_bytes: int = 1024 * 1024, redis_url: str = "redis://127.0.0.1:6379/0",
+                   redis_prefix: str = "werewolf:") -> StorageBackend:
+    """依設定建立儲存後端"""
+    if kind == "sqlite":
+        return SQLiteBackend(sqlite_path)
+    if kind == "redis":
+        from .redis_store import RedisBackend, RedisClient
+        return RedisBackend(RedisClient.from_url(redis_url), prefix=redis_prefix)
+    return FileBackend(log_max_bytes=log_max_bytes)
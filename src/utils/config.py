@@ -3,6 +3,7 @@ import os
 from dotenv import load_dotenv
 from typing import Dict, Any
 import json
+from ..game.deck import DeckError, RoleDeck, compile_deck
 
 # 配置設定
 LINE_CHANNEL_ACCESS_TOKEN = '你的_CHANNEL_ACCESS_TOKEN'
@@ -13,12 +14,52 @@ class Config:
         load_dotenv()
         self.CHANNEL_ACCESS_TOKEN = os.getenv('LINE_CHANNEL_ACCESS_TOKEN')
         self.CHANNEL_SECRET = os.getenv('LINE_CHANNEL_SECRET')
+        # 背景事件佇列：webhook 立即回應，事件交由工作執行緒處理
+        self.ASYNC_WEBHOOK = os.getenv('ASYNC_WEBHOOK', '0').lower() in ('1', 'true', 'yes')
+        self.WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', '4'))
+        self.WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', '1000'))
+        # 房間執行通道的工作執行緒數量，0 表示在呼叫端執行緒同步執行
+        self.ROOM_WORKERS = int(os.getenv('ROOM_WORKERS', '0'))
+        # 推播後端：sync 使用 LineBotApi 逐一發送，async 使用 aiohttp 連線池並行發送
+        self.LINE_MESSENGER = os.getenv('LINE_MESSENGER', 'sync').lower()
+        self.LINE_API_ENDPOINT = os.getenv('LINE_API_ENDPOINT', 'https://api.line.me')
+        self.LINE_HTTP_POOL_SIZE = int(os.getenv('LINE_HTTP_POOL_SIZE', '32'))
+        # 常駐記憶體的房間上限與閒置秒數，超過時寫回磁碟並移出
+        self.MAX_RESIDENT_ROOMS = int(os.getenv('MAX_RESIDENT_ROOMS', '1000'))
+        self.ROOM_IDLE_TTL = int(os.getenv('ROOM_IDLE_TTL', '1800'))
+        # 遊戲存檔合併寫入的間隔秒數，0 表示每次狀態改變立即寫入
+        self.STORAGE_FLUSH_INTERVAL = float(os.getenv('STORAGE_FLUSH_INTERVAL', '2'))
+        # 儲存後端：file 為原本的 JSON / 文字檔，sqlite 可讓多個 worker 行程共用狀態
+        self.STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'file').lower()
+        self.SQLITE_PATH = os.getenv('SQLITE_PATH', 'game_data.db')
+        # redis 後端的連線位址與 key 前綴
+        self.REDIS_URL = os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/0')
+        self.REDIS_PREFIX = os.getenv('REDIS_PREFIX', 'werewolf:')
+        # 遊戲紀錄緩衝寫入的間隔秒數（0 表示立即寫入），以及單一紀錄檔分段壓縮的大小
+        self.LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', '1'))
+        self.LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(1024 * 1024)))
+        # 房間事件日誌：快照之間的狀態改變逐筆寫入，當機後以快照加日誌重建房間
+        self.EVENT_JOURNAL = os.getenv('EVENT_JOURNAL', '0').lower() in ('1', 'true', 'yes')
+        self.JOURNAL_DIR = os.getenv('JOURNAL_DIR', 'game_journal')
+        self.JOURNAL_FSYNC = os.getenv('JOURNAL_FSYNC', '0').lower() in ('1', 'true', 'yes')
+        # 房間分片："host:port,host:port"，空白表示所有房間都在本行程
+        self.SHARD_ADDRESSES = os.getenv('SHARD_ADDRESSES', '')
+        # 分片連線的驗證金鑰，使用分片時必須另外設定，不沿用 CHANNEL_SECRET
+        self.SHARD_AUTHKEY = os.getenv('SHARD_AUTHKEY', '').encode('utf-8')
+        # 分片健康檢查間隔（秒），連續無回應的分片移出雜湊環，0 表示不檢查
+        self.SHARD_HEALTH_INTERVAL = float(os.getenv('SHARD_HEALTH_INTERVAL', '5'))
+        # 內建效能指標（GET /metrics），關閉後熱路徑不做任何記錄
+        self.METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes')
+        # 取樣分析器的管理權杖，未設定時不提供 /profiler 端點
+        self.PROFILER_TOKEN = os.getenv('PROFILER_TOKEN', '')
+        self.PROFILER_MAX_SECONDS = float(os.getenv('PROFILER_MAX_SECONDS', '60'))
 
 class GameConfig:
     DEFAULT_CONFIG = {
         "min_players": 6,
         "max_players": 12,
         "vote_timeout": 120,  # 秒
+        "vote_tie_policy": "none",  # 平票處理：none 無人出局、revote 平票者重新投票、random 隨機處決
         "discussion_time": 180,  # 秒
         "night_timeout": 90,  # 秒
         "enable_special_roles": True,
@@ -27,6 +68,11 @@ class GameConfig:
             "8-9": {"werewolf": 3, "special_roles": 3},
             "10+": {"werewolf": 4, "special_roles": 4}
         },
+        "vote_digest": {
+            "enabled": False,  # 是否彙整投票廣播
+            "window": 3,  # 秒，最後一票後等待多久發送彙整
+            "max_latency": 10  # 秒，第一張未公告的票最多等待多久
+        },
         "special_effects": {
             "witch_poison_delay": 1,  # 女巫毒藥延遲生效回合
             "guard_self_protect": False,  # 守衛是否能連續守護同一人
@@ -37,6 +83,14 @@ class GameConfig:
     def __init__(self, config_file: str = "game_config.json"):
         self.config_file = config_file
         self.config = self._load_config()
+        # 角色配置在載入時編譯並驗證，發牌時直接查表
+        try:
+            self.deck: RoleDeck = compile_deck(self.config)
+        except DeckError as e:
+            print(f"角色配置錯誤，使用預設配置: {str(e)}")
+            self.config = dict(self.config, **{key: self.DEFAULT_CONFIG[key] for key in (
+                "min_players", "max_players", "enable_special_roles", "role_distribution")})
+            self.deck = compile_deck(self.config)
 
     def _load_config(self) -> Dict[str, Any]:
         if os.path.exists(self.config_file):
@@ -49,12 +103,12 @@ class GameConfig:
             json.dump(self.config, f, ensure_ascii=False, indent=2)
 
     def update_config(self, new_config: Dict[str, Any]):
+        # 先驗證新的角色配置，無效時不寫入
+        deck = compile_deck(dict(self.config, **new_config))
         self.config.update(new_config)
+        self.deck = deck
         self.save_config()
 
     def get_role_distribution(self, player_count: int) -> Dict[str, int]:
-        if player_count <= 7:
-            return self.config["role_distribution"]["6-7"]
-        elif player_count <= 9:
-            return self.config["role_distribution"]["8-9"]
-        return self.config["role_distribution"]["10+"]
\ No newline at end of file
+        """該人數各角色的數量（角色名稱 -> 張數）"""
+        return self.deck.distribution(player_count)
\ No newline at end of file
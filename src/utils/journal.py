@@ -0,0 +1,179 @@
+import json
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Set, Tuple
+from ..game.room import GameRoom
+
+# (事件序號, 事件名稱, 參數)
+JournalEvent = Tuple[int, str, Dict[str, Any]]
+
+
+class RoomJournal:
+    """房間事件日誌
+
+    每個房間一個 append-only 檔案，記錄 GameRoom 每次改變狀態的呼叫。
+    每筆紀錄為固定長度的標頭（內容長度、CRC32、事件序號）加上 JSON 內容，
+    讀到長度不足或 CRC 不符的紀錄即視為當機時寫到一半，之後的內容全部捨棄。
+    存檔寫入後呼叫 checkpoint 丟棄快照已包含的事件，重建房間時只需
+    讀取快照並重播其後的少量事件。
+    """
+
+    HEADER = struct.Struct("<IIQ")
+
+    def __init__(self, journal_dir: str = "game_journal", fsync: bool = False, max_open: int = 256):
+        self.journal_dir = journal_dir
+        self.fsync = fsync
+        self.max_open = max_open
+        os.makedirs(journal_dir, exist_ok=True)
+        # 有事件日誌的房間，沒有日誌的群組不需讀取磁碟
+        self.room_ids: Set[str] = {
+            name[:-len(".journal")] for name in os.listdir(journal_dir) if name.endswith(".journal")
+        }
+        self._files: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, room_id: str) -> str:
+        return os.path.join(self.journal_dir, f"{room_id}.journal")
+
+    @classmethod
+    def encode(cls, seq: int, op: str, args: Dict[str, Any]) -> bytes:
+        body = json.dumps([op, args], ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return cls.HEADER.pack(len(body), zlib.crc32(body), seq) + body
+
+    @classmethod
+    def decode(cls, data: bytes) -> Tuple[List[JournalEvent], int]:
+        """解析紀錄，回傳事件與最後一筆完整紀錄的結尾位置"""
+        events = []
+        offset = 0
+        header_size = cls.HEADER.size
+        while offset + header_size <= len(data):
+            length, crc, seq = cls.HEADER.unpack_from(data, offset)
+            start = offset + header_size
+            body = data[start:start + length]
+            if len(body) < length or zlib.crc32(body) != crc:
+                break
+            op, args = json.loads(body)
+            events.append((seq, op, args))
+            offset = start + length
+        return events, offset
+
+    def _open(self, room_id: str):
+        f = self._files.get(room_id)
+        if f is not None:
+            self._files.move_to_end(room_id)
+            return f
+        path = self._path(room_id)
+        if os.path.exists(path):
+            # 截掉寫到一半的最後一筆紀錄
+            with open(path, 'rb') as existing:
+                _, end = self.decode(existing.read())
+            if end != os.path.getsize(path):
+                with open(path, 'r+b') as existing:
+                    existing.truncate(end)
+        f = open(path, 'ab')
+        self._files[room_id] = f
+        self.room_ids.add(room_id)
+        while len(self._files) > self.max_open:
+            _, oldest = self._files.popitem(last=False)
+            oldest.close()
+        return f
+
+    def _close(self, room_id: str):
+        f = self._files.pop(room_id, None)
+        if f is not None:
+            f.close()
+
+    def attach(self, room: GameRoom):
+        """讓房間的狀態改變寫入日誌"""
+        room.on_event = self.append
+
+    def append(self, room: GameRoom, seq: int, op: str, args: Dict[str, Any]):
+        record = self.encode(seq, op, args)
+        with self._lock:
+            try:
+                f = self._open(room.room_id)
+                f.write(record)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            except Exception as e:
+                print(f"寫入事件日誌失敗: {str(e)}")
+
+    def refresh(self, room_id: str):
+        """重新確認房間是否有日誌檔（可能由其他行程寫入）"""
+        with self._lock:
+            self._close(room_id)
+            if os.path.exists(self._path(room_id)):
+                self.room_ids.add(room_id)
+            else:
+                self.room_ids.discard(room_id)
+
+    def has_events(self, room_id: str) -> bool:
+        return room_id in self.room_ids
+
+    def read(self, room_id: str, after_seq: int = 0) -> Iterator[JournalEvent]:
+        with self._lock:
+            f = self._files.get(room_id)
+            if f is not None:
+                f.flush()
+            try:
+                with open(self._path(room_id), 'rb') as journal:
+                    data = journal.read()
+            except FileNotFoundError:
+                return iter(())
+        events, _ = self.decode(data)
+        return (event for event in events if event[0] > after_seq)
+
+    def replay(self, room: GameRoom) -> int:
+        """重播快照之後的事件，回傳重播的筆數"""
+        count = 0
+        for seq, op, args in self.read(room.room_id, room.event_seq):
+            room.apply_event(seq, op, args)
+            count += 1
+        return count
+
+    def checkpoint(self, room_id: str, seq: int):
+        """丟棄序號不大於 seq 的事件（已包含在快照中）"""
+        with self._lock:
+            path = self._path(room_id)
+            self._close(room_id)
+            try:
+                with open(path, 'rb') as journal:
+                    data = journal.read()
+            except FileNotFoundError:
+                return
+            events, _ = self.decode(data)
+            tail = [event for event in events if event[0] > seq]
+            if len(tail) == len(events):
+                return
+            fd, tmp_path = tempfile.mkstemp(dir=self.journal_dir, prefix=".tmp-", suffix=".journal")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(b"".join(self.encode(*event) for event in tail))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except FileNotFoundError:
+                    pass
+                raise
+
+    def delete(self, room_id: str):
+        with self._lock:
+            self._close(room_id)
+            self.room_ids.discard(room_id)
+            try:
+                os.remove(self._path(room_id))
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        with self._lock:
+            for room_id in list(self._files):
+                self._close(room_id)
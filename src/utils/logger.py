@@ -1,23 +1,102 @@
-import os
+import threading
+import time
+from collections import deque
 from datetime import datetime
-from typing import List
+from typing import Deque, Dict, List, Tuple
+from .backend import FileBackend, LogEntry, StorageBackend, format_log_line, log_day
 
 class GameLogger:
-    def __init__(self, log_dir: str = "game_logs"):
-        self.log_dir = log_dir
-        os.makedirs(log_dir, exist_ok=True)
+    """遊戲事件紀錄
+
+    事件先寫入緩衝區，由背景執行緒每隔 flush_interval 秒、緩衝達 max_buffer 筆，
+    或在遊戲階段切換時呼叫 flush 一次寫入後端；flush_interval 為 0 時立即寫入。
+    每個房間另外在記憶體保留最近 tail_size 筆紀錄，/history 不需讀取磁碟。
+    """
+
+    def __init__(self, log_dir: str = "game_logs", backend: StorageBackend = None,
+                 flush_interval: float = 0, max_buffer: int = 500, tail_size: int = 50):
+        self.backend = backend or FileBackend(log_dir=log_dir)
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.tail_size = tail_size
+        self._buffer: List[LogEntry] = []
+        # room_id -> 最近的 (日期, 紀錄行)
+        self._tails: Dict[str, Deque[Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._clock: Tuple[int, str] = (0, "")
+        self._stop = threading.Event()
+        self._flusher = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="log-flusher", daemon=True)
+            self._flusher.start()
+
+    def _timestamp(self) -> str:
+        # 同一秒內的事件共用已格式化的時間字串
+        now = int(time.time())
+        second, text = self._clock
+        if second != now:
+            text = datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S")
+            self._clock = (now, text)
+        return text
 
     def log_game_event(self, room_id: str, event: str):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_file = os.path.join(self.log_dir, f"{room_id}_{datetime.now().strftime('%Y%m%d')}.log")
-        
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(f"[{timestamp}] {event}\n")
-
-    def get_game_history(self, room_id: str) -> List[str]:
-        log_file = os.path.join(self.log_dir, f"{room_id}_{datetime.now().strftime('%Y%m%d')}.log")
-        if not os.path.exists(log_file):
-            return []
-            
-        with open(log_file, 'r', encoding='utf-8') as f:
-            return f.readlines()
\ No newline at end of file
+        timestamp = self._timestamp()
+        with self._lock:
+            self._buffer.append((room_id, timestamp, event))
+            tail = self._tails.get(room_id)
+            if tail is None:
+                tail = self._tails[room_id] = deque(maxlen=self.tail_size)
+            tail.append((log_day(timestamp), format_log_line(timestamp, event)))
+            full = len(self._buffer) >= self.max_buffer
+        if full or not self._flusher:
+            self.flush()
+
+    def flush(self):
+        """寫入緩衝區中的所有事件"""
+        with self._flush_lock:
+            with self._lock:
+                entries, self._buffer = self._buffer, []
+            if not entries:
+                return
+            try:
+                self.backend.append_logs(entries)
+            except Exception as e:
+                print(f"寫入遊戲紀錄失敗: {str(e)}")
+
+    def get_game_history(self, room_id: str, limit: int = None) -> List[str]:
+        """今天的遊戲紀錄；指定 limit 時只取最後 limit 筆"""
+        today = datetime.now().strftime('%Y%m%d')
+        with self._lock:
+            tail = self._tails.get(room_id)
+            if tail is not None and limit is not None and limit <= self.tail_size:
+                lines = []
+                for day, line in reversed(tail):
+                    if day != today or len(lines) == limit:
+                        break
+                    lines.append(line)
+                if len(lines) == limit:
+                    return lines[::-1]
+
+        # 記憶體中的紀錄不足（例如房間剛從磁碟載入），先寫入緩衝後從後端讀取
+        self.flush()
+        if limit is None:
+            return self.backend.read_logs(room_id, today)
+        return self.backend.tail_logs(room_id, today, limit)
+
+    def discard(self, room_id: str):
+        """移除房間在記憶體中的紀錄"""
+        with self._lock:
+            self._tails.pop(room_id, None)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """停止背景寫入並寫入所有尚未保存的紀錄"""
+        self._stop.set()
+        if self._flusher:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
\ No newline at end of file
@@ -0,0 +1,259 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# 延遲直方圖的上界（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Shard:
+    """單一執行緒的累計值，只有擁有者執行緒會寫入，不需要鎖"""
+
+    __slots__ = ("thread", "counters", "histograms")
+
+    def __init__(self, thread: Optional[threading.Thread]):
+        self.thread = thread
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        # (名稱, 標籤) -> [各區間次數..., +Inf 區間次數, 總和, 次數]
+        self.histograms: Dict[Tuple[str, Labels], List[float]] = {}
+
+
+class MetricsRegistry:
+    """計數器、延遲直方圖與量表，輸出 Prometheus 文字格式
+
+    熱路徑上的 inc / observe 只寫入目前執行緒自己的累計表，沒有鎖也不跨執行緒；
+    只有在 /metrics 被讀取時才合併所有執行緒的數值，量表也是讀取時才呼叫回呼取得。
+    已結束執行緒的數值在合併時併入 retired，避免每個請求一條執行緒時累計表無限增加。
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, enabled: bool = True):
+        self.buckets = buckets
+        self.enabled = enabled
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._retired = _Shard(None)
+        self._lock = threading.Lock()  # 只在建立累計表與讀取時使用
+        self._meta: Dict[str, Tuple[str, str]] = {}  # 名稱 -> (類型, 說明)
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._meta[name] = (kind, help_text)
+
+    def gauge(self, name: str, help_text: str, callback: Callable[[], Any]):
+        """註冊量表；callback 回傳數值，或 {標籤字典的 tuple: 數值}"""
+        self.describe(name, "gauge", help_text)
+        self._gauges[name] = callback
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+                if len(self._shards) % 64 == 0:
+                    self._retire_dead()
+        return shard
+
+    def inc(self, name: str, value: float = 1, /, **labels):
+        if not self.enabled:
+            return
+        counters = self._shard().counters
+        key = (name, tuple(sorted(labels.items())))
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, /, **labels):
+        if not self.enabled:
+            return
+        histograms = self._shard().histograms
+        key = (name, tuple(sorted(labels.items())))
+        values = histograms.get(key)
+        if values is None:
+            values = histograms[key] = [0] * (len(self.buckets) + 3)
+        values[bisect.bisect_left(self.buckets, seconds)] += 1
+        values[-2] += seconds
+        values[-1] += 1
+
+    @contextmanager
+    def time(self, name: str, /, **labels) -> Iterator[None]:
+        """記錄區塊的執行時間；區塊拋出例外時另外累計 <名稱去掉 _seconds>_errors_total"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            base = name[:-len("_seconds")] if name.endswith("_seconds") else name
+            self.inc(f"{base}_errors_total", **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name: str, /, **labels):
+        """記錄函式執行時間的裝飾器"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.time(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _retire_dead(self):
+        # 呼叫端持有 _lock；已結束執行緒不會再寫入，可以安全合併
+        alive = []
+        for shard in self._shards:
+            if shard.thread.is_alive():
+                alive.append(shard)
+            else:
+                self._merge_into(self._retired, shard.counters.copy(), shard.histograms.copy())
+        self._shards = alive
+
+    @staticmethod
+    def _merge_into(target: _Shard, counters, histograms):
+        for key, value in counters.items():
+            target.counters[key] = target.counters.get(key, 0) + value
+        for key, values in histograms.items():
+            merged = target.histograms.get(key)
+            if merged is None:
+                target.histograms[key] = list(values)
+            else:
+                for i, value in enumerate(values):
+                    merged[i] += value
+
+    def collect(self) -> _Shard:
+        """合併所有執行緒的數值（dict.copy 在 GIL 下是原子操作，寫入端不需加鎖）"""
+        total = _Shard(None)
+        with self._lock:
+            self._retire_dead()
+            self._merge_into(total, self._retired.counters, self._retired.histograms)
+            for shard in self._shards:
+                histograms = {key: list(values) for key, values in shard.histograms.copy().items()}
+                self._merge_into(total, shard.counters.copy(), histograms)
+        return total
+
+    def counter_value(self, name: str, /, **labels) -> float:
+        return self.collect().counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def histogram_count(self, name: str, /, **labels) -> int:
+        values = self.collect().histograms.get((name, tuple(sorted(labels.items()))))
+        return int(values[-1]) if values else 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """合併後的數值與量表目前的值，可傳給其他行程的 render 一併輸出"""
+        total = self.collect()
+        gauges = {}
+        for name, callback in self._gauges.items():
+            try:
+                value = callback()
+            except Exception as e:
+                print(f"讀取量表失敗 {name}: {str(e)}")
+                continue
+            gauges[name] = dict(value) if isinstance(value, dict) else {(): value}
+        return {
+            "buckets": self.buckets,
+            "meta": dict(self._meta),
+            "counters": total.counters,
+            "histograms": total.histograms,
+            "gauges": gauges
+        }
+
+    def render(self, remote: Dict[str, Dict[str, Any]] = None) -> str:
+        """Prometheus 文字格式（text/plain; version=0.0.4）
+
+        remote 為 {分片名稱: snapshot()}，其數值加上 shard 標籤與本行程的數值一併輸出。
+        """
+        sources = [((), self.snapshot())]
+        sources.extend(((("shard", shard),), snapshot) for shard, snapshot in sorted((remote or {}).items()))
+        families: Dict[str, List[str]] = {}
+        meta: Dict[str, Tuple[str, str]] = {}
+        histogram_names = set()
+
+        for extra, snapshot in sources:
+            for name, described in snapshot["meta"].items():
+                meta.setdefault(name, described)
+
+            for (name, labels), value in sorted(snapshot["counters"].items()):
+                families.setdefault(name, []).append(
+                    f"{name}{_format_labels(labels + extra)} {_format_value(value)}")
+
+            bounds = tuple(snapshot["buckets"]) + (float("inf"),)
+            for (name, labels), values in sorted(snapshot["histograms"].items()):
+                histogram_names.add(name)
+                lines = families.setdefault(name, [])
+                labels = labels + extra
+                cumulative = 0
+                for bound, count in zip(bounds, values[:-2]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _format_value(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {int(cumulative)}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(values[-2])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {int(values[-1])}")
+
+            for name, samples in snapshot["gauges"].items():
+                families.setdefault(name, []).extend(
+                    f"{name}{_format_labels(tuple(labels) + extra)} {_format_value(v)}"
+                    for labels, v in samples.items())
+
+        output = []
+        for name in sorted(families):
+            kind, help_text = meta.get(name, ("histogram" if name in histogram_names else "counter", ""))
+            if help_text:
+                output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {kind}")
+            output.extend(families[name])
+        return "\n".join(output) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class InstrumentedApi:
+    """包裝 LineBotApi，每個 API 方法呼叫都記錄延遲與失敗次數"""
+
+    def __init__(self, api, registry: "MetricsRegistry", name: str = "werewolf_line_api_seconds"):
+        self._api = api
+        self._registry = registry
+        self._name = name
+
+    def __getattr__(self, attr: str):
+        value = getattr(self._api, attr)
+        if not callable(value) or attr.startswith("_"):
+            return value
+
+        @functools.wraps(value)
+        def call(*args, **kwargs):
+            with self._registry.time(self._name, method=attr):
+                return value(*args, **kwargs)
+        return call
+
+
+# 整個行程共用的指標
+metrics = MetricsRegistry()
+metrics.describe("werewolf_webhook_seconds", "histogram", "webhook 請求處理時間")
+metrics.describe("werewolf_webhook_requests_total", "counter", "webhook 請求數（依狀態碼）")
+metrics.describe("werewolf_command_seconds", "histogram", "群組指令處理時間（依指令）")
+metrics.describe("werewolf_private_message_seconds", "histogram", "私訊指令處理時間")
+metrics.describe("werewolf_line_api_seconds", "histogram", "LINE API 呼叫時間（依方法）")
+metrics.describe("werewolf_storage_seconds", "histogram", "遊戲存檔讀寫時間")
+metrics.describe("werewolf_stats_write_seconds", "histogram", "玩家統計寫入時間")
+metrics.describe("werewolf_timer_fired_total", "counter", "計時器到期次數（依名稱）")
+metrics.describe("werewolf_timer_callback_seconds", "histogram", "計時器回呼執行時間")
@@ -0,0 +1,172 @@
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+# 取樣間隔的上限（秒），超出開銷預算而放慢取樣時不會超過此值
+MAX_INTERVAL = 1.0
+# 超過 max_stacks 種堆疊後，新的堆疊都計入這一列
+TRUNCATED = "(truncated)"
+
+StackKey = Tuple[str, str, Tuple[str, ...]]  # (指令, room_id, 由外到內的函式)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__") or os.path.basename(code.co_filename)
+    # collapsed 格式以分號分隔堆疊、以空白分隔次數
+    return f"{module}:{code.co_name}".replace(";", ",").replace(" ", "_")
+
+
+class SamplingProfiler:
+    """取樣式分析器，輸出可繪製火焰圖的 collapsed stack 格式
+
+    處理指令的執行緒以 tag() 標記目前的房間與指令；啟動後由背景執行緒定期讀取
+    sys._current_frames()，只記錄有標記的執行緒，每筆樣本以「指令;room:房間;函式...」累計。
+    每次取樣都會暫停其他執行緒（持有 GIL），若單次取樣耗時超過間隔的 max_overhead 比例
+    就自動放慢取樣；超過 duration 秒自動停止，堆疊種類超過 max_stacks 後不再新增。
+    """
+
+    def __init__(self, interval: float = 0.01, max_duration: float = 60.0,
+                 max_overhead: float = 0.02, max_stacks: int = 5000, max_depth: int = 64):
+        self.default_interval = interval
+        self.max_duration = max_duration
+        self.max_overhead = max_overhead
+        self.max_stacks = max_stacks
+        self.max_depth = max_depth
+        self._tags: Dict[int, Tuple[str, str]] = {}  # 執行緒 ident -> (room_id, 指令)
+        self._counts: Dict[StackKey, int] = {}
+        self._lock = threading.Lock()  # 只保護啟動與停止
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.interval = interval
+        self.samples = 0
+        self.dropped = 0
+        self.started_at = 0.0
+        self.elapsed = 0.0
+        self.busy = 0.0  # 取樣本身花費的時間
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @contextmanager
+    def tag(self, room_id: str, command: str) -> Iterator[None]:
+        """標記目前執行緒正在處理的房間與指令（未啟動時只有一次字典寫入的成本）"""
+        ident = threading.get_ident()
+        previous = self._tags.get(ident)
+        self._tags[ident] = (room_id, command)
+        try:
+            yield
+        finally:
+            if previous is None:
+                self._tags.pop(ident, None)
+            else:
+                self._tags[ident] = previous
+
+    def start(self, interval: float = None, duration: float = None) -> bool:
+        """開始取樣並清除上一次的結果；已在取樣中時回傳 False"""
+        with self._lock:
+            if self.running:
+                return False
+            interval = max(0.001, min(interval or self.default_interval, MAX_INTERVAL))
+            duration = min(duration or self.max_duration, self.max_duration)
+            self._counts = {}
+            self.interval = interval
+            self.samples = self.dropped = 0
+            self.busy = self.elapsed = 0.0
+            self.started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(duration,), name="sampling-profiler", daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def stop(self):
+        with self._lock:
+            thread = self._thread
+            self._stop.set()
+        if thread and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self, duration: float):
+        start = time.perf_counter()
+        deadline = start + duration
+        while not self._stop.wait(self.interval):
+            if time.perf_counter() >= deadline:
+                break
+            before = time.perf_counter()
+            try:
+                self._sample()
+            except Exception as e:
+                print(f"分析器取樣失敗: {str(e)}")
+                break
+            spent = time.perf_counter() - before
+            self.busy += spent
+            # 單次取樣的停頓不得超過間隔的 max_overhead 比例
+            if spent > self.interval * self.max_overhead:
+                self.interval = min(spent / self.max_overhead, MAX_INTERVAL)
+            self.elapsed = time.perf_counter() - start
+        self.elapsed = time.perf_counter() - start
+
+    def _sample(self):
+        tags = self._tags.copy()
+        if not tags:
+            return
+        frames = sys._current_frames()
+        for ident, (room_id, command) in tags.items():
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.reverse()
+            key = (command, room_id, tuple(stack))
+            if key not in self._counts and len(self._counts) >= self.max_stacks:
+                key = (command, room_id, (TRUNCATED,))
+                self.dropped += 1
+            self._counts[key] = self._counts.get(key, 0) + 1
+            self.samples += 1
+
+    def collapsed(self, command: str = None, room_id: str = None, by_room: bool = True) -> str:
+        """collapsed stack 文字（每行「堆疊 次數」），可交給 flamegraph.pl 或 speedscope 繪製
+
+        command / room_id 只輸出符合的樣本；by_room=False 時不區分房間。
+        """
+        totals: Dict[str, int] = {}
+        for (sample_command, sample_room, stack), count in self._counts.copy().items():
+            if command is not None and sample_command != command:
+                continue
+            if room_id is not None and sample_room != room_id:
+                continue
+            frames = [sample_command.replace(";", ",").replace(" ", "_")]
+            if by_room:
+                frames.append(f"room:{sample_room}".replace(";", ",").replace(" ", "_"))
+            line = ";".join(frames + list(stack))
+            totals[line] = totals.get(line, 0) + count
+        return "".join(f"{line} {count}\n" for line, count in sorted(totals.items()))
+
+    def get_stats(self) -> Dict:
+        commands: Dict[str, int] = {}
+        for (command, _, _), count in self._counts.copy().items():
+            commands[command] = commands.get(command, 0) + count
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "elapsed_sec": round(self.elapsed, 3),
+            "interval_sec": self.interval,
+            "samples": self.samples,
+            "stacks": len(self._counts),
+            "dropped": self.dropped,
+            "overhead": round(self.busy / self.elapsed, 4) if self.elapsed else 0.0,
+            "commands": commands
+        }
+
+
+# 整個行程共用的分析器，由管理端點啟動
+profiler = SamplingProfiler()
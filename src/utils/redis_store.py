@@ -0,0 +1,509 @@
+import json
+import socket
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+from .backend import LogEntry, RoomConflict, StatResult, StorageBackend, format_log_line, log_day
+
+
+class RedisError(Exception):
+    """伺服器回傳的錯誤或協定錯誤"""
+
+
+class VersionConflict(RedisError, RoomConflict):
+    """房間已被其他 worker 更新，本地的快照不是最新版本"""
+
+
+class RespConnection:
+    """單一 RESP2 連線
+
+    指令以陣列格式送出；send 可一次送出多個指令（pipeline），
+    再依序以 read_reply 讀回結果。伺服器回傳的錯誤以 RedisError 物件回傳，
+    由呼叫端決定是否拋出。
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 5):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self.sock.makefile('rb')
+
+    @staticmethod
+    def encode(*args) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    def send(self, *commands: Tuple):
+        self.sock.sendall(b"".join(self.encode(*command) for command in commands))
+
+    def read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("連線中斷")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode('utf-8')
+        if kind == b"-":
+            return RedisError(payload.decode('utf-8'))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("連線中斷")
+            return data[:-2].decode('utf-8')
+        if kind == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self.read_reply() for _ in range(length)]
+        raise RedisError(f"無法解析的回應: {line!r}")
+
+    def execute(self, *args) -> Any:
+        self.send(args)
+        reply = self.read_reply()
+        if isinstance(reply, RedisError):
+            raise reply
+        return reply
+
+    def close(self):
+        try:
+            self._reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisClient:
+    """最小的 Redis 用戶端：連線池、pipeline 與 pub/sub
+
+    只實作房間狀態需要的功能。每次操作從連線池借用一條連線，
+    WATCH / MULTI / EXEC 必須在同一條連線上完成，因此以 connection()
+    取得連線後自行送出指令。發生連線錯誤的連線不會放回池中。
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379, db: int = 0,
+                 password: str = None, timeout: float = 5, max_idle: int = 8):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle: List[RespConnection] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisClient":
+        """redis://[:password@]host[:port][/db]"""
+        parsed = urlparse(url)
+        db = parsed.path.lstrip('/')
+        return cls(parsed.hostname or "127.0.0.1", parsed.port or 6379,
+                   int(db) if db else 0, parsed.password, **kwargs)
+
+    def _connect(self) -> RespConnection:
+        conn = RespConnection(self.host, self.port, self.timeout)
+        try:
+            if self.password:
+                conn.execute("AUTH", self.password)
+            if self.db:
+                conn.execute("SELECT", self.db)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    @contextmanager
+    def connection(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            yield conn
+        except BaseException:
+            # 回覆可能還沒讀完，連線狀態不明，直接關閉
+            conn.close()
+            raise
+        else:
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def execute(self, *args) -> Any:
+        with self.connection() as conn:
+            return conn.execute(*args)
+
+    def pipeline(self, commands: List[Tuple]) -> List[Any]:
+        """一次送出多個指令，只需一次往返；錯誤以 RedisError 物件放在結果中"""
+        if not commands:
+            return []
+        with self.connection() as conn:
+            conn.send(*commands)
+            return [conn.read_reply() for _ in commands]
+
+    def transaction(self, commands: List[Tuple]) -> List[Any]:
+        """以 MULTI / EXEC 原子執行多個指令（一次往返）"""
+        replies = self.pipeline([("MULTI",), *commands, ("EXEC",)])
+        result = replies[-1]
+        if isinstance(result, RedisError):
+            raise result
+        return result
+
+    def publish(self, channel: str, message: str) -> int:
+        return self.execute("PUBLISH", channel, message)
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]) -> "Subscription":
+        return Subscription(self, channel, callback)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class Subscription:
+    """在背景執行緒接收頻道訊息，收到後呼叫 callback(message)"""
+
+    def __init__(self, client: RedisClient, channel: str, callback: Callable[[str], None]):
+        self.channel = channel
+        self.callback = callback
+        self.conn = client._connect()
+        self.conn.sock.settimeout(None)
+        self.conn.send(("SUBSCRIBE", channel))
+        reply = self.conn.read_reply()
+        if isinstance(reply, RedisError):
+            self.conn.close()
+            raise reply
+        self._closed = False
+        self._thread = threading.Thread(target=self._listen, name="redis-subscriber", daemon=True)
+        self._thread.start()
+
+    def _listen(self):
+        try:
+            while not self._closed:
+                reply = self.conn.read_reply()
+                if isinstance(reply, list) and len(reply) == 3 and reply[0] == "message":
+                    try:
+                        self.callback(reply[2])
+                    except Exception as e:
+                        print(f"處理訂閱訊息失敗: {str(e)}")
+        except (OSError, ConnectionError, ValueError):
+            pass
+
+    def close(self):
+        self._closed = True
+        try:
+            self.conn.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.conn.close()
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+class RedisBackend(StorageBackend):
+    """以 Redis 協定存放房間狀態，讓多個無狀態的 web worker 共用
+
+    每個房間是一個 hash，GameStorage.snapshot 的每個欄位各佔一個短欄位名，
+    每位玩家一個 p:<user_id> 欄位，因此寫入時只需送出有變動的欄位。
+    欄位 v 為房間版本：寫入前 WATCH 房間並比對本地已知的版本，
+    不符（或 EXEC 因 WATCH 失敗）時拋出 VersionConflict，不會覆蓋其他
+    worker 的更新。統計以 HINCRBY 在 MULTI 中累加；遊戲紀錄為每日一個 list。
+    計時器到期與房間寫入成功時以 pub/sub 通知其他 worker；寫入通知在同一個
+    MULTI 中送出，不需額外往返。
+    """
+
+    shared = True
+    versioned = True
+
+    # 快照欄位 -> (hash 欄位, 型別)
+    ROOM_FIELDS = (
+        ("game_state", "s", "str"),
+        ("day_count", "d", "int"),
+        ("event_seq", "q", "int"),
+        ("current_turn", "t", "int"),
+        ("night_action_count", "n", "int"),
+        ("is_werewolf_action_time", "w", "bool"),
+        ("witch_potion", "wp", "json"),
+        ("night_actions", "na", "json"),
+        ("delayed_actions", "da", "json"),
+        ("votes", "vo", "json"),
+        ("vote_candidates", "vc", "json"),
+        ("vote_round", "vr", "int"),
+        ("deck", "dk", "json"),
+        ("rng_seed", "rs", "int"),
+    )
+    PLAYER_FIELDS = ("display_name", "role", "is_alive", "is_ready", "voted_by",
+                     "skill_used", "special_effects")
+    VERSION = "v"
+    PLAYER_ORDER = "po"
+    PLAYER_PREFIX = "p:"
+
+    def __init__(self, client: RedisClient, prefix: str = "werewolf:"):
+        self.client = client
+        self.prefix = prefix
+        # room_id -> (已知版本, 最後寫入的欄位)，用來做版本比對與只寫入變動的欄位
+        self._known: Dict[str, Tuple[int, Dict[str, str]]] = {}
+        self._known_lock = threading.Lock()
+        self._subscriptions: List[Subscription] = []
+        # 自己發出的計時器通知不需處理
+        self._origin = uuid.uuid4().hex
+
+    def _room_key(self, room_id: str) -> str:
+        return f"{self.prefix}room:{room_id}"
+
+    def _stats_key(self, user_id: str) -> str:
+        return f"{self.prefix}stats:{user_id}"
+
+    def _log_key(self, room_id: str, day: str) -> str:
+        return f"{self.prefix}logs:{room_id}:{day}"
+
+    @property
+    def _rooms_key(self) -> str:
+        return f"{self.prefix}rooms"
+
+    @property
+    def timer_channel(self) -> str:
+        return f"{self.prefix}timers"
+
+    @property
+    def save_channel(self) -> str:
+        return f"{self.prefix}saves"
+
+    # 遊戲存檔
+    @classmethod
+    def encode_room(cls, data: Dict[str, Any]) -> Dict[str, str]:
+        fields = {}
+        for name, field, kind in cls.ROOM_FIELDS:
+            value = data.get(name)
+            if kind == "json":
+                fields[field] = _dumps(value)
+            elif kind == "bool":
+                fields[field] = "1" if value else "0"
+            else:
+                fields[field] = str(value)
+        fields[cls.PLAYER_ORDER] = _dumps([player["user_id"] for player in data["players"]])
+        for player in data["players"]:
+            fields[cls.PLAYER_PREFIX + player["user_id"]] = _dumps(
+                [player[name] for name in cls.PLAYER_FIELDS]
+            )
+        return fields
+
+    @classmethod
+    def decode_room(cls, room_id: str, fields: Dict[str, str]) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"room_id": room_id}
+        for name, field, kind in cls.ROOM_FIELDS:
+            value = fields.get(field)
+            if value is None:
+                continue
+            if kind == "json":
+                data[name] = json.loads(value)
+            elif kind == "bool":
+                data[name] = value == "1"
+            elif kind == "int":
+                data[name] = int(value)
+            else:
+                data[name] = value
+        data["players"] = []
+        for user_id in json.loads(fields.get(cls.PLAYER_ORDER, "[]")):
+            values = json.loads(fields[cls.PLAYER_PREFIX + user_id])
+            player = dict(zip(cls.PLAYER_FIELDS, values))
+            player["user_id"] = user_id
+            data["players"].append(player)
+        return data
+
+    def room_ids(self) -> Set[str]:
+        return set(self.client.execute("SMEMBERS", self._rooms_key))
+
+    def has_room(self, room_id: str) -> bool:
+        return self.client.execute("EXISTS", self._room_key(room_id)) == 1
+
+    # EXEC 因 WATCH 失敗時重新比對版本的次數
+    SAVE_ATTEMPTS = 3
+
+    def save_rooms(self, rooms: Dict[str, Dict[str, Any]]):
+        if not rooms:
+            return
+        for _ in range(self.SAVE_ATTEMPTS):
+            if self._save_rooms_once(rooms):
+                return
+        self._forget(list(rooms))
+        raise VersionConflict(list(rooms))
+
+    def _save_rooms_once(self, rooms: Dict[str, Dict[str, Any]]) -> bool:
+        """寫入成功回傳 True；EXEC 因 WATCH 失敗回傳 False，重新比對版本即可找出衝突的房間"""
+        keys = {room_id: self._room_key(room_id) for room_id in rooms}
+        with self._known_lock:
+            known = {room_id: self._known.get(room_id) for room_id in rooms}
+
+        with self.client.connection() as conn:
+            # WATCH 之後讀取版本，與 MULTI 之間若有其他 worker 寫入，EXEC 會失敗
+            conn.send(("WATCH", *keys.values()), *[("HGET", key, self.VERSION) for key in keys.values()])
+            replies = [conn.read_reply() for _ in range(len(keys) + 1)]
+            for reply in replies:
+                if isinstance(reply, RedisError):
+                    conn.execute("UNWATCH")
+                    raise reply
+            current = {room_id: int(version or 0) for room_id, version in zip(keys, replies[1:])}
+            conflicts = [room_id for room_id in rooms
+                         if current[room_id] != (known[room_id][0] if known[room_id] else 0)]
+            if conflicts:
+                conn.execute("UNWATCH")
+                self._forget(conflicts)
+                raise VersionConflict(conflicts)
+
+            commands: List[Tuple] = [("MULTI",)]
+            written: Dict[str, Tuple[int, Dict[str, str]]] = {}
+            for room_id, data in rooms.items():
+                key = keys[room_id]
+                fields = self.encode_room(data)
+                version = current[room_id] + 1
+                previous = known[room_id][1] if known[room_id] else None
+                if previous is None:
+                    # 不知道原本有哪些欄位，整個 hash 重寫
+                    commands.append(("DEL", key))
+                    changed = fields
+                else:
+                    changed = {field: value for field, value in fields.items()
+                               if previous.get(field) != value}
+                    removed = [field for field in previous if field not in fields]
+                    if removed:
+                        commands.append(("HDEL", key, *removed))
+                changed = dict(changed, **{self.VERSION: str(version)})
+                commands.append(("HSET", key, *[item for pair in changed.items() for item in pair]))
+                commands.append(("SADD", self._rooms_key, room_id))
+                written[room_id] = (version, fields)
+            commands.append(("PUBLISH", self.save_channel, _dumps([list(rooms), self._origin])))
+            commands.append(("EXEC",))
+            conn.send(*commands)
+            replies = [conn.read_reply() for _ in commands]
+
+        result = replies[-1]
+        if isinstance(result, RedisError):
+            raise result
+        if result is None:
+            # WATCH 的房間在讀取版本後被修改
+            return False
+        errors = [reply for reply in result if isinstance(reply, RedisError)]
+        if errors:
+            raise errors[0]
+        with self._known_lock:
+            self._known.update(written)
+        return True
+
+    def _forget(self, room_ids: List[str]):
+        with self._known_lock:
+            for room_id in room_ids:
+                self._known.pop(room_id, None)
+
+    def load_room(self, room_id: str) -> Optional[Dict[str, Any]]:
+        reply = self.client.execute("HGETALL", self._room_key(room_id))
+        if not reply:
+            self._forget([room_id])
+            return None
+        fields = dict(zip(reply[::2], reply[1::2]))
+        version = int(fields.pop(self.VERSION, 0))
+        with self._known_lock:
+            self._known[room_id] = (version, fields)
+        return self.decode_room(room_id, fields)
+
+    def room_version(self, room_id: str) -> int:
+        """本 worker 最後讀取或寫入的房間版本"""
+        with self._known_lock:
+            known = self._known.get(room_id)
+        return known[0] if known else 0
+
+    def delete_room(self, room_id: str):
+        self.client.transaction([
+            ("DEL", self._room_key(room_id)),
+            ("SREM", self._rooms_key, room_id),
+        ])
+        self._forget([room_id])
+
+    # 玩家統計
+    def record_stats(self, results: List[StatResult]):
+        commands = []
+        for user_id, won, role, played_at in results:
+            key = self._stats_key(user_id)
+            commands += [
+                ("HINCRBY", key, "games_played", 1),
+                ("HINCRBY", key, "wins" if won else "losses", 1),
+                ("HINCRBY", key, f"r:{role}", 1),
+                ("HSET", key, "last_played", played_at),
+            ]
+        if commands:
+            self.client.transaction(commands)
+
+    def load_stats(self, user_id: str) -> Optional[Dict[str, Any]]:
+        reply = self.client.execute("HGETALL", self._stats_key(user_id))
+        if not reply:
+            return None
+        fields = dict(zip(reply[::2], reply[1::2]))
+        return {
+            "games_played": int(fields.get("games_played", 0)),
+            "wins": int(fields.get("wins", 0)),
+            "losses": int(fields.get("losses", 0)),
+            "roles_played": {field[2:]: int(value) for field, value in fields.items()
+                             if field.startswith("r:")},
+            "last_played": fields.get("last_played")
+        }
+
+    # 遊戲紀錄
+    def append_logs(self, entries: List[LogEntry]):
+        lists: Dict[str, List[str]] = {}
+        for room_id, timestamp, event in entries:
+            lists.setdefault(self._log_key(room_id, log_day(timestamp)), []).append(
+                format_log_line(timestamp, event)
+            )
+        replies = self.client.pipeline([("RPUSH", key, *lines) for key, lines in lists.items()])
+        errors = [reply for reply in replies if isinstance(reply, RedisError)]
+        if errors:
+            raise errors[0]
+
+    def read_logs(self, room_id: str, day: str) -> List[str]:
+        return self.client.execute("LRANGE", self._log_key(room_id, day), 0, -1)
+
+    def tail_logs(self, room_id: str, day: str, limit: int) -> List[str]:
+        return self.client.execute("LRANGE", self._log_key(room_id, day), -limit, -1)
+
+    # 計時器通知
+    def publish_timer(self, room_id: str, name: str):
+        self.client.publish(self.timer_channel, _dumps([room_id, name, self._origin]))
+
+    def subscribe_timers(self, callback: Callable[[str, str], None]):
+        def on_message(message: str):
+            room_id, name, origin = json.loads(message)
+            if origin != self._origin:
+                callback(room_id, name)
+
+        self._subscriptions.append(self.client.subscribe(self.timer_channel, on_message))
+
+    def subscribe_saves(self, callback: Callable[[str], None]):
+        def on_message(message: str):
+            room_ids, origin = json.loads(message)
+            if origin != self._origin:
+                for room_id in room_ids:
+                    callback(room_id)
+
+        self._subscriptions.append(self.client.subscribe(self.save_channel, on_message))
+
+    def close(self):
+        for subscription in self._subscriptions:
+            subscription.close()
+        self._subscriptions = []
+        self.client.close()
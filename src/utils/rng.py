@@ -0,0 +1,90 @@
+import os
+import random
+import threading
+from typing import Any, List, MutableSequence, Optional, Sequence
+
+_MASK = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+# 每個事件可使用的亂數個數（事件序號左移的位數）
+_EVENT_SHIFT = 16
+
+
+def new_seed() -> int:
+    """由作業系統產生的 64 位元種子，不經過任何共用的亂數狀態"""
+    return int.from_bytes(os.urandom(8), 'big')
+
+
+class RoomRandom:
+    """房間專用、以計數器推導的亂數產生器（SplitMix64）
+
+    第 n 個亂數只由 (seed, n) 決定，狀態只有兩個整數，不需像 random.Random
+    為每個房間保留數 KB 的內部狀態，也不與其他房間或執行緒共用。
+    房間在每個事件開始時以 at(事件序號) 定位，因此只要保存 seed，
+    重播事件日誌或回報問題時都能得到完全相同的洗牌與隨機事件。
+    提供 random / randbelow / choice / shuffle，可取代 random 模組傳入其他元件。
+    """
+
+    __slots__ = ("seed", "counter")
+
+    def __init__(self, seed: Optional[int] = None, counter: int = 0):
+        self.seed = (new_seed() if seed is None else seed) & _MASK
+        self.counter = counter
+
+    def at(self, position: int) -> "RoomRandom":
+        """定位到第 position 個事件的亂數區段"""
+        self.counter = position << _EVENT_SHIFT
+        return self
+
+    def next64(self) -> int:
+        self.counter += 1
+        z = (self.seed + self.counter * _GOLDEN) & _MASK
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK
+        return z ^ (z >> 31)
+
+    def random(self) -> float:
+        """[0, 1) 的浮點數"""
+        return (self.next64() >> 11) * (1.0 / (1 << 53))
+
+    def randbelow(self, n: int) -> int:
+        """[0, n) 的整數（乘法映射，n 遠小於 2^64 時偏差可忽略）"""
+        return (self.next64() * n) >> 64
+
+    def choice(self, seq: Sequence[Any]) -> Any:
+        return seq[self.randbelow(len(seq))]
+
+    def shuffle(self, items: MutableSequence[Any]):
+        """Fisher-Yates 洗牌（原地）
+
+        一個 64 位元亂數以混合進位拆成多個位置，直到剩餘範圍的乘積超過
+        2^32 才取下一個亂數；12 人的牌組只需一個亂數，偏差小於 2^-32。
+        """
+        word = span = 0
+        for i in range(len(items) - 1, 0, -1):
+            size = i + 1
+            if span < (size << 32):
+                word = self.next64()
+                span = _MASK
+            word, j = divmod(word, size)
+            span //= size
+            items[i], items[j] = items[j], items[i]
+
+    def shuffled_batch(self, items: Sequence[Any], count: int) -> List[List[Any]]:
+        """批次模擬用：連續產生 count 組洗好的副本"""
+        result = []
+        for _ in range(count):
+            deal = list(items)
+            self.shuffle(deal)
+            result.append(deal)
+        return result
+
+
+_local = threading.local()
+
+
+def thread_rng() -> random.Random:
+    """目前執行緒專用的 random.Random，用於不需重現的隨機選擇（例如每日提示）"""
+    rng = getattr(_local, "rng", None)
+    if rng is None:
+        rng = _local.rng = random.Random(new_seed())
+    return rng
@@ -1,54 +1,26 @@
-import json
-import os
 from typing import Dict, Any
 from datetime import datetime
+from .backend import FileBackend, StorageBackend, empty_stats
+from .metrics import metrics
 
 class PlayerStats:
-    def __init__(self, stats_file: str = "player_stats.json"):
-        self.stats_file = stats_file
-        self.stats = self._load_stats()
-
-    def _load_stats(self) -> Dict[str, Any]:
-        if os.path.exists(self.stats_file):
-            with open(self.stats_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
-
-    def _save_stats(self):
-        with open(self.stats_file, 'w', encoding='utf-8') as f:
-            json.dump(self.stats, f, ensure_ascii=False, indent=2)
+    def __init__(self, stats_file: str = "player_stats.json", backend: StorageBackend = None):
+        self.backend = backend or FileBackend(stats_file=stats_file)
 
     def update_player_stats(self, user_id: str, game_result: Dict[str, Any]):
-        if user_id not in self.stats:
-            self.stats[user_id] = {
-                "games_played": 0,
-                "wins": 0,
-                "losses": 0,
-                "roles_played": {},
-                "last_played": None
-            }
-
-        stats = self.stats[user_id]
-        stats["games_played"] += 1
-        stats["last_played"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        if game_result["won"]:
-            stats["wins"] += 1
-        else:
-            stats["losses"] += 1
-
-        role = game_result["role"]
-        if role not in stats["roles_played"]:
-            stats["roles_played"][role] = 0
-        stats["roles_played"][role] += 1
-
-        self._save_stats()
+        self.record_game_results({user_id: game_result})
+
+    @metrics.timed("werewolf_stats_write_seconds")
+    def record_game_results(self, results: Dict[str, Dict[str, Any]]):
+        """一次寫入一場遊戲所有玩家的結果（user_id -> {"won", "role"}）"""
+        played_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            self.backend.record_stats([
+                (user_id, bool(result["won"]), result["role"], played_at)
+                for user_id, result in results.items()
+            ])
+        except Exception as e:
+            print(f"更新玩家統計失敗: {str(e)}")
 
     def get_player_stats(self, user_id: str) -> Dict[str, Any]:
-        return self.stats.get(user_id, {
-            "games_played": 0,
-            "wins": 0,
-            "losses": 0,
-            "roles_played": {},
-            "last_played": None
-        })
\ No newline at end of file
+        return self.backend.load_stats(user_id) or empty_stats()
\ No newline at end of file
@@ -1,70 +1,292 @@
-import json
-import os
-from typing import Dict
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Set, Tuple
+from .backend import FileBackend, RoomConflict, StorageBackend
+from .journal import RoomJournal
+from .metrics import metrics
 from ..game.room import GameRoom
 from ..game.player import Player
 from ..game.role import Role, RoleType
 from ..game.state import GameState
 
 class GameStorage:
-    def __init__(self, storage_dir: str = "game_data"):
-        self.storage_dir = storage_dir
-        os.makedirs(storage_dir, exist_ok=True)
+    """遊戲狀態存檔
 
-    def save_game(self, room: GameRoom) -> bool:
-        try:
-            game_data = {
-                "room_id": room.room_id,
-                "game_state": room.game_state.value,
-                "day_count": room.day_count,
-                "players": [
-                    {
-                        "user_id": player.user_id,
-                        "display_name": player.display_name,
-                        "role": player.role.role_type.value if player.role else None,
-                        "is_alive": player.is_alive(),
-                        "is_ready": player.is_ready
-                    }
-                    for player in room.players.values()
-                ],
-                "witch_potion": room.witch_potion,
-                "night_actions": room.night_actions
-            }
-            
-            file_path = os.path.join(self.storage_dir, f"{room.room_id}.json")
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(game_data, f, ensure_ascii=False, indent=2)
+    房間狀態改變時呼叫 mark_dirty 記錄最新快照，由背景執行緒每隔
+    flush_interval 秒合併寫入，因此每個房間在一個寫入週期內最多寫一次磁碟。
+    實際的讀寫交給 StorageBackend，預設為每個房間一個 JSON 檔的 FileBackend。
+    flush_interval 為 0 時 mark_dirty 會立即寫入。
+    搭配 RoomJournal 時，快照之後的狀態改變由事件日誌補上，讀取時重播。
+    共用後端回報版本衝突時捨棄該房間的快照（其他房間照常寫入），
+    並以 on_conflict(room_ids) 通知持有房間的一方重新讀取。
+    """
+
+    # 共用後端查無存檔的結果保留的秒數，沒有遊戲的群組不必每個指令都查詢後端
+    MISSING_TTL = 2.0
+    MISSING_LIMIT = 10000
+
+    def __init__(self, storage_dir: str = "game_data", flush_interval: float = 0,
+                 backend: StorageBackend = None, journal: RoomJournal = None):
+        self.backend = backend or FileBackend(storage_dir=storage_dir)
+        self.journal = journal
+        self.flush_interval = flush_interval
+        # 啟動時建立已保存遊戲的索引，查無遊戲的群組不需再讀取存檔；
+        # 多個行程共用的後端則每次直接查詢
+        self.saved_rooms: Set[str] = set() if self.backend.shared else self.backend.room_ids()
+        self._missing: Dict[str, float] = {}  # room_id -> 查無存檔的時間
+        self._seq = itertools.count(1)
+        self._dirty: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        # 已寫入（或刪除）的最新序號，只在有快照從佇列取出、尚未寫完時保留，
+        # 用來略過較晚才寫入的舊快照；_in_flight 為各房間寫入中的快照數
+        self._written_seq: Dict[str, int] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._dirty_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.on_conflict: Callable[[List[str]], None] = None
+        self._flusher = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="storage-flusher", daemon=True)
+            self._flusher.start()
+
+    def attach(self, room: GameRoom):
+        """開始記錄房間的事件日誌"""
+        if self.journal:
+            self.journal.attach(room)
+
+    def refresh(self, room_id: str):
+        """重新確認房間是否有存檔（其他行程寫入的存檔不在本行程的索引中）"""
+        self._missing.pop(room_id, None)
+        if self.backend.has_room(room_id):
+            self.saved_rooms.add(room_id)
+        if self.journal:
+            self.journal.refresh(room_id)
+
+    def has_game(self, room_id: str) -> bool:
+        if self.journal and self.journal.has_events(room_id):
             return True
-            
+        if self.backend.shared:
+            return self._has_shared_game(room_id)
+        return room_id in self.saved_rooms
+
+    def _has_shared_game(self, room_id: str) -> bool:
+        now = time.monotonic()
+        checked_at = self._missing.get(room_id)
+        if checked_at is not None and now - checked_at < self.MISSING_TTL:
+            return False
+        if self.backend.has_room(room_id):
+            self._missing.pop(room_id, None)
+            return True
+        if len(self._missing) >= self.MISSING_LIMIT:
+            self._missing = {key: at for key, at in self._missing.items() if now - at < self.MISSING_TTL}
+        self._missing[room_id] = now
+        return False
+
+    def invalidate(self, room_id: str):
+        """其他 worker 寫入房間後，清除查無存檔的快取"""
+        self._missing.pop(room_id, None)
+
+    def delete_game(self, room_id: str):
+        with self._write_lock:
+            with self._dirty_lock:
+                self._dirty.pop(room_id, None)
+                if room_id in self._in_flight:
+                    # 寫入中的舊快照不能讓存檔復活
+                    self._written_seq[room_id] = next(self._seq)
+            self.saved_rooms.discard(room_id)
+            try:
+                self.backend.delete_room(room_id)
+                if self.journal:
+                    self.journal.delete(room_id)
+            except Exception as e:
+                print(f"刪除遊戲失敗: {str(e)}")
+
+    @staticmethod
+    def snapshot(room: GameRoom) -> Dict[str, Any]:
+        return {
+            "room_id": room.room_id,
+            "game_state": room.game_state.value,
+            "day_count": room.day_count,
+            "event_seq": room.event_seq,
+            "current_turn": room.current_turn,
+            "night_action_count": room.night_action_count,
+            "is_werewolf_action_time": room.is_werewolf_action_time,
+            "players": [
+                {
+                    "user_id": player.user_id,
+                    "display_name": player.display_name,
+                    "role": player.role.role_type.value if player.role else None,
+                    "is_alive": bool(player.is_alive()),
+                    "is_ready": player.is_ready,
+                    "voted_by": list(player.voted_by),
+                    "skill_used": player.role.skill_used if player.role else False,
+                    "special_effects": dict(player.role.special_effects) if player.role else {}
+                }
+                for player in room.players.values()
+            ],
+            "witch_potion": dict(room.witch_potion),
+            "night_actions": dict(room.night_actions),
+            "delayed_actions": [dict(action) for action in room.delayed_actions],
+            "votes": dict(room.votes),
+            "vote_candidates": room.vote_candidates,
+            "vote_round": room.vote_round,
+            "deck": room.deck.spec if room.deck else None,
+            "rng_seed": room.rng.seed
+        }
+
+    @staticmethod
+    def restore(data: Dict[str, Any]) -> GameRoom:
+        room = GameRoom(data["room_id"], data.get("rng_seed"))
+        room.game_state = GameState(data["game_state"])
+        room.day_count = data["day_count"]
+        room.event_seq = data.get("event_seq", 0)
+        room.current_turn = data.get("current_turn", 0)
+        room.night_action_count = data.get("night_action_count", 0)
+        room.is_werewolf_action_time = data.get("is_werewolf_action_time", False)
+        room.witch_potion = data["witch_potion"]
+        room.night_actions = data["night_actions"]
+        room.delayed_actions = data.get("delayed_actions", [])
+        room.votes = data.get("votes", {})
+        candidates = data.get("vote_candidates")
+        room.tally.candidates = set(candidates) if candidates else None
+        room.vote_round = data.get("vote_round", 0)
+        room.set_deck(data.get("deck"))
+
+        for player_data in data["players"]:
+            player = Player(player_data["user_id"], player_data["display_name"])
+            player.is_ready = player_data["is_ready"]
+            if player_data["role"]:
+                role = Role(RoleType(player_data["role"]))
+                if not player_data["is_alive"]:
+                    role.kill()
+                role.skill_used = player_data.get("skill_used", False)
+                role.special_effects = player_data.get("special_effects", {})
+                player.set_role(role)
+            room.seat_player(player)
+        # 投票以座位記錄，所有玩家入座後才能還原
+        for player_data in data["players"]:
+            room.players[player_data["user_id"]].voted_by = player_data.get("voted_by", [])
+        return room
+
+    def mark_dirty(self, room: GameRoom) -> bool:
+        """記錄房間的最新快照，等待背景寫入"""
+        try:
+            game_data = self.snapshot(room)
         except Exception as e:
             print(f"保存遊戲失敗: {str(e)}")
             return False
+        with self._dirty_lock:
+            self._dirty[room.room_id] = (next(self._seq), game_data)
+        if not self._flusher:
+            return self.flush(room.room_id)
+        return True
+
+    @metrics.timed("werewolf_storage_seconds", op="save")
+    def save_game(self, room: GameRoom) -> bool:
+        """立即寫入房間狀態"""
+        marked = self.mark_dirty(room)
+        return self.flush(room.room_id) and marked
+
+    def flush(self, room_id: str = None) -> bool:
+        """寫入尚未保存的快照；未指定 room_id 時寫入全部"""
+        with self._dirty_lock:
+            if room_id is None:
+                pending = list(self._dirty.items())
+                self._dirty.clear()
+            elif room_id in self._dirty:
+                pending = [(room_id, self._dirty.pop(room_id))]
+            else:
+                pending = []
+            for pending_id, _ in pending:
+                self._in_flight[pending_id] = self._in_flight.get(pending_id, 0) + 1
 
-    def load_game(self, room_id: str) -> GameRoom:
         try:
-            file_path = os.path.join(self.storage_dir, f"{room_id}.json")
-            if not os.path.exists(file_path):
-                return None
-
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            room = GameRoom(room_id)
-            room.game_state = GameState(data["game_state"])
-            room.day_count = data["day_count"]
-            room.witch_potion = data["witch_potion"]
-            room.night_actions = data["night_actions"]
-
-            for player_data in data["players"]:
-                player = Player(player_data["user_id"], player_data["display_name"])
-                player.is_ready = player_data["is_ready"]
-                if player_data["role"]:
-                    role = Role(RoleType(player_data["role"]))
-                    if not player_data["is_alive"]:
-                        role.kill()
-                    player.set_role(role)
-                room.players[player.user_id] = player
+            return self._write(pending)
+        finally:
+            with self._dirty_lock:
+                for pending_id, _ in pending:
+                    self._in_flight[pending_id] -= 1
+                    if not self._in_flight[pending_id]:
+                        # 沒有其他寫入中的快照，不需再比對序號
+                        del self._in_flight[pending_id]
+                        self._written_seq.pop(pending_id, None)
 
+    def pending_count(self) -> int:
+        with self._dirty_lock:
+            return len(self._dirty)
+
+    @metrics.timed("werewolf_storage_seconds", op="write")
+    def _write(self, pending: List[Tuple[str, Tuple[int, Dict[str, Any]]]]) -> bool:
+        if not pending:
+            return True
+        with self._write_lock:
+            # 較新的快照已寫入（或存檔已刪除），略過舊快照
+            batch = {
+                room_id: (seq, game_data) for room_id, (seq, game_data) in pending
+                if self._written_seq.get(room_id, 0) <= seq
+            }
+            if not batch:
+                return True
+            conflicts: List[str] = []
+            while batch:
+                try:
+                    self.backend.save_rooms({room_id: data for room_id, (_, data) in batch.items()})
+                    break
+                except RoomConflict as e:
+                    # 其他 worker 已更新這些房間，本地快照是舊的，不能重試寫入
+                    print(f"保存遊戲失敗: {str(e)}")
+                    stale = [room_id for room_id in e.room_ids if room_id in batch]
+                    if not stale:
+                        return False
+                    for room_id in stale:
+                        del batch[room_id]
+                    conflicts += stale
+                except Exception as e:
+                    print(f"保存遊戲失敗: {str(e)}")
+                    return False
+            for room_id, (seq, data) in batch.items():
+                self._written_seq[room_id] = seq
+                self.saved_rooms.add(room_id)
+                self._missing.pop(room_id, None)
+                if self.journal:
+                    # 快照已包含的事件不需再保留
+                    self.journal.checkpoint(room_id, data["event_seq"])
+        if conflicts and self.on_conflict:
+            self.on_conflict(conflicts)
+        return not conflicts
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """停止背景寫入並寫入所有尚未保存的快照"""
+        self._stop.set()
+        if self._flusher:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    @metrics.timed("werewolf_storage_seconds", op="load")
+    def load_game(self, room_id: str) -> GameRoom:
+        # 尚在佇列中的快照先寫入
+        self.flush(room_id)
+        if not self.has_game(room_id):
+            return None
+
+        try:
+            data = self.backend.load_room(room_id)
+            if data is None:
+                self.saved_rooms.discard(room_id)
+                if not (self.journal and self.journal.has_events(room_id)):
+                    return None
+                # 還沒寫過快照的房間，完全由事件日誌重建
+                room = GameRoom(room_id)
+            else:
+                room = self.restore(data)
+            if self.journal:
+                self.journal.replay(room)
             return room
 
         except Exception as e:
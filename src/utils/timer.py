@@ -1,33 +1,178 @@
+import heapq
+import itertools
 import threading
 import time
-from typing import Callable, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from .metrics import metrics
+
+
+class _TimerEntry:
+    __slots__ = ("deadline", "seq", "room_id", "name", "duration", "callback", "cancelled", "fired")
+
+    def __init__(self, deadline: float, seq: int, room_id: str, name: str,
+                 duration: float, callback: Callable):
+        self.deadline = deadline
+        self.seq = seq
+        self.room_id = room_id
+        self.name = name
+        self.duration = duration
+        self.callback = callback
+        self.cancelled = False
+        self.fired = False  # 已從堆積取出、等待或正在執行回呼
+
+    def __lt__(self, other: "_TimerEntry") -> bool:
+        return (self.deadline, self.seq) < (other.deadline, other.seq)
+
 
 class GameTimer:
-    def __init__(self):
-        self.timers: Dict[str, threading.Timer] = {}
-        self.start_times: Dict[str, float] = {}
+    """單一排程執行緒的遊戲計時器
+
+    所有房間的計時器都放在同一個最小堆積中，由一條排程執行緒等待最早到期者，
+    因此不論有多少房間同時計時，執行緒數量都固定。
+    每個計時器以 (room_id, 名稱) 識別，例如 night / discussion / vote / warning。
+    排程與取消皆為 O(log n)；取消採延遲刪除，過多失效項目時再重建堆積。
+    到期的回呼交由固定大小的執行緒池執行，避免阻塞排程執行緒；回呼執行前計時器仍可取消。
+    """
+
+    def __init__(self, callback_workers: int = 2):
+        self._heap: List[_TimerEntry] = []
+        self._rooms: Dict[str, Dict[str, _TimerEntry]] = {}
+        self._phases: Dict[str, str] = {}  # room_id -> 目前階段計時器名稱
+        self._seq = itertools.count()
+        self._cancelled = 0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = True
+        self._callback_workers = callback_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # 計時器回呼執行後的通知 (room_id, 名稱)
+        self.on_expire: Optional[Callable[[str, str], None]] = None
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self._callback_workers, thread_name_prefix="timer-callback"
+            )
+            self._thread = threading.Thread(target=self._run, name="game-timer", daemon=True)
+            self._thread.start()
+
+    def schedule(self, room_id: str, name: str, duration: float, callback: Callable):
+        """設置具名計時器，同名計時器會被取代"""
+        with self._condition:
+            self._cancel_entry(self._rooms.get(room_id, {}).get(name))
+            entry = _TimerEntry(time.monotonic() + duration, next(self._seq),
+                                room_id, name, duration, callback)
+            self._rooms.setdefault(room_id, {})[name] = entry
+            heapq.heappush(self._heap, entry)
+            self._ensure_thread()
+            if self._heap[0] is entry:
+                self._condition.notify()
 
     def start_timer(self, room_id: str, duration: int, callback: Callable, phase: str):
-        # 取消該房間現有的計時器
-        self.cancel_timer(room_id)
-        
-        # 設置新的計時器
-        timer = threading.Timer(duration, callback)
-        timer.start()
-        
-        self.timers[room_id] = timer
-        self.start_times[room_id] = time.time()
+        # 進入新階段時取消該房間所有計時器（包含上一階段的警告）
+        with self._condition:
+            self.cancel_timer(room_id)
+            self.schedule(room_id, phase, duration, callback)
+            self._phases[room_id] = phase
+
+    def cancel(self, room_id: str, name: str):
+        with self._condition:
+            self._cancel_entry(self._rooms.get(room_id, {}).get(name))
 
     def cancel_timer(self, room_id: str):
-        if room_id in self.timers:
-            self.timers[room_id].cancel()
-            del self.timers[room_id]
-            del self.start_times[room_id]
-
-    def get_remaining_time(self, room_id: str) -> int:
-        if room_id in self.start_times:
-            elapsed = time.time() - self.start_times[room_id]
-            total_duration = self.timers[room_id].interval
-            remaining = max(0, total_duration - elapsed)
-            return int(remaining)
-        return 0
\ No newline at end of file
+        with self._condition:
+            for entry in list(self._rooms.get(room_id, {}).values()):
+                self._cancel_entry(entry)
+            self._phases.pop(room_id, None)
+
+    def _cancel_entry(self, entry: Optional[_TimerEntry]):
+        if entry is None or entry.cancelled:
+            return
+        entry.cancelled = True
+        self._detach(entry)
+        if entry.fired:
+            return  # 已不在堆積中，回呼執行前會檢查 cancelled
+        self._cancelled += 1
+        # 失效項目超過一半時重建堆積，維持記憶體與操作成本
+        if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+            self._heap = [e for e in self._heap if not e.cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    def _detach(self, entry: _TimerEntry):
+        room_timers = self._rooms.get(entry.room_id)
+        if room_timers and room_timers.get(entry.name) is entry:
+            del room_timers[entry.name]
+            if not room_timers:
+                del self._rooms[entry.room_id]
+
+    def get_remaining_time(self, room_id: str, name: str = None) -> int:
+        with self._condition:
+            name = name or self._phases.get(room_id)
+            entry = self._rooms.get(room_id, {}).get(name)
+            if entry is None:
+                return 0
+            return int(max(0, entry.deadline - time.monotonic()))
+
+    def has_timers(self, room_id: str) -> bool:
+        with self._condition:
+            return room_id in self._rooms
+
+    def active_count(self) -> int:
+        with self._condition:
+            return len(self._heap) - self._cancelled
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running:
+                    while self._heap and self._heap[0].cancelled:
+                        heapq.heappop(self._heap)
+                        self._cancelled -= 1
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    delay = self._heap[0].deadline - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                if not self._running:
+                    return
+
+                entry = heapq.heappop(self._heap)
+                # 回呼執行完才移除，等待執行緒池期間仍可被取消
+                entry.fired = True
+                if self._phases.get(entry.room_id) == entry.name:
+                    del self._phases[entry.room_id]
+
+            try:
+                self._pool.submit(self._fire, entry)
+            except RuntimeError:
+                return  # 執行緒池已關閉
+
+    def _fire(self, entry: _TimerEntry):
+        if entry.cancelled:
+            return
+        metrics.inc("werewolf_timer_fired_total", name=entry.name)
+        try:
+            with metrics.time("werewolf_timer_callback_seconds", name=entry.name):
+                entry.callback()
+        except Exception as e:
+            print(f"計時器回呼失敗: {str(e)}")
+        finally:
+            with self._condition:
+                self._detach(entry)
+        if self.on_expire:
+            try:
+                self.on_expire(entry.room_id, entry.name)
+            except Exception as e:
+                print(f"計時器通知失敗: {str(e)}")
+
+    def shutdown(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join()
+            self._pool.shutdown(wait=False)
\ No newline at end of file
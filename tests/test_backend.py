@@ -0,0 +1,236 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.game.room import GameRoom
+from src.utils.backend import FileBackend, KeyedLog, RoomConflict, SQLiteBackend, StorageBackend
+from src.utils.logger import GameLogger
+from src.utils.statistics import PlayerStats
+from src.utils.storage import GameStorage
+
+def record_games(path: str, games: int):
+    backend = SQLiteBackend(path)
+    stats = PlayerStats(backend=backend)
+    for i in range(games):
+        stats.update_player_stats("user_1", {"won": i % 2 == 0, "role": "狼人"})
+    backend.close()
+
+class BackendContract:
+    def make_backend(self, directory: str):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = self.make_backend(self.tmp.name)
+
+    def tearDown(self):
+        self.backend.close()
+        self.tmp.cleanup()
+
+    def test_room_round_trip(self):
+        storage = GameStorage(backend=self.backend)
+        room = GameRoom("group_a")
+        room.add_player("user_1", "Player 1")
+        room.day_count = 3
+        self.assertTrue(storage.save_game(room))
+        self.assertTrue(storage.has_game("group_a"))
+
+        loaded = GameStorage(backend=self.backend).load_game("group_a")
+        self.assertEqual(loaded.day_count, 3)
+        self.assertIn("user_1", loaded.players)
+
+        storage.delete_game("group_a")
+        self.assertFalse(storage.has_game("group_a"))
+        self.assertIsNone(storage.load_game("group_a"))
+
+    def test_stats_accumulate(self):
+        stats = PlayerStats(backend=self.backend)
+        stats.update_player_stats("user_1", {"won": True, "role": "狼人"})
+        stats.update_player_stats("user_1", {"won": False, "role": "平民"})
+        stats.update_player_stats("user_1", {"won": True, "role": "狼人"})
+
+        result = stats.get_player_stats("user_1")
+        self.assertEqual(result["games_played"], 3)
+        self.assertEqual(result["wins"], 2)
+        self.assertEqual(result["losses"], 1)
+        self.assertEqual(result["roles_played"], {"狼人": 2, "平民": 1})
+        self.assertEqual(stats.get_player_stats("unknown")["games_played"], 0)
+
+    def test_logs_are_kept_per_room(self):
+        logger = GameLogger(backend=self.backend)
+        logger.log_game_event("group_a", "第一天")
+        logger.log_game_event("group_b", "其他房間")
+        logger.log_game_event("group_a", "第二天")
+
+        history = logger.get_game_history("group_a")
+        self.assertEqual(len(history), 2)
+        self.assertTrue(history[0].endswith("] 第一天\n"))
+        self.assertTrue(history[1].endswith("] 第二天\n"))
+
+class TestStorageBackend(unittest.TestCase):
+    def test_backends_must_implement_every_operation(self):
+        class PartialBackend(StorageBackend):
+            def room_ids(self):
+                return set()
+
+        with self.assertRaises(TypeError):
+            PartialBackend()
+
+class TestFileBackend(BackendContract, unittest.TestCase):
+    def make_backend(self, directory: str):
+        return FileBackend(
+            storage_dir=os.path.join(directory, "game_data"),
+            stats_file=os.path.join(directory, "player_stats.json"),
+            log_dir=os.path.join(directory, "game_logs")
+        )
+
+class TestKeyedLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "stats.log")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_game_results_are_written_once(self):
+        stats = PlayerStats(os.path.join(self.tmp.name, "player_stats.json"))
+        with patch('src.utils.backend.os.fsync') as fsync:
+            stats.record_game_results({
+                f"user_{i}": {"won": i < 4, "role": "平民"} for i in range(12)
+            })
+            self.assertEqual(fsync.call_count, 1)
+        self.assertEqual(stats.get_player_stats("user_0")["wins"], 1)
+        self.assertEqual(stats.get_player_stats("user_11")["losses"], 1)
+
+    def test_lookup_reads_only_the_latest_record(self):
+        log = KeyedLog(self.path)
+        log.put_many({"a": {"n": 1}, "b": {"n": 1}})
+        log.put_many({"a": {"n": 2}})
+
+        reopened = KeyedLog(self.path)
+        with patch('src.utils.backend.json.loads', wraps=json.loads) as loads:
+            self.assertEqual(reopened.get("a"), {"n": 2})
+            self.assertEqual(loads.call_count, 1)
+        self.assertEqual(len(reopened), 2)
+
+    def test_compaction_keeps_latest_values(self):
+        log = KeyedLog(self.path, min_compact=10)
+        for i in range(10):
+            log.put_many({"a": {"n": i}, "b": {"n": -i}})
+        with open(self.path, 'rb') as f:
+            self.assertLessEqual(len(f.readlines()), 10)
+
+        reopened = KeyedLog(self.path)
+        self.assertEqual(reopened.get("a"), {"n": 9})
+        self.assertEqual(reopened.get("b"), {"n": -9})
+
+    def test_torn_last_line_is_dropped(self):
+        log = KeyedLog(self.path)
+        log.put_many({"a": {"n": 1}})
+        with open(self.path, 'ab') as f:
+            f.write(b'a\t{"n":')
+
+        reopened = KeyedLog(self.path)
+        self.assertEqual(reopened.get("a"), {"n": 1})
+        reopened.put_many({"b": {"n": 2}})
+        self.assertEqual(KeyedLog(self.path).get("b"), {"n": 2})
+
+    def test_legacy_json_is_migrated(self):
+        legacy = os.path.join(self.tmp.name, "player_stats.json")
+        with open(legacy, 'w', encoding='utf-8') as f:
+            json.dump({"user_1": {"games_played": 3, "wins": 2, "losses": 1,
+                                  "roles_played": {"狼人": 3}, "last_played": None}}, f)
+
+        stats = PlayerStats(legacy)
+        stats.update_player_stats("user_1", {"won": True, "role": "狼人"})
+        self.assertEqual(stats.get_player_stats("user_1")["games_played"], 4)
+        self.assertFalse(os.path.exists(legacy))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "player_stats.log")))
+
+class TestSQLiteBackend(BackendContract, unittest.TestCase):
+    def make_backend(self, directory: str):
+        return SQLiteBackend(os.path.join(directory, "game.db"))
+
+    def test_wal_mode(self):
+        mode = self.backend._connection().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+    def test_missing_rooms_are_looked_up_once(self):
+        storage = GameStorage(backend=self.backend)
+        with patch.object(self.backend, 'has_room', wraps=self.backend.has_room) as has_room:
+            for _ in range(3):
+                self.assertFalse(storage.has_game("group_a"))
+            self.assertEqual(has_room.call_count, 1)
+
+            storage.save_game(GameRoom("group_a"))
+            self.assertTrue(storage.has_game("group_a"))
+            storage.MISSING_TTL = 0
+            self.assertFalse(storage.has_game("group_b"))
+            self.assertFalse(storage.has_game("group_b"))
+            self.assertEqual(has_room.call_count, 4)
+
+    def test_stale_writer_gets_a_conflict(self):
+        path = os.path.join(self.tmp.name, "game.db")
+        GameStorage(backend=self.backend).save_game(GameRoom("group_a"))
+        worker_a, worker_b = SQLiteBackend(path), SQLiteBackend(path)
+        room_a = GameStorage(backend=worker_a).load_game("group_a")
+        room_b = GameStorage(backend=worker_b).load_game("group_a")
+
+        room_a.day_count = 5
+        worker_a.save_rooms({"group_a": GameStorage.snapshot(room_a)})
+        room_b.day_count = 9
+        with self.assertRaises(RoomConflict):
+            worker_b.save_rooms({"group_a": GameStorage.snapshot(room_b),
+                                 "group_b": GameStorage.snapshot(GameRoom("group_b"))})
+        self.assertEqual(self.backend.load_room("group_a")["day_count"], 5)
+        self.assertFalse(self.backend.has_room("group_b"))
+
+        # 重新讀取後的修改建立在最新版本上
+        room_b = GameStorage(backend=worker_b).load_game("group_a")
+        room_b.day_count = 6
+        worker_b.save_rooms({"group_a": GameStorage.snapshot(room_b)})
+        self.assertEqual(self.backend.load_room("group_a")["day_count"], 6)
+        self.assertEqual(worker_b.room_version("group_a"), 3)
+        # 其他 worker 已建立的房間不能當成新房間覆蓋
+        worker_b.save_rooms({"group_c": GameStorage.snapshot(GameRoom("group_c"))})
+        with self.assertRaises(RoomConflict):
+            worker_a.save_rooms({"group_c": GameStorage.snapshot(GameRoom("group_c"))})
+        for backend in (worker_a, worker_b):
+            backend.close()
+
+    def test_old_databases_get_a_version_column(self):
+        path = os.path.join(self.tmp.name, "old.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE rooms (room_id TEXT PRIMARY KEY, data TEXT NOT NULL, "
+                     "updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)")
+        conn.execute("INSERT INTO rooms (room_id, data) VALUES (?, ?)",
+                     ("group_a", json.dumps(GameStorage.snapshot(GameRoom("group_a")))))
+        conn.commit()
+        conn.close()
+
+        backend = SQLiteBackend(path)
+        storage = GameStorage(backend=backend)
+        room = storage.load_game("group_a")
+        room.day_count = 2
+        self.assertTrue(storage.save_game(room))
+        self.assertEqual(backend.room_version("group_a"), 1)
+        backend.close()
+
+    def test_concurrent_processes_do_not_lose_updates(self):
+        path = os.path.join(self.tmp.name, "game.db")
+        processes = [multiprocessing.Process(target=record_games, args=(path, 50)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        result = PlayerStats(backend=self.backend).get_player_stats("user_1")
+        self.assertEqual(result["games_played"], 200)
+        self.assertEqual(result["wins"], 100)
+        self.assertEqual(result["roles_played"], {"狼人": 200})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import patch
+from src.game import deck as deck_module
+from src.game.deck import DeckError, RoleDeck, compile_deck
+from src.game.role import GUARD, VILLAGER, WEREWOLF, WOLF_KING
+from src.game.room import GameRoom
+from src.utils.config import GameConfig
+from src.utils.storage import GameStorage
+
+class TestRoleDeck(unittest.TestCase):
+    def setUp(self):
+        self.deck = compile_deck(GameConfig.DEFAULT_CONFIG)
+
+    def test_default_table(self):
+        self.assertEqual(sorted(self.deck.table), list(range(6, 13)))
+        self.assertEqual(self.deck.roles_for(6).count(WEREWOLF), 2)
+        self.assertEqual(self.deck.roles_for(9).count(WEREWOLF), 3)
+        ten = self.deck.roles_for(10)
+        self.assertEqual((ten.count(WEREWOLF), ten.count(WOLF_KING), ten.count(GUARD)), (3, 1, 1))
+        self.assertEqual(ten.count(VILLAGER), 2)
+        self.assertIsNone(self.deck.deal(5))
+        self.assertEqual(self.deck.distribution(6)["狼人"], 2)
+
+    def test_compiled_once_per_config(self):
+        self.assertIs(compile_deck(dict(GameConfig.DEFAULT_CONFIG)), self.deck)
+
+    def test_compiled_decks_are_bounded(self):
+        with patch('src.game.deck.DECK_CACHE_SIZE', 3):
+            configs = [dict(GameConfig.DEFAULT_CONFIG, max_players=12 - i) for i in range(5)]
+            decks = [compile_deck(config) for config in configs]
+            self.assertLessEqual(len(deck_module._decks), 3)
+            self.assertIs(compile_deck(configs[-1]), decks[-1])
+            self.assertIsNot(compile_deck(configs[0]), decks[0])
+
+    def test_explicit_roles(self):
+        deck = RoleDeck.from_config({
+            "min_players": 5, "max_players": 5,
+            "role_distribution": {"5": {"roles": {"狼人": 1, "守衛": 1, "預言家": 1}}}
+        })
+        self.assertEqual(sorted(deck.deal(5)), sorted([WEREWOLF, GUARD, 2, VILLAGER, VILLAGER]))
+
+    def test_invalid_configs(self):
+        base = {"min_players": 6, "max_players": 8}
+        invalid = [
+            {"role_distribution": {"6-7": {"werewolf": 2}}},  # 8 人沒有配置
+            {"role_distribution": {"6-8": {"werewolf": 2}, "8": {"werewolf": 2}}},  # 重複
+            {"role_distribution": {"6+": {"werewolf": 3}}},  # 狼人過多
+            {"role_distribution": {"6+": {"roles": {"吸血鬼": 1}}}},
+        ]
+        for config in invalid:
+            with self.assertRaises(DeckError):
+                RoleDeck.from_config(dict(base, **config))
+
+class TestRoomDeck(unittest.TestCase):
+    def test_custom_deck_is_used_and_saved(self):
+        room = GameRoom("group_a")
+        room.set_deck({
+            "min_players": 6, "max_players": 7,
+            "role_distribution": {"6-7": {"roles": {"狼人": 1, "狼王": 1, "守衛": 1}}}
+        })
+        for i in range(8):
+            room.add_player(f"user_{i}", f"Player {i}")
+        self.assertEqual(len(room.players), 7)
+
+        self.assertTrue(room.assign_roles())
+        codes = sorted(player.role.code for player in room.players.values())
+        self.assertEqual(codes, sorted([WEREWOLF, WOLF_KING, GUARD] + [VILLAGER] * 4))
+
+        restored = GameStorage.restore(GameStorage.snapshot(room))
+        self.assertIs(restored.deck, room.deck)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from src.bot.dispatcher import EventDispatcher, event_group_key
+
+def make_event(group_id: str, seq: int):
+    return SimpleNamespace(
+        source=SimpleNamespace(type='group', group_id=group_id, user_id="user"),
+        seq=seq
+    )
+
+class TestEventDispatcher(unittest.TestCase):
+    def test_events_in_same_group_keep_order(self):
+        handled = {}
+        lock = threading.Lock()
+
+        def handle(event):
+            time.sleep(0.001)
+            with lock:
+                handled.setdefault(event.source.group_id, []).append(event.seq)
+
+        dispatcher = EventDispatcher(handle, event_group_key, workers=4, max_queue=400)
+        for seq in range(20):
+            for group in ("g1", "g2", "g3"):
+                self.assertTrue(dispatcher.submit(make_event(group, seq)))
+        dispatcher.join()
+        dispatcher.shutdown()
+
+        for group in ("g1", "g2", "g3"):
+            self.assertEqual(handled[group], list(range(20)))
+
+    def test_stats_and_rejection(self):
+        release = threading.Event()
+        dispatcher = EventDispatcher(
+            lambda event: release.wait(), event_group_key,
+            workers=1, max_queue=1, enqueue_timeout=0.01
+        )
+        dispatcher.submit(make_event("g1", 0))  # 被工作執行緒取出後阻塞
+        time.sleep(0.05)
+        self.assertTrue(dispatcher.submit(make_event("g1", 1)))
+        self.assertFalse(dispatcher.submit(make_event("g1", 2)))
+        self.assertEqual(dispatcher.queue_depth(), 1)
+
+        release.set()
+        dispatcher.join()
+        stats = dispatcher.get_stats()
+        dispatcher.shutdown()
+
+        self.assertEqual(stats["processed"], 2)
+        self.assertEqual(stats["rejected"], 1)
+        self.assertGreater(stats["latency_max"], 0)
+
+    def test_submit_all_is_all_or_nothing(self):
+        release = threading.Event()
+        dispatcher = EventDispatcher(lambda event: release.wait(), event_group_key, workers=1, max_queue=2)
+        self.assertTrue(dispatcher.submit_all([make_event("g1", 0)]))  # 被工作執行緒取出後阻塞
+        time.sleep(0.05)
+
+        start = time.monotonic()
+        self.assertFalse(dispatcher.submit_all([make_event("g1", seq) for seq in range(1, 4)]))
+        self.assertLess(time.monotonic() - start, 0.1)
+        self.assertEqual(dispatcher.queue_depth(), 0)
+        self.assertTrue(dispatcher.submit_all([make_event("g1", 1), make_event("g2", 2)]))
+        self.assertEqual(dispatcher.queue_depth(), 2)
+
+        release.set()
+        dispatcher.join()
+        stats = dispatcher.get_stats()
+        dispatcher.shutdown()
+        self.assertEqual((stats["processed"], stats["rejected"]), (3, 3))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import threading
+import time
+import unittest
+from src.bot.executor import RoomExecutor
+
+class TestRoomExecutor(unittest.TestCase):
+    def test_same_room_runs_serially_in_order(self):
+        executor = RoomExecutor(workers=4)
+        results = {"room_a": [], "room_b": []}
+        active = {"room_a": 0, "room_b": 0}
+        overlaps = []
+
+        def task(room_id, seq):
+            active[room_id] += 1
+            if active[room_id] > 1:
+                overlaps.append(room_id)
+            time.sleep(0.001)
+            results[room_id].append(seq)
+            active[room_id] -= 1
+
+        futures = []
+        for seq in range(30):
+            for room_id in results:
+                futures.append(executor.submit(room_id, task, room_id, seq))
+        for future in futures:
+            future.result(timeout=5)
+        executor.shutdown()
+
+        self.assertEqual(overlaps, [])
+        self.assertEqual(results["room_a"], list(range(30)))
+        self.assertEqual(results["room_b"], list(range(30)))
+
+    def test_different_rooms_run_in_parallel(self):
+        executor = RoomExecutor(workers=2)
+        barrier = threading.Barrier(2, timeout=2)
+        futures = [executor.submit(room_id, barrier.wait) for room_id in ("room_a", "room_b")]
+        for future in futures:
+            future.result(timeout=5)  # 若序列執行，barrier 會逾時
+        executor.shutdown()
+
+    def test_reentrant_submit_runs_inline(self):
+        executor = RoomExecutor(workers=1)
+        order = []
+
+        def outer():
+            order.append("outer")
+            executor.submit("room_a", order.append, "inner")
+            order.append("after")
+
+        executor.submit("room_a", outer).result(timeout=5)
+        executor.shutdown()
+        self.assertEqual(order, ["outer", "inner", "after"])
+
+    def test_inline_mode_returns_completed_future(self):
+        executor = RoomExecutor()
+        future = executor.submit("room_a", lambda: 42)
+        self.assertTrue(future.done())
+        self.assertEqual(future.result(), 42)
+
+    def test_inline_cross_room_submit_runs_after_the_current_job(self):
+        executor = RoomExecutor()
+        order = []
+
+        def evict():
+            # room_a 的鎖已放開，不會同時持有兩個房間的鎖
+            order.append(("room_b", executor.current_room(), "room_a" in executor._room_locks))
+
+        def outer():
+            future = executor.submit("room_b", evict)
+            order.append(("room_a", future.done()))
+
+        executor.submit("room_a", outer)
+        self.assertEqual(order, [("room_a", False), ("room_b", "room_b", False)])
+        self.assertEqual(executor._room_locks, {})
+
+    def test_inline_room_locks_are_released(self):
+        executor = RoomExecutor()
+        inside = threading.Event()
+        release = threading.Event()
+        order = []
+
+        def hold():
+            inside.set()
+            release.wait(5)
+            order.append("first")
+
+        thread = threading.Thread(target=executor.submit, args=("room_a", hold))
+        thread.start()
+        inside.wait(5)
+        waiter = threading.Thread(target=executor.submit, args=("room_a", order.append, "second"))
+        waiter.start()
+        time.sleep(0.05)
+        self.assertEqual(order, [])
+        release.set()
+        thread.join()
+        waiter.join()
+        self.assertEqual(order, ["first", "second"])
+
+        for i in range(100):
+            executor.submit(f"room_{i}", executor.submit, f"room_{i}", lambda: None)
+        self.assertEqual(executor._room_locks, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+import time
 import unittest
 from unittest.mock import Mock, patch
 from linebot.models import MessageEvent, TextMessage, Source
@@ -77,5 +78,162 @@ class TestMessageHandler(unittest.TestCase):
             unittest.mock.ANY  # 驗證錯誤訊息被發送
         )
 
+class TestPlayerIndex(unittest.TestCase):
+    def setUp(self):
+        self.handler = MessageHandler(Mock())
+
+    def test_index_follows_room_lifecycle(self):
+        room = GameRoom("group_a")
+        room.add_player("user_1", "Player 1")
+        self.handler.register_room("group_a", room)
+        self.assertIs(self.handler.find_player_room("user_1"), room)
+        self.assertEqual(self.handler.get_group_id(room), "group_a")
+
+        self.handler.unregister_room("group_a")
+        self.assertIsNone(self.handler.find_player_room("user_1"))
+        self.assertIsNone(self.handler.get_group_id(room))
+
+    def test_player_who_joined_another_room_keeps_new_index(self):
+        old_room, new_room = GameRoom("group_a"), GameRoom("group_b")
+        old_room.add_player("user_1", "Player 1")
+        self.handler.register_room("group_a", old_room)
+        new_room.add_player("user_1", "Player 1")
+        self.handler.register_room("group_b", new_room)
+
+        self.handler.unregister_room("group_a")
+        self.assertIs(self.handler.find_player_room("user_1"), new_room)
+
+class TestDeckCommand(unittest.TestCase):
+    def setUp(self):
+        self.line_bot_api = Mock()
+        self.handler = MessageHandler(self.line_bot_api)
+        self.room = GameRoom("group_a")
+        self.handler.register_room("group_a", self.room)
+
+    def tearDown(self):
+        self.handler.timer.shutdown()
+
+    def reply_text(self) -> str:
+        return self.line_bot_api.reply_message.call_args[0][1].text
+
+    def test_deck_is_compiled_and_set_on_the_room(self):
+        with patch.object(self.handler.storage, 'mark_dirty') as mark_dirty:
+            self.handler.handle_command("/config deck 6-7:狼人1,狼王1,守衛1 8:2/3", "group_a", "user_1", "token")
+        self.assertEqual((self.room.deck.min_players, self.room.deck.max_players), (6, 8))
+        self.assertEqual(self.room.deck.distribution(6), {"狼人": 1, "狼王": 1, "守衛": 1, "平民": 3})
+        self.assertIn("8人：狼人x2、預言家x1、女巫x1、獵人x1、平民x3", self.reply_text())
+        mark_dirty.assert_called_once_with(self.room)
+
+        self.handler.handle_command("/config deck reset", "group_a", "user_1", "token")
+        self.assertIsNone(self.room.deck)
+
+    def test_invalid_deck_is_rejected(self):
+        for spec in ("6-7:5/0", "6-7:巫師1", "6-7", "6-7:2/3 7-8:2/3"):
+            self.handler.handle_command(f"/config deck {spec}", "group_a", "user_1", "token")
+            self.assertIsNone(self.room.deck)
+            self.assertIn("角色配置無效", self.reply_text())
+
+    def test_deck_cannot_change_after_the_game_starts(self):
+        self.room.game_state = GameState.NIGHT
+        self.handler.handle_command("/config deck 6-8:2/3", "group_a", "user_1", "token")
+        self.assertIsNone(self.room.deck)
+
+class TestGameLog(unittest.TestCase):
+    def test_seed_is_logged_only_when_the_game_ends(self):
+        handler = MessageHandler(Mock())
+        handler.logger = Mock()
+        handler.player_stats = Mock()
+        room = GameRoom("group_a", seed=1234)
+        handler.start_game(room, "token")
+        self.assertFalse(any("1234" in str(c) for c in handler.logger.log_game_event.call_args_list))
+
+        handler.end_game(room, "好人陣營")
+        handler.logger.log_game_event.assert_called_with("group_a", "遊戲結束，亂數種子: 1234")
+        handler.timer.shutdown()
+
+class TestFirstNight(unittest.TestCase):
+    def test_werewolves_can_act_on_the_first_night(self):
+        handler = MessageHandler(Mock())
+        room = GameRoom("group_a")
+        for i in range(6):
+            room.add_player(f"user_{i}", f"Player {i}")
+            room.toggle_ready(f"user_{i}")
+        room.start_game()
+        handler.register_room("group_a", room)
+        wolf = next(p for p in room.players.values() if p.role.role_type == RoleType.WEREWOLF)
+        target = next(p for p in room.players.values() if p.role.role_type != RoleType.WEREWOLF)
+
+        event = Mock(reply_token="token", message=Mock(text=f"/skill @{target.user_id}"))
+        event.source.user_id = wolf.user_id
+        with patch.object(handler, 'handle_skill_usage') as handle_skill_usage:
+            handler.run_private_command(event)
+        # 遊戲開始後就是第一晚，狼人不應被回覆 not_your_turn
+        handle_skill_usage.assert_called_once_with(room, wolf.user_id, target.user_id, "token")
+        handler.timer.shutdown()
+
+class TestVotingTimers(unittest.TestCase):
+    def setUp(self):
+        self.handler = MessageHandler(Mock())
+        self.room = GameRoom("test_group")
+        for i in range(6):
+            self.room.add_player(f"user_{i}", f"Player {i}")
+            self.room.toggle_ready(f"user_{i}")
+        self.room.start_game()
+        self.room.start_voting_phase()
+        self.handler.register_room("test_group", self.room)
+
+    def tearDown(self):
+        self.handler.timer.shutdown()
+
+    def test_expired_timeout_does_not_settle_the_next_round(self):
+        with patch.object(self.handler.timer, 'start_timer') as start_timer:
+            self.handler._arm_voting_timers(self.room, "test_group")
+            expired = start_timer.call_args[0][2]
+            # 平票重投：新的一輪在舊計時器的工作執行前開始
+            self.room.start_voting_phase()
+            self.handler._arm_voting_timers(self.room, "test_group")
+            current = start_timer.call_args[0][2]
+
+        with patch.object(self.handler, 'handle_voting_result') as handle_voting_result:
+            expired()
+            handle_voting_result.assert_not_called()
+            current()
+            handle_voting_result.assert_called_once_with(self.room)
+
+class TestVoteDigest(unittest.TestCase):
+    def setUp(self):
+        self.line_bot_api = Mock()
+        self.handler = MessageHandler(self.line_bot_api)
+        self.room = GameRoom("test_group")
+        for i in range(6):
+            self.room.add_player(f"user_{i}", f"Player {i}")
+            self.room.players[f"user_{i}"].toggle_ready()
+        self.room.start_game()
+        self.room.game_state = GameState.VOTING
+        self.room.config.config["vote_digest"] = {"enabled": True, "window": 0.05, "max_latency": 1}
+        self.handler.rooms["test_group"] = self.room
+
+    def tearDown(self):
+        self.handler.timer.shutdown()
+
+    def test_votes_are_coalesced_into_one_broadcast(self):
+        for voter in ("user_0", "user_1", "user_2"):
+            self.handler.handle_voting(self.room, voter, "user_3", "token")
+        self.line_bot_api.push_message.assert_not_called()
+
+        time.sleep(0.3)
+        self.line_bot_api.push_message.assert_called_once()
+        text = self.line_bot_api.push_message.call_args[0][1].text
+        self.assertIn("Player 3：3 票", text)
+
+    def test_pending_digest_flushes_when_voting_completes(self):
+        self.room.config.config["vote_digest"]["window"] = 60
+        for player in self.room.get_alive_players():
+            self.handler.handle_voting(self.room, player.user_id, "user_3", "token")
+
+        texts = [c[0][1].text for c in self.line_bot_api.push_message.call_args_list]
+        self.assertIn("目前票數", texts[0])
+        self.assertFalse(self.handler.vote_digest.has_pending("test_group"))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from src.game.role import RoleType
+from src.game.room import GameRoom
+from src.utils.journal import RoomJournal
+from src.utils.storage import GameStorage
+
+class TestRoomJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal = RoomJournal(os.path.join(self.tmp.name, "journal"))
+        self.storage = GameStorage(os.path.join(self.tmp.name, "data"), journal=self.journal)
+        self.room = GameRoom("group_a")
+        self.storage.attach(self.room)
+
+    def tearDown(self):
+        self.journal.close()
+        self.tmp.cleanup()
+
+    def play_until_day(self):
+        for i in range(8):
+            self.room.add_player(f"user_{i}", f"Player {i}")
+            self.room.toggle_ready(f"user_{i}")
+        self.assertTrue(self.room.start_game())
+
+        by_role = {}
+        for player in self.room.players.values():
+            by_role.setdefault(player.role.role_type, []).append(player)
+        villager = by_role[RoleType.VILLAGER][0]
+        self.room.use_skill(by_role[RoleType.WEREWOLF][0], villager)
+        self.room.use_skill(by_role[RoleType.SEER][0], by_role[RoleType.WEREWOLF][0])
+        self.room.use_skill(by_role[RoleType.WITCH][0], by_role[RoleType.WEREWOLF][1])
+        self.room.start_day_phase()
+
+    def play_vote(self):
+        self.room.start_voting_phase()
+        alive = [p.user_id for p in self.room.get_alive_players()]
+        for voter in alive:
+            self.room.cast_vote(voter, alive[0])
+        self.room.process_votes()
+        self.room.start_night_phase()
+
+    def rebuild(self) -> GameRoom:
+        journal = RoomJournal(os.path.join(self.tmp.name, "journal"))
+        storage = GameStorage(os.path.join(self.tmp.name, "data"), journal=journal)
+        room = storage.load_game("group_a")
+        journal.close()
+        return room
+
+    def test_replay_without_snapshot(self):
+        self.play_until_day()
+        self.play_vote()
+
+        rebuilt = self.rebuild()
+        self.assertEqual(GameStorage.snapshot(rebuilt), GameStorage.snapshot(self.room))
+        # 女巫毒藥延遲生效等快照原本不保存的狀態也要一致
+        self.assertEqual(rebuilt.delayed_actions, self.room.delayed_actions)
+
+    def test_snapshot_plus_tail(self):
+        self.play_until_day()
+        self.assertTrue(self.storage.save_game(self.room))
+        snapshot_seq = self.room.event_seq
+        self.play_vote()
+
+        events = list(self.journal.read("group_a"))
+        self.assertTrue(events)
+        self.assertTrue(all(seq > snapshot_seq for seq, _, _ in events))
+
+        rebuilt = self.rebuild()
+        self.assertEqual(GameStorage.snapshot(rebuilt), GameStorage.snapshot(self.room))
+
+    def test_torn_record_is_ignored(self):
+        self.room.add_player("user_1", "Player 1")
+        self.room.add_player("user_2", "Player 2")
+        self.journal.close()
+        path = os.path.join(self.tmp.name, "journal", "group_a.journal")
+        with open(path, 'ab') as f:
+            f.write(RoomJournal.encode(3, "add_player", {"user_id": "user_3", "display_name": "P3"})[:-4])
+
+        rebuilt = self.rebuild()
+        self.assertEqual(list(rebuilt.players), ["user_1", "user_2"])
+        self.assertEqual(rebuilt.event_seq, 2)
+
+    def test_deleted_game_removes_journal(self):
+        self.room.add_player("user_1", "Player 1")
+        self.storage.delete_game("group_a")
+        self.assertFalse(self.storage.has_game("group_a"))
+        self.assertIsNone(self.rebuild())
+
+if __name__ == '__main__':
+    unittest.main()
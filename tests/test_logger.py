@@ -0,0 +1,93 @@
+import gzip
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from src.utils.backend import FileBackend
+from src.utils.logger import GameLogger
+
+class TestGameLogger(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = FileBackend(log_dir=self.tmp.name, log_max_bytes=0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_events_are_buffered_until_flush(self):
+        logger = GameLogger(backend=self.backend, flush_interval=3600)
+        with patch.object(self.backend, 'append_logs', wraps=self.backend.append_logs) as append:
+            for i in range(20):
+                logger.log_game_event("group_a", f"事件 {i}")
+            self.assertEqual(append.call_count, 0)
+            logger.close()
+            self.assertEqual(append.call_count, 1)
+        self.assertEqual(len(self.backend.read_logs("group_a", self._today())), 20)
+
+    def test_history_is_served_from_memory(self):
+        logger = GameLogger(backend=self.backend, flush_interval=3600)
+        for i in range(30):
+            logger.log_game_event("group_a", f"事件 {i}")
+        with patch.object(self.backend, 'tail_logs') as tail:
+            history = logger.get_game_history("group_a", limit=10)
+            tail.assert_not_called()
+        self.assertEqual(len(history), 10)
+        self.assertTrue(history[-1].endswith("事件 29\n"))
+        logger.close()
+
+    def test_history_falls_back_to_disk_tail(self):
+        writer = GameLogger(backend=self.backend)
+        for i in range(2000):
+            writer.log_game_event("group_a", f"事件 {i}")
+
+        # 新的行程：記憶體中沒有這個房間的紀錄
+        history = GameLogger(backend=self.backend).get_game_history("group_a", limit=10)
+        self.assertEqual(len(history), 10)
+        self.assertTrue(history[0].endswith("事件 1990\n"))
+        self.assertTrue(history[-1].endswith("事件 1999\n"))
+
+    def test_large_logs_are_rotated_and_compressed(self):
+        backend = FileBackend(log_dir=self.tmp.name, log_max_bytes=1024)
+        logger = GameLogger(backend=backend)
+        for i in range(100):
+            logger.log_game_event("group_a", f"事件 {i}")
+
+        segments = [name for name in os.listdir(self.tmp.name) if name.endswith(".log.gz")]
+        self.assertGreater(len(segments), 1)
+        with gzip.open(os.path.join(self.tmp.name, sorted(segments)[0]), 'rt', encoding='utf-8') as f:
+            self.assertTrue(f.readline().endswith("事件 0\n"))
+
+        lines = backend.read_logs("group_a", self._today())
+        self.assertEqual(len(lines), 100)
+        self.assertTrue(lines[-1].endswith("事件 99\n"))
+        self.assertEqual(len(GameLogger(backend=backend).get_game_history("group_a", limit=10)), 10)
+
+    def test_previous_days_are_compressed(self):
+        self.backend.append_logs([("group_a", "2024-01-01 10:00:00", "昨天")])
+        self.backend.append_logs([("group_a", "2024-01-02 10:00:00", "今天")])
+        self.assertEqual(
+            sorted(os.listdir(self.tmp.name)),
+            ["group_a_20240101.1.log.gz", "group_a_20240102.log"]
+        )
+        self.assertEqual(self.backend.read_logs("group_a", "20240101"), ["[2024-01-01 10:00:00] 昨天\n"])
+
+    def test_failed_rotation_keeps_the_log(self):
+        self.backend.append_logs([("group_a", "2024-01-01 10:00:00", "昨天")])
+        with patch('src.utils.backend.os.fsync', side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.backend.append_logs([("group_a", "2024-01-02 10:00:00", "今天")])
+        self.assertEqual(os.listdir(self.tmp.name), ["group_a_20240101.log"])
+
+        self.backend.append_logs([("group_a", "2024-01-02 10:00:00", "今天")])
+        self.assertEqual(
+            sorted(os.listdir(self.tmp.name)),
+            ["group_a_20240101.1.log.gz", "group_a_20240102.log"]
+        )
+        self.assertEqual(self.backend.read_logs("group_a", "20240101"), ["[2024-01-01 10:00:00] 昨天\n"])
+
+    def _today(self) -> str:
+        return datetime.now().strftime('%Y%m%d')
+
+if __name__ == '__main__':
+    unittest.main()
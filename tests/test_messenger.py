@@ -0,0 +1,146 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+from aiohttp import web
+from linebot.models import TextSendMessage
+from src.bot.messenger import AsyncMessenger, SyncMessenger, plan_deliveries
+
+class FakeLineServer:
+    """在背景執行緒啟動的假 LINE API，每個請求延遲固定時間"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.requests = []
+        self.multicasts = []
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+        self.ready.wait(5)
+
+    async def _push(self, request):
+        payload = await request.json()
+        await asyncio.sleep(self.delay)
+        self.requests.append(payload)
+        return web.json_response({})
+
+    async def _multicast(self, request):
+        self.multicasts.append(await request.json())
+        return web.json_response({})
+
+    def _serve(self):
+        asyncio.set_event_loop(self.loop)
+        app = web.Application()
+        app.router.add_post("/v2/bot/message/push", self._push)
+        app.router.add_post("/v2/bot/message/multicast", self._multicast)
+        self.runner = web.AppRunner(app)
+        self.loop.run_until_complete(self.runner.setup())
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        self.loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.ready.set()
+        self.loop.run_forever()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+
+class TestAsyncMessenger(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeLineServer(delay=0.1)
+        self.messenger = AsyncMessenger("token", endpoint=f"http://127.0.0.1:{self.server.port}")
+
+    def tearDown(self):
+        self.messenger.close()
+        self.server.stop()
+
+    def test_pushes_to_different_recipients_run_concurrently(self):
+        pushes = [(f"U{i}", TextSendMessage(text=f"role {i}")) for i in range(12)]
+        start = time.monotonic()
+        results = self.messenger.push_many(pushes)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(results, [True] * 12)
+        self.assertEqual(len(self.server.requests), 12)
+        self.assertLess(elapsed, 0.1 * 12 / 2)
+
+    def test_same_recipient_keeps_order(self):
+        pushes = [("C_group", TextSendMessage(text=str(i))) for i in range(7)]
+        self.messenger.push_many(pushes)
+        texts = [m["text"] for r in self.server.requests for m in r["messages"]]
+        self.assertEqual(texts, [str(i) for i in range(7)])
+        self.assertEqual(len(self.server.requests), 2)  # 每次最多 5 則
+
+    def test_identical_user_pushes_use_multicast(self):
+        pushes = [("C_group", TextSendMessage(text="vote"))]
+        pushes += [(f"U{i}", TextSendMessage(text="[觀戰] vote")) for i in range(3)]
+        self.assertEqual(self.messenger.push_many(pushes, phase="voting"), [True] * 4)
+
+        self.assertEqual(len(self.server.multicasts), 1)
+        self.assertEqual(self.server.multicasts[0]["to"], ["U0", "U1", "U2"])
+        stats = self.messenger.get_call_stats()["voting"]
+        self.assertEqual((stats["push"], stats["multicast"], stats["recipients"]), (1, 1, 4))
+
+class TestFallback(unittest.TestCase):
+    def test_connection_error_uses_sync_fallback(self):
+        fallback = Mock()
+        messenger = AsyncMessenger("token", fallback=fallback, endpoint="http://127.0.0.1:1")
+        try:
+            message = TextSendMessage(text="hi")
+            self.assertEqual(messenger.push_many([("U1", message)]), [True])
+            fallback.push_message.assert_called_once_with("U1", message)
+        finally:
+            messenger.close()
+
+    def test_timeouts_are_not_resent(self):
+        # 請求可能已送達，改走同步路徑會重複推播
+        server = FakeLineServer(delay=1.0)
+        fallback = Mock()
+        messenger = AsyncMessenger("token", fallback=fallback, endpoint=f"http://127.0.0.1:{server.port}",
+                                   timeout=0.2)
+        try:
+            self.assertEqual(messenger.push_many([("U1", TextSendMessage(text="hi"))]), [False])
+            fallback.push_message.assert_not_called()
+        finally:
+            messenger.close()
+            server.stop()
+
+    def test_sync_messenger_pushes_sequentially(self):
+        api = Mock()
+        results = SyncMessenger(api).push_many([("U1", "a"), ("U2", "b")])
+        self.assertEqual(results, [True, True])
+        self.assertEqual(api.push_message.call_count, 2)
+
+    def test_calls_are_counted_per_game(self):
+        messenger = SyncMessenger(Mock())
+        messenger.push_many([("C_a", "night"), ("U1", "spectate")], phase="night", room_id="C_a")
+        messenger.push_message("C_b", "night", phase="night", room_id="C_b")
+        self.assertEqual(messenger.get_game_stats("C_a")["night"]["push"], 2)
+        self.assertEqual(messenger.get_game_stats()["in_progress"], {"C_a": 2, "C_b": 1})
+
+        self.assertEqual(messenger.call_stats.end_game("C_a")["night"]["push"], 2)
+        messenger.call_stats.begin_game("C_a")
+        messenger.push_message("C_a", "start", phase="start", room_id="C_a")
+        stats = messenger.get_game_stats()
+        self.assertEqual(stats["finished"]["games"], 1)
+        self.assertEqual(stats["finished"]["calls_per_game"], 2)
+        self.assertEqual(stats["in_progress"], {"C_b": 1, "C_a": 1})
+        self.assertEqual(messenger.get_call_stats()["night"]["push"], 3)
+
+class TestPlanDeliveries(unittest.TestCase):
+    def test_multicast_respects_recipient_limit(self):
+        pushes = [(f"U{i}", "same") for i in range(7)]
+        rounds = plan_deliveries(pushes, max_recipients=3)
+        self.assertEqual(len(rounds), 1)
+        self.assertEqual([d.kind for d in rounds[0]], ["multicast", "multicast", "push"])
+        self.assertEqual([d.to for d in rounds[0]][1:], [["U3", "U4", "U5"], "U6"])
+
+    def test_groups_are_never_multicast(self):
+        rounds = plan_deliveries([("C1", "same"), ("C2", "same")])
+        self.assertEqual([d.kind for d in rounds[0]], ["push", "push"])
+
+if __name__ == '__main__':
+    unittest.main()
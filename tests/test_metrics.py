@@ -0,0 +1,79 @@
+import threading
+import unittest
+from unittest.mock import Mock
+from src.utils.metrics import InstrumentedApi, MetricsRegistry
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.metrics = MetricsRegistry(buckets=(0.01, 0.1))
+
+    def test_counters_merge_across_threads(self):
+        def work():
+            for _ in range(1000):
+                self.metrics.inc("requests_total", status="200")
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.metrics.inc("requests_total", status="400")
+        self.assertEqual(self.metrics.counter_value("requests_total", status="200"), 4000)
+        # 已結束的執行緒併入 retired，數值不會遺失
+        self.assertEqual(len(self.metrics._shards), 1)
+        self.assertEqual(self.metrics.counter_value("requests_total", status="200"), 4000)
+
+    def test_histogram_exposition(self):
+        self.metrics.describe("latency_seconds", "histogram", "處理時間")
+        for seconds in (0.005, 0.05, 0.5):
+            self.metrics.observe("latency_seconds", seconds, command="/vote")
+        self.metrics.gauge("rooms", "房間數", lambda: 3)
+        text = self.metrics.render()
+        self.assertIn("# TYPE latency_seconds histogram", text)
+        self.assertIn('latency_seconds_bucket{command="/vote",le="0.01"} 1', text)
+        self.assertIn('latency_seconds_bucket{command="/vote",le="0.1"} 2', text)
+        self.assertIn('latency_seconds_bucket{command="/vote",le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_count{command="/vote"} 3', text)
+        self.assertIn("# TYPE rooms gauge\nrooms 3", text)
+
+    def test_time_counts_errors(self):
+        with self.assertRaises(ValueError):
+            with self.metrics.time("save_seconds", op="save"):
+                raise ValueError("boom")
+        self.assertEqual(self.metrics.histogram_count("save_seconds", op="save"), 1)
+        self.assertEqual(self.metrics.counter_value("save_errors_total", op="save"), 1)
+
+    def test_remote_snapshots_are_labelled_by_shard(self):
+        self.metrics.inc("requests_total", status="200")
+        shard = MetricsRegistry(buckets=(0.01, 0.1))
+        shard.describe("latency_seconds", "histogram", "處理時間")
+        shard.observe("latency_seconds", 0.05, command="/vote")
+        shard.gauge("rooms", "房間數", lambda: 3)
+        text = self.metrics.render({"127.0.0.1:7001": shard.snapshot()})
+        self.assertIn('requests_total{status="200"} 1', text)
+        self.assertIn('latency_seconds_bucket{command="/vote",shard="127.0.0.1:7001",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_count{command="/vote",shard="127.0.0.1:7001"} 1', text)
+        self.assertIn('# TYPE rooms gauge\nrooms{shard="127.0.0.1:7001"} 3', text)
+        self.assertEqual(text.count("# TYPE latency_seconds histogram"), 1)
+
+    def test_name_label(self):
+        # 計時器以 name 作為標籤，不可與指標名稱參數衝突
+        self.metrics.inc("fired_total", name="vote")
+        self.assertEqual(self.metrics.counter_value("fired_total", name="vote"), 1)
+
+    def test_disabled(self):
+        self.metrics.enabled = False
+        self.metrics.inc("requests_total")
+        with self.metrics.time("save_seconds"):
+            pass
+        self.assertEqual(self.metrics._shards, [])
+
+    def test_instrumented_api(self):
+        api = Mock()
+        api.reply_message.return_value = "ok"
+        wrapped = InstrumentedApi(api, self.metrics)
+        self.assertEqual(wrapped.reply_message("token", "text"), "ok")
+        api.reply_message.assert_called_once_with("token", "text")
+        self.assertEqual(self.metrics.histogram_count("werewolf_line_api_seconds", method="reply_message"), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import threading
+import time
+import unittest
+from src.utils.profiler import SamplingProfiler, TRUNCATED
+
+def busy_history(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+class TestSamplingProfiler(unittest.TestCase):
+    def setUp(self):
+        self.profiler = SamplingProfiler(interval=0.001, max_duration=5)
+        self.stop = threading.Event()
+
+    def tearDown(self):
+        self.stop.set()
+        self.profiler.stop()
+
+    def run_tagged(self, room_id: str, command: str) -> threading.Thread:
+        def work():
+            with self.profiler.tag(room_id, command):
+                busy_history(self.stop)
+        thread = threading.Thread(target=work)
+        thread.start()
+        return thread
+
+    def test_samples_are_attributed_to_room_and_command(self):
+        worker = self.run_tagged("room_a", "/history")
+        self.assertTrue(self.profiler.start())
+        self.assertFalse(self.profiler.start())
+        time.sleep(0.2)
+        self.profiler.stop()
+        self.stop.set()
+        worker.join()
+
+        lines = self.profiler.collapsed().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(all(line.startswith("/history;room:room_a;") for line in lines))
+        self.assertTrue(any("test_profiler:busy_history" in line for line in lines))
+        self.assertEqual(self.profiler.collapsed(command="/start"), "")
+        merged = self.profiler.collapsed(by_room=False)
+        self.assertTrue(merged.startswith("/history;"))
+        self.assertNotIn("room:", merged)
+        total = sum(int(line.rsplit(" ", 1)[1]) for line in lines)
+        self.assertEqual(total, self.profiler.get_stats()["commands"]["/history"])
+
+    def test_untagged_threads_are_ignored(self):
+        worker = threading.Thread(target=busy_history, args=(self.stop,))
+        worker.start()
+        self.profiler.start()
+        time.sleep(0.1)
+        self.profiler.stop()
+        self.stop.set()
+        worker.join()
+        self.assertEqual(self.profiler.samples, 0)
+
+    def test_duration_and_stack_limits(self):
+        self.profiler.max_stacks = 1
+        worker = self.run_tagged("room_a", "/start")
+        self.profiler.start(duration=0.1)
+        self.profiler._thread.join(2)
+        self.assertFalse(self.profiler.running)
+        self.stop.set()
+        worker.join()
+        self.assertLessEqual(self.profiler.get_stats()["stacks"], 2)
+        if self.profiler.dropped:
+            self.assertIn(TRUNCATED, self.profiler.collapsed())
+
+    def test_overhead_budget_slows_sampling(self):
+        self.profiler.max_overhead = 0.0001
+        worker = self.run_tagged("room_a", "/vote")
+        self.profiler.start(interval=0.001)
+        time.sleep(0.1)
+        self.profiler.stop()
+        self.stop.set()
+        worker.join()
+        self.assertGreater(self.profiler.interval, 0.001)
+
+if __name__ == '__main__':
+    unittest.main()
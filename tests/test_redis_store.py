@@ -0,0 +1,369 @@
+import socketserver
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+from src.bot.handler import MessageHandler
+from src.game.room import GameRoom
+from src.game.state import GameState
+from src.utils.logger import GameLogger
+from src.utils.redis_store import RedisBackend, RedisClient, RedisError, RespConnection, VersionConflict
+from src.utils.statistics import PlayerStats
+from src.utils.storage import GameStorage
+
+class FakeRedis:
+    """測試用的行程內 Redis：只實作 RedisBackend 用到的指令"""
+
+    def __init__(self):
+        self.data = {}
+        self.versions = {}  # key -> 修改次數，供 WATCH 判斷
+        self.subscribers = {}  # channel -> [handler]
+        self.commands = []
+        self.lock = threading.RLock()
+
+    def touch(self, key):
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def run(self, args):
+        name, args = args[0].upper(), args[1:]
+        self.commands.append(name)
+        data = self.data
+        if name == "PING":
+            return "+PONG"
+        if name == "HSET":
+            h = data.setdefault(args[0], {})
+            added = sum(1 for field in args[1::2] if field not in h)
+            h.update(zip(args[1::2], args[2::2]))
+            self.touch(args[0])
+            return added
+        if name == "HGET":
+            return data.get(args[0], {}).get(args[1])
+        if name == "HGETALL":
+            return [item for pair in data.get(args[0], {}).items() for item in pair]
+        if name == "HDEL":
+            h = data.get(args[0], {})
+            removed = sum(1 for field in args[1:] if h.pop(field, None) is not None)
+            self.touch(args[0])
+            return removed
+        if name == "HINCRBY":
+            h = data.setdefault(args[0], {})
+            h[args[1]] = str(int(h.get(args[1], 0)) + int(args[2]))
+            self.touch(args[0])
+            return int(h[args[1]])
+        if name == "DEL":
+            for key in args:
+                self.touch(key)
+            return sum(1 for key in args if data.pop(key, None) is not None)
+        if name == "EXISTS":
+            return sum(1 for key in args if data.get(key))
+        if name == "SADD":
+            data.setdefault(args[0], set()).update(args[1:])
+            return len(args) - 1
+        if name == "SREM":
+            data.get(args[0], set()).difference_update(args[1:])
+            return len(args) - 1
+        if name == "SMEMBERS":
+            return list(data.get(args[0], set()))
+        if name == "RPUSH":
+            data.setdefault(args[0], []).extend(args[1:])
+            return len(data[args[0]])
+        if name == "LRANGE":
+            items = data.get(args[0], [])
+            start, stop = int(args[1]), int(args[2])
+            stop = len(items) if stop == -1 else stop + 1
+            return items[start:stop]
+        if name == "PUBLISH":
+            handlers = list(self.subscribers.get(args[0], []))
+            for handler in handlers:
+                handler.push(["message", args[0], args[1]])
+            return len(handlers)
+        return RedisError(f"ERR unknown command '{name}'")
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2].decode('utf-8'))
+        return args
+
+    def encode(self, value) -> bytes:
+        if isinstance(value, RedisError):
+            return b"-%s\r\n" % str(value).encode('utf-8')
+        if isinstance(value, str) and value.startswith("+"):
+            return value.encode('utf-8') + b"\r\n"
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(self.encode(item) for item in value)
+        data = value.encode('utf-8')
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+
+    def push(self, value):
+        with self.write_lock:
+            self.wfile.write(self.encode(value))
+
+    def handle(self):
+        server: FakeRedis = self.server.fake
+        self.write_lock = threading.Lock()
+        watched = {}
+        queued = None
+        while True:
+            args = self.read_command()
+            if args is None:
+                break
+            name = args[0].upper()
+            with server.lock:
+                if name == "WATCH":
+                    watched.update({key: server.versions.get(key, 0) for key in args[1:]})
+                    reply = "+OK"
+                elif name == "UNWATCH":
+                    watched = {}
+                    reply = "+OK"
+                elif name == "MULTI":
+                    queued = []
+                    reply = "+OK"
+                elif name == "EXEC":
+                    if any(server.versions.get(key, 0) != version for key, version in watched.items()):
+                        reply = None
+                    else:
+                        reply = [server.run(command) for command in queued]
+                    queued, watched = None, {}
+                elif name == "SUBSCRIBE":
+                    server.subscribers.setdefault(args[1], []).append(self)
+                    reply = ["subscribe", args[1], 1]
+                elif queued is not None:
+                    queued.append(args)
+                    reply = "+QUEUED"
+                else:
+                    reply = server.run(args)
+            self.push(reply)
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeRedisHandler)
+        self.fake = FakeRedis()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+
+def wait_until(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met")
+        time.sleep(0.01)
+
+
+class TestRespConnection(unittest.TestCase):
+    def test_encode_command(self):
+        self.assertEqual(RespConnection.encode("HGET", "key", 1), b"*3\r\n$4\r\nHGET\r\n$3\r\nkey\r\n$1\r\n1\r\n")
+        self.assertEqual(RespConnection.encode("SET", "狼"), b"*2\r\n$3\r\nSET\r\n$3\r\n\xe7\x8b\xbc\r\n")
+
+
+class TestRedisBackend(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeRedisServer()
+        self.backend = self.make_backend()
+
+    def make_backend(self) -> RedisBackend:
+        host, port = self.server.server_address
+        return RedisBackend(RedisClient(host, port))
+
+    def tearDown(self):
+        self.backend.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def make_room(self) -> GameRoom:
+        room = GameRoom("group_a")
+        room.add_player("user_1", "Player 1")
+        room.add_player("user_2", "Player 2")
+        room.day_count = 2
+        room.votes = {"user_1": "user_2"}
+        return room
+
+    def test_room_round_trip_uses_hash_fields(self):
+        storage = GameStorage(backend=self.backend)
+        self.assertTrue(storage.save_game(self.make_room()))
+
+        fields = self.server.fake.data["werewolf:room:group_a"]
+        self.assertEqual(fields["d"], "2")
+        self.assertEqual(fields["v"], "1")
+        self.assertIn("p:user_1", fields)
+        self.assertEqual(self.backend.room_ids(), {"group_a"})
+
+        loaded = GameStorage(backend=self.make_backend()).load_game("group_a")
+        self.assertEqual(list(loaded.players), ["user_1", "user_2"])
+        self.assertEqual(loaded.votes, {"user_1": "user_2"})
+        self.assertEqual(loaded.game_state, GameState.WAITING)
+
+        storage.delete_game("group_a")
+        self.assertFalse(storage.has_game("group_a"))
+        self.assertEqual(self.backend.room_ids(), set())
+
+    def test_only_changed_fields_are_written(self):
+        storage = GameStorage(backend=self.backend)
+        room = self.make_room()
+        storage.save_game(room)
+        room.day_count = 3
+        room.remove_player("user_2")
+        self.server.fake.commands.clear()
+        storage.save_game(room)
+
+        fields = self.server.fake.data["werewolf:room:group_a"]
+        self.assertNotIn("p:user_2", fields)
+        self.assertEqual(fields["v"], "2")
+        self.assertNotIn("DEL", self.server.fake.commands)
+        self.assertEqual(GameStorage(backend=self.make_backend()).load_game("group_a").day_count, 3)
+
+    def test_stale_writer_gets_a_conflict(self):
+        GameStorage(backend=self.backend).save_game(self.make_room())
+        worker_a, worker_b = self.make_backend(), self.make_backend()
+        room_a = GameStorage(backend=worker_a).load_game("group_a")
+        room_b = GameStorage(backend=worker_b).load_game("group_a")
+
+        room_a.day_count = 5
+        worker_a.save_rooms({"group_a": GameStorage.snapshot(room_a)})
+        room_b.day_count = 9
+        with self.assertRaises(VersionConflict):
+            worker_b.save_rooms({"group_a": GameStorage.snapshot(room_b)})
+        self.assertEqual(self.make_backend().load_room("group_a")["day_count"], 5)
+
+        # 重新讀取會捨棄本地的舊狀態，之後的修改建立在最新版本上
+        room_b = GameStorage(backend=worker_b).load_game("group_a")
+        self.assertEqual(room_b.day_count, 5)
+        room_b.day_count = 6
+        worker_b.save_rooms({"group_a": GameStorage.snapshot(room_b)})
+        self.assertEqual(self.make_backend().load_room("group_a")["day_count"], 6)
+        self.assertEqual(self.backend.room_version("group_a"), 1)
+        self.assertEqual(worker_b.room_version("group_a"), 3)
+        for backend in (worker_a, worker_b):
+            backend.close()
+
+    def test_storage_reports_conflicts_and_writes_other_rooms(self):
+        storage_a = GameStorage(backend=self.make_backend())
+        storage_b = GameStorage(backend=self.make_backend(), flush_interval=60)
+        storage_a.save_game(self.make_room())
+        room_b = storage_b.load_game("group_a")
+        storage_a.save_game(self.make_room())
+
+        conflicts = []
+        storage_b.on_conflict = conflicts.extend
+        storage_b.mark_dirty(room_b)
+        storage_b.mark_dirty(GameRoom("group_b"))
+        self.assertFalse(storage_b.flush())
+        self.assertEqual(conflicts, ["group_a"])
+        self.assertTrue(self.backend.has_room("group_b"))
+
+        # 重新讀取後不會一直衝突
+        room_b = storage_b.load_game("group_a")
+        room_b.day_count = 7
+        self.assertTrue(storage_b.save_game(room_b))
+        storage_b.close()
+
+    def test_handlers_drop_stale_rooms(self):
+        handler_a, handler_b = self.make_handler(), self.make_handler()
+        try:
+            handler_a.handle_command("/join", "group_a", "user_1", "token")
+            handler_b.handle_command("/join", "group_a", "user_2", "token")
+            # 其他 worker 寫入後捨棄本地房間，下次指令重新讀取
+            wait_until(lambda: "group_a" not in handler_a.rooms)
+            handler_a.handle_command("/join", "group_a", "user_3", "token")
+            self.assertEqual(list(handler_a.rooms["group_a"].players), ["user_1", "user_2", "user_3"])
+
+            # 錯過通知而留在記憶體的舊房間，寫入時衝突：重新讀取，不覆蓋其他 worker 的狀態
+            wait_until(lambda: "group_a" not in handler_b.rooms)
+            stale = handler_b.load_room("group_a")
+            handler_a.handle_command("/join", "group_a", "user_4", "token")
+            wait_until(lambda: "group_a" not in handler_b.rooms)
+            handler_b.register_room("group_a", stale)
+            stale.add_player("user_5", "Player 5")
+            self.assertFalse(handler_b.storage.save_game(stale))
+            self.assertIsNot(handler_b.rooms.peek("group_a"), stale)
+            self.assertEqual(list(handler_b.rooms["group_a"].players), ["user_1", "user_2", "user_3", "user_4"])
+            self.assertEqual(self.make_backend().load_room("group_a")["players"][-1]["user_id"], "user_4")
+            handler_b.line_bot_api.push_message.assert_called()
+        finally:
+            for handler in (handler_a, handler_b):
+                handler.timer.shutdown()
+                handler.storage.backend.close()
+
+    def test_vote_timeout_settles_the_latest_room(self):
+        handler_a, handler_b = self.make_handler(), self.make_handler()
+        try:
+            room = GameRoom("group_a")
+            for i in range(6):
+                room.add_player(f"user_{i}", f"Player {i}")
+                room.toggle_ready(f"user_{i}")
+            room.start_game()
+            room.start_voting_phase()
+            room.config.config["vote_timeout"] = 0.3
+            handler_a.register_room("group_a", room)
+            handler_a.storage.save_game(room)
+            handler_a._arm_voting_timers(room, "group_a")
+
+            # 另一個 worker 收到投票並寫入，計時器仍在 worker A 上
+            room_b = handler_b.load_room("group_a")
+            for voter in ("user_1", "user_2", "user_3"):
+                room_b.cast_vote(voter, "user_0")
+            self.assertTrue(handler_b.storage.save_game(room_b))
+
+            texts = lambda: [c[0][1].text for c in handler_a.line_bot_api.push_message.call_args_list]
+            wait_until(lambda: any("被投票處決" in text for text in texts()))
+            self.assertIn("Player 0 被投票處決了！", texts())
+            self.assertFalse(any("其他伺服器" in text for text in texts()))
+            reader = self.make_backend()
+            self.addCleanup(reader.close)
+            alive = lambda: next(p for p in reader.load_room("group_a")["players"] if p["user_id"] == "user_0")["is_alive"]
+            wait_until(lambda: handler_a.storage.flush() and not alive())
+        finally:
+            for handler in (handler_a, handler_b):
+                handler.timer.shutdown()
+                handler.storage.backend.close()
+
+    def make_handler(self) -> MessageHandler:
+        line_bot_api = Mock()
+        line_bot_api.get_group_member_profile.side_effect = lambda group_id, user_id: Mock(display_name=user_id)
+        backend = self.make_backend()
+        return MessageHandler(line_bot_api, storage=GameStorage(backend=backend), backend=backend)
+
+    def test_stats_and_logs(self):
+        stats = PlayerStats(backend=self.backend)
+        stats.update_player_stats("user_1", {"won": True, "role": "狼人"})
+        stats.update_player_stats("user_1", {"won": False, "role": "平民"})
+        result = stats.get_player_stats("user_1")
+        self.assertEqual((result["games_played"], result["wins"], result["losses"]), (2, 1, 1))
+        self.assertEqual(result["roles_played"], {"狼人": 1, "平民": 1})
+
+        logger = GameLogger(backend=self.backend)
+        for i in range(5):
+            logger.log_game_event("group_a", f"事件 {i}")
+        history = GameLogger(backend=self.backend).get_game_history("group_a", limit=2)
+        self.assertEqual(len(history), 2)
+        self.assertTrue(history[-1].endswith("] 事件 4\n"))
+
+    def test_timer_expiry_is_published_to_other_workers(self):
+        received = []
+        other = self.make_backend()
+        other.subscribe_timers(lambda room_id, name: received.append((room_id, name)))
+        self.backend.subscribe_timers(lambda room_id, name: received.append(("self", name)))
+
+        self.backend.publish_timer("group_a", "vote")
+        wait_until(lambda: received)
+        time.sleep(0.05)
+        self.assertEqual(received, [("group_a", "vote")])
+        other.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from src.bot.handler import MessageHandler
+from src.bot.registry import RoomRegistry
+from src.game.room import GameRoom
+from src.game.state import GameState
+from src.utils.storage import GameStorage
+
+class TestRoomRegistry(unittest.TestCase):
+    def test_least_recently_used_room_is_evicted(self):
+        registry = RoomRegistry(max_resident=2)
+        for room_id in ("a", "b"):
+            registry[room_id] = GameRoom(room_id)
+        registry["a"]  # 存取後 a 變為最近使用
+        registry["c"] = GameRoom("c")
+        self.assertEqual(sorted(registry), ["a", "c"])
+
+    def test_busy_rooms_are_not_evicted(self):
+        registry = RoomRegistry(max_resident=1, can_evict=lambda room_id, room: room_id != "a")
+        registry["a"] = GameRoom("a")
+        registry["b"] = GameRoom("b")
+        self.assertEqual(sorted(registry), ["a", "b"])
+
+    def test_evict_idle(self):
+        registry = RoomRegistry(idle_ttl=0)
+        registry["a"] = GameRoom("a")
+        self.assertEqual(registry.evict_idle(), ["a"])
+        self.assertNotIn("a", registry)
+
+class TestRoomResidency(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with patch('src.bot.handler.GameStorage', lambda **kwargs: GameStorage(self.tmp.name, **kwargs)):
+            self.handler = MessageHandler(Mock(), max_resident_rooms=1)
+
+    def tearDown(self):
+        self.handler.timer.shutdown()
+        self.tmp.cleanup()
+
+    def test_roomless_commands_and_unknown_groups_skip_disk(self):
+        with patch.object(self.handler.storage, 'load_game') as load_game:
+            self.handler.handle_command("/help", "group_a", "user_1", "token")
+            self.handler.handle_command("/status", "group_a", "user_1", "token")
+            load_game.assert_not_called()
+
+    def test_evicted_room_is_reloaded_lazily(self):
+        room = GameRoom("group_a")
+        room.add_player("user_1", "Player 1")
+        self.handler.register_room("group_a", room)
+        self.handler.register_room("group_b", GameRoom("group_b"))
+
+        self.assertNotIn("group_a", self.handler.rooms)
+        self.assertTrue(self.handler.storage.has_game("group_a"))
+
+        reloaded = self.handler.find_player_room("user_1")
+        self.assertEqual(reloaded.room_id, "group_a")
+        self.assertIn("user_1", reloaded.players)
+
+    def test_game_in_progress_is_evicted_only_when_idle(self):
+        room = GameRoom("group_a")
+        for i in range(6):
+            room.add_player(f"user_{i}", f"Player {i}")
+            room.toggle_ready(f"user_{i}")
+        self.assertTrue(room.start_game())
+        room.night_actions["werewolf_kill"] = "user_1"
+        room.delayed_actions.append({"type": "poison", "target": "user_2", "execute_turn": 3})
+        room.votes = {"user_3": "user_4"}
+        self.handler.register_room("group_a", room)
+
+        # 超過常駐上限時只移出等待中的房間
+        self.handler.register_room("group_b", GameRoom("group_b"))
+        self.assertIn("group_a", self.handler.rooms)
+        self.handler.register_room("group_c", GameRoom("group_c"))
+        self.assertIn("group_a", self.handler.rooms)
+
+        self.handler.rooms.idle_ttl = 0
+        self.handler.rooms.evict_idle()
+        self.assertNotIn("group_a", self.handler.rooms)
+
+        reloaded = self.handler.find_player_room("user_1")
+        self.assertIsNot(reloaded, room)
+        self.assertEqual(reloaded.game_state, GameState.NIGHT)
+        self.assertTrue(reloaded.is_werewolf_action_time)
+        self.assertEqual(reloaded.night_actions, {"werewolf_kill": "user_1"})
+        self.assertEqual(reloaded.delayed_actions, room.delayed_actions)
+        self.assertEqual(reloaded.votes, {"user_3": "user_4"})
+        self.assertEqual({p.user_id: p.role.code for p in reloaded.players.values()},
+                         {p.user_id: p.role.code for p in room.players.values()})
+
+if __name__ == '__main__':
+    unittest.main()
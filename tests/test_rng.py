@@ -0,0 +1,58 @@
+import unittest
+from src.game.role import SEER, WEREWOLF
+from src.game.room import GameRoom
+from src.utils.rng import RoomRandom
+from src.utils.storage import GameStorage
+
+def build_room(seed):
+    room = GameRoom("test_room", seed)
+    for i in range(12):
+        room.add_player(f"user_{i}", f"Player {i}")
+        room.toggle_ready(f"user_{i}")
+    return room
+
+class TestRoomRandom(unittest.TestCase):
+    def test_same_seed_and_position_repeat(self):
+        a, b = RoomRandom(42), RoomRandom(42)
+        self.assertEqual([a.next64() for _ in range(5)], [b.next64() for _ in range(5)])
+        first = a.at(3).random()
+        a.next64()
+        self.assertEqual(a.at(3).random(), first)
+        self.assertNotEqual(RoomRandom(43).at(3).random(), first)
+
+    def test_ranges_and_shuffle(self):
+        rng = RoomRandom(7)
+        self.assertTrue(all(0 <= rng.randbelow(6) < 6 for _ in range(1000)))
+        self.assertTrue(all(0.0 <= rng.random() < 1.0 for _ in range(1000)))
+        seen = set()
+        for items in rng.shuffled_batch(range(4), 500):
+            self.assertEqual(sorted(items), [0, 1, 2, 3])
+            seen.add(tuple(items))
+        # 4 張牌的 24 種排列都會出現
+        self.assertEqual(len(seen), 24)
+
+class TestRoomSeed(unittest.TestCase):
+    def test_fixed_seed_deals_same_roles(self):
+        a, b = build_room(1234), build_room(1234)
+        a.start_game()
+        b.start_game()
+        self.assertEqual(a._role_map(), b._role_map())
+
+    def test_seed_survives_snapshot(self):
+        room = build_room(99)
+        restored = GameStorage.restore(GameStorage.snapshot(room))
+        self.assertEqual(restored.rng.seed, 99)
+        room.start_game()
+        restored.start_game()
+        self.assertEqual(room._role_map(), restored._role_map())
+
+    def test_seer_fake_result_chance(self):
+        room = build_room(5)
+        room.config.config = dict(room.config.config, special_effects={"seer_fake_result_chance": 1.0})
+        room.start_game()
+        seer = next(p for p in room.players.values() if p.role.code == SEER)
+        wolf = next(p for p in room.players.values() if p.role.code == WEREWOLF)
+        self.assertTrue(room.handle_seer_check(seer, wolf).endswith("好人"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,9 @@
+import random
 import unittest
 from src.game.room import GameRoom
 from src.game.state import GameState
-from src.game.role import RoleType
+from src.game.role import Role, RoleType, WITCH
+from src.utils.storage import GameStorage
 
 class TestRoom(unittest.TestCase):
     def setUp(self):
@@ -43,6 +45,8 @@ class TestRoom(unittest.TestCase):
         self.assertTrue(result)
         self.assertEqual(self.room.game_state, GameState.NIGHT)
         self.assertEqual(self.room.day_count, 1)
+        # 第一晚狼人就可以行動
+        self.assertTrue(self.room.is_werewolf_action_time)
 
     def test_start_game_with_insufficient_players(self):
         self.create_test_players(5)  # 少於最小人數
@@ -75,5 +79,93 @@ class TestRoom(unittest.TestCase):
         target = self.room.players["user_0"]
         self.assertFalse(target.is_alive())
 
+    def test_seats_follow_player_order(self):
+        self.create_test_players(4)
+        self.room.remove_player("user_1")
+        self.assertEqual(self.room.seats, list(self.room.players))
+        self.assertEqual([p.seat for p in self.room.players.values()], [0, 1, 2])
+
+        self.room.add_player("user_9", "Player 9")
+        self.room.cast_vote("user_9", "user_0")
+        self.room.cast_vote("user_3", "user_0")
+        self.assertEqual(self.room.players["user_0"].voted_by, ["user_3", "user_9"])
+        self.assertEqual(self.room.players["user_0"].get_vote_count(), 2)
+
+    def test_role_flags(self):
+        role = Role(RoleType.WITCH)
+        self.assertEqual(role.code, WITCH)
+        self.assertTrue(role.use_skill())
+        self.assertFalse(role.can_use_skill())
+        role.protected_by_guard = True
+        role.kill()
+        self.assertFalse(role.is_alive)
+        self.assertTrue(role.protected_by_guard and role.skill_used)
+        self.assertEqual(dict(role.special_effects), {})
+        self.assertFalse(hasattr(role, "__dict__") or hasattr(self.room, "__dict__"))
+
+class TestRoomCounters(unittest.TestCase):
+    """隨機操作序列後，增量維護的計數必須與重新掃描全部玩家的結果一致"""
+
+    def assert_counters_match(self, room: GameRoom):
+        alive = [p for p in room.players.values() if p.is_alive()]
+        wolves = [p for p in alive if p.role.role_type in (RoleType.WEREWOLF, RoleType.WOLF_KING)]
+        self.assertEqual(room.get_alive_players(), alive)
+        self.assertEqual(room.alive_count(), len(alive))
+        self.assertEqual(room.alive_wolf_count(), len(wolves))
+        self.assertEqual(room.get_werewolves(), [p for p in alive if p.role.role_type == RoleType.WEREWOLF])
+        for role_type in RoleType:
+            self.assertEqual(room.alive_count(role_type.code),
+                             sum(1 for p in alive if p.role.role_type == role_type))
+        if room.game_state != GameState.WAITING:
+            villagers = len(alive) - len(wolves)
+            hunter_revenge = "hunter_shoot" in room.night_actions and any(
+                not p.is_alive() and p.role.role_type == RoleType.HUNTER for p in room.players.values())
+            expected = ("好人陣營" if not wolves or hunter_revenge
+                        else "狼人陣營" if len(wolves) >= villagers else None)
+            self.assertEqual(room.check_game_end(), expected)
+            self.assertEqual(room.check_voting_complete(), len(room.votes) >= len(alive))
+
+    def random_step(self, rng: random.Random, room: GameRoom):
+        ids = list(room.players)
+        if room.game_state == GameState.WAITING:
+            action = rng.random()
+            if action < 0.5 or len(ids) < 6:
+                user_id = f"user_{rng.randrange(20)}"
+                room.add_player(user_id, user_id)
+            elif action < 0.7:
+                room.remove_player(rng.choice(ids))
+            elif action < 0.8:
+                room.assign_roles()
+            else:
+                for player in room.players.values():
+                    player.is_ready = True
+                room.start_game()
+            return
+        target = rng.choice(ids)
+        action = rng.random()
+        if action < 0.3:
+            room.night_actions["werewolf_kill"] = target
+            if rng.random() < 0.3:
+                room.night_actions["witch_kill"] = rng.choice(ids)
+            room.start_day_phase()
+        elif action < 0.6:
+            room.cast_vote(rng.choice(ids), target)
+        elif action < 0.8:
+            room.process_votes()
+        elif action < 0.9:
+            room.start_night_phase()
+        else:
+            # 存檔後還原的房間重建相同的計數
+            room = GameStorage.restore(GameStorage.snapshot(room))
+        return room
+
+    def test_counters_match_full_recount(self):
+        for seed in range(200):
+            rng = random.Random(seed)
+            room = GameRoom(f"room_{seed}")
+            for _ in range(60):
+                room = self.random_step(rng, room) or room
+                self.assert_counters_match(room)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
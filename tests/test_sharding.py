@@ -0,0 +1,213 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import Mock
+from linebot.models import MessageEvent
+from src.bot.handler import MessageHandler
+from src.bot.sharding import HashRing, ShardRouter, ShardServer
+from src.utils.backend import SQLiteBackend
+from src.utils.metrics import MetricsRegistry
+from src.utils.storage import GameStorage
+
+def text_event(text: str, user_id: str, group_id: str = None, event_id: str = None) -> MessageEvent:
+    source = {"type": "group", "groupId": group_id, "userId": user_id} if group_id else {"type": "user", "userId": user_id}
+    return MessageEvent.new_from_json_dict({
+        "type": "message", "replyToken": "token", "timestamp": 0, "mode": "active",
+        "source": source, "message": {"type": "text", "id": "1", "text": text},
+        "webhookEventId": event_id
+    })
+
+def wait_until(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met")
+        time.sleep(0.01)
+
+class TestHashRing(unittest.TestCase):
+    def test_adding_a_node_moves_about_one_nth_of_keys(self):
+        ring = HashRing(["a", "b", "c"])
+        keys = [f"group_{i}" for i in range(3000)]
+        before = {key: ring.node_for(key) for key in keys}
+        ring.add("d")
+        moved = [key for key in keys if ring.node_for(key) != before[key]]
+
+        self.assertTrue(all(ring.node_for(key) == "d" for key in moved))
+        self.assertLess(abs(len(moved) / len(keys) - 0.25), 0.1)
+
+    def test_removing_a_node_only_moves_its_keys(self):
+        ring = HashRing(["a", "b", "c"])
+        keys = [f"group_{i}" for i in range(1000)]
+        before = {key: ring.node_for(key) for key in keys}
+        ring.remove("b")
+        for key in keys:
+            if before[key] != "b":
+                self.assertEqual(ring.node_for(key), before[key])
+            else:
+                self.assertIn(ring.node_for(key), ("a", "c"))
+
+class TestSharding(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = SQLiteBackend(os.path.join(self.tmp.name, "game.db"))
+        self.servers = []
+        self.router = ShardRouter(authkey=b"secret")
+
+    def tearDown(self):
+        self.router.close()
+        for server in self.servers:
+            server.close()
+            server.message_handler.timer.shutdown()
+        self.backend.close()
+        self.tmp.cleanup()
+
+    def start_shard(self) -> ShardServer:
+        line_bot_api = Mock()
+        line_bot_api.get_group_member_profile.side_effect = lambda group_id, user_id: Mock(display_name=user_id)
+        handler = MessageHandler(line_bot_api, storage=GameStorage(backend=self.backend), backend=self.backend)
+        server = ShardServer(handler, authkey=b"secret").start()
+        self.servers.append(server)
+        return server
+
+    def shard_for(self, address) -> ShardServer:
+        return next(server for server in self.servers if server.address == address)
+
+    def test_connections_require_an_authkey(self):
+        with self.assertRaises(ValueError):
+            ShardRouter([("127.0.0.1", 1)])
+        with self.assertRaises(ValueError):
+            ShardServer(Mock(), authkey=b"")
+
+    def test_group_events_reach_the_owner(self):
+        for _ in range(3):
+            self.router.add_node(self.start_shard().address)
+
+        for g in range(10):
+            self.assertTrue(self.router.route(text_event("/join", f"user_{g}", f"group_{g}")))
+
+        for g in range(10):
+            owner = self.shard_for(self.router.owner(f"group_{g}"))
+            wait_until(lambda: f"group_{g}" in owner.message_handler.rooms)
+            others = [s for s in self.servers if s is not owner]
+            self.assertTrue(all(f"group_{g}" not in s.message_handler.rooms for s in others))
+
+    def test_private_messages_follow_membership(self):
+        for _ in range(3):
+            self.router.add_node(self.start_shard().address)
+        self.router.route(text_event("/join", "user_1", "group_a"))
+        wait_until(lambda: self.router.player_rooms.get("user_1") == "group_a")
+
+        owner = self.shard_for(self.router.owner("group_a"))
+        owner.message_handler.handle_private_message = Mock()
+        self.router.route(text_event("/skill @user_2", "user_1"))
+        wait_until(lambda: owner.message_handler.handle_private_message.called)
+
+    def test_redelivered_events_run_once(self):
+        server = self.start_shard()
+        self.router.add_node(server.address)
+        server.message_handler.handle_text_message = Mock()
+        for _ in range(2):
+            self.router.route(text_event("/join", "user_1", "group_a", event_id="01EVENT"))
+        self.router.route(text_event("/join", "user_2", "group_a", event_id="02EVENT"))
+        wait_until(lambda: server.message_handler.handle_text_message.call_count == 2)
+        time.sleep(0.05)
+        self.assertEqual(server.message_handler.handle_text_message.call_count, 2)
+
+    def test_second_router_routes_private_messages_after_sync(self):
+        for _ in range(3):
+            self.router.add_node(self.start_shard().address)
+        for u in range(12):
+            self.router.route(text_event("/join", f"user_{u}", f"group_{u % 4}"))
+        wait_until(lambda: len(self.router.player_rooms) == 12)
+
+        # 另一個 worker 的路由端沒有收過任何成員通知
+        other = ShardRouter([server.address for server in self.servers], authkey=b"secret")
+        try:
+            for server in self.servers:
+                server.message_handler.handle_private_message = Mock()
+            for u in range(12):
+                self.assertTrue(other.route(text_event("/skill @user_0", f"user_{u}")))
+            for u in range(12):
+                owner = self.shard_for(self.router.owner(f"group_{u % 4}"))
+                wait_until(lambda: any(call.args[0].source.user_id == f"user_{u}"
+                                       for call in owner.message_handler.handle_private_message.call_args_list))
+        finally:
+            other.close()
+
+    def test_router_collects_shard_metrics(self):
+        for server in (self.start_shard(), self.start_shard()):
+            server.registry = MetricsRegistry()
+            server.registry.inc("werewolf_events_total")
+            self.router.add_node(server.address)
+        snapshots = self.router.collect_metrics()
+        self.assertEqual(set(snapshots), {f"{host}:{port}" for host, port in self.router.ring.nodes})
+        text = MetricsRegistry().render(snapshots)
+        for shard in snapshots:
+            self.assertIn(f'werewolf_events_total{{shard="{shard}"}} 1', text)
+
+    def test_rooms_move_when_a_node_joins(self):
+        self.router.add_node(self.start_shard().address)
+        for g in range(20):
+            self.router.route(text_event("/join", f"user_{g}", f"group_{g}"))
+        first = self.servers[0]
+        wait_until(lambda: len(first.message_handler.rooms) == 20)
+
+        moves = self.router.add_node(self.start_shard().address)
+        second = self.servers[1]
+        self.assertTrue(moves)
+        for room_id in moves:
+            self.assertNotIn(room_id, first.message_handler.rooms)
+            self.assertIn(room_id, second.message_handler.rooms)
+            self.assertIn(room_id.replace("group", "user"), second.message_handler.rooms[room_id].players)
+        self.assertEqual(len(first.message_handler.rooms) + len(second.message_handler.rooms), 20)
+
+        # 移除節點時房間回到剩下的分片
+        self.router.remove_node(second.address)
+        self.assertEqual(len(first.message_handler.rooms), 20)
+
+    def test_health_checks_remove_and_restore_nodes(self):
+        first, second = self.start_shard(), self.start_shard()
+        self.router.add_node(first.address)
+        self.router.add_node(second.address)
+        self.router.HEALTH_FAILURES = 1
+        for g in range(20):
+            self.router.route(text_event("/join", f"user_{g}", f"group_{g}"))
+        wait_until(lambda: len(first.message_handler.rooms) + len(second.message_handler.rooms) == 20)
+        second.message_handler.storage.flush()
+        self.assertEqual(self.router.check_health(), {})
+
+        second.close()
+        moves = self.router.check_health()
+        self.assertNotIn(second.address, self.router.ring.nodes)
+        self.assertTrue(moves)
+        self.assertTrue(all(address == first.address for address in moves.values()))
+        self.assertEqual(len(first.message_handler.rooms), 20)
+
+        # 同一位址重新啟動的分片會加回環上並取回房間
+        line_bot_api = Mock()
+        handler = MessageHandler(line_bot_api, storage=GameStorage(backend=self.backend), backend=self.backend)
+        revived = ShardServer(handler, second.address, authkey=b"secret").start()
+        self.servers.append(revived)
+        moves = self.router.check_health()
+        self.assertIn(second.address, self.router.ring.nodes)
+        self.assertEqual(len(moves), len(revived.message_handler.rooms))
+        self.assertEqual(len(first.message_handler.rooms) + len(revived.message_handler.rooms), 20)
+
+    def test_unversioned_storage_keeps_silent_nodes_on_the_ring(self):
+        first, second = self.start_shard(), self.start_shard()
+        self.router.add_node(first.address)
+        self.router.add_node(second.address)
+        self.router.HEALTH_FAILURES = 1
+        self.backend.versioned = False
+        group_id = next(f"group_{g}" for g in range(100) if self.router.owner(f"group_{g}") == second.address)
+
+        second.close()
+        self.assertEqual(self.router.check_health(), {})
+        self.assertIn(second.address, self.router.ring.nodes)
+        # 事件轉送失敗，由 LINE 重送而不是交給另一個分片
+        self.assertFalse(self.router.route(text_event("/join", "user_1", group_id)))
+        self.assertNotIn(group_id, first.message_handler.rooms)
+
+if __name__ == '__main__':
+    unittest.main()
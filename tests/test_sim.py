@@ -0,0 +1,71 @@
+import unittest
+from src.sim.policy import Policy
+from src.sim.simulator import DRAW, OUTCOMES, VILLAGE, play_game, simulate, wilson_interval
+from src.sim.vector import np, simulate_vectorized
+
+class TestWilsonInterval(unittest.TestCase):
+    def test_known_values(self):
+        low, high = wilson_interval(50, 100)
+        self.assertAlmostEqual(low, 0.4038, places=3)
+        self.assertAlmostEqual(high, 0.5962, places=3)
+        self.assertEqual(wilson_interval(0, 0), (0.0, 1.0))
+        low, high = wilson_interval(0, 20)
+        self.assertEqual(low, 0.0)
+        self.assertGreater(high, 0.0)
+
+class TestSimulator(unittest.TestCase):
+    def test_same_seed_same_game(self):
+        for policy in ("random", "informed"):
+            for seed in range(20):
+                result = play_game(9, seed, policy)
+                self.assertIn(result[0], OUTCOMES)
+                self.assertEqual(play_game(9, seed, policy), result)
+
+    def test_results_do_not_depend_on_workers(self):
+        inline = simulate([6, 12], 30, workers=1, rules={"vote_tie_policy": "revote"})
+        pooled = simulate([6, 12], 30, workers=2, rules={"vote_tie_policy": "revote"})
+        for player_count in (6, 12):
+            self.assertEqual(inline[player_count].games, 30)
+            self.assertEqual(inline[player_count].wins, pooled[player_count].wins)
+            self.assertEqual(inline[player_count].days, pooled[player_count].days)
+
+    def test_policies_must_choose_targets_and_votes(self):
+        class NightOnlyPolicy(Policy):
+            def night_target(self, room, player):
+                return None
+
+        with self.assertRaises(TypeError):
+            NightOnlyPolicy(None)
+
+    def test_custom_deck(self):
+        deck = {"min_players": 5, "max_players": 5,
+                "role_distribution": {"5": {"roles": {"狼人": 1, "預言家": 1}}}}
+        stats = simulate([5], 20, workers=1, deck=deck)[5]
+        self.assertEqual(sum(stats.wins.values()), 20)
+        self.assertEqual(stats.wins[DRAW], 0)
+        with self.assertRaises(ValueError):
+            play_game(6, 0, deck=deck)
+
+@unittest.skipIf(np is None, "需要 numpy")
+class TestVectorizedSimulator(unittest.TestCase):
+    def test_matches_room_simulator(self):
+        rules = {"vote_tie_policy": "revote"}
+        rooms = simulate([8], 1500, workers=1, policy="informed", rules=rules)[8]
+        arrays = simulate_vectorized([8], 20000, policy="informed", rules=rules)[8]
+        self.assertEqual(arrays.games, 20000)
+        # 向量化的勝率落在逐局模擬的 99.9% 信賴區間內
+        low, high = wilson_interval(rooms.wins[VILLAGE], rooms.games, z=3.29)
+        self.assertTrue(low <= arrays.win_rate(VILLAGE) <= high)
+        self.assertAlmostEqual(arrays.average_days, rooms.average_days, delta=0.15)
+
+    def test_same_seed_same_result(self):
+        first = simulate_vectorized([6, 12], 500, seed=3, batch_size=200)
+        second = simulate_vectorized([6, 12], 500, seed=3, batch_size=200)
+        for player_count in (6, 12):
+            self.assertEqual(first[player_count].wins, second[player_count].wins)
+            self.assertEqual(sum(first[player_count].wins.values()), 500)
+        with self.assertRaises(ValueError):
+            simulate_vectorized([5], 10)
+
+if __name__ == '__main__':
+    unittest.main()
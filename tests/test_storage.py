@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.game.room import GameRoom
+from src.utils.storage import GameStorage
+
+class TestGameStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.room = GameRoom("test_room")
+        self.room.add_player("user_1", "Player 1")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_dirty_rooms_are_coalesced_into_one_write(self):
+        storage = GameStorage(self.tmp.name, flush_interval=3600)
+        with patch.object(storage.backend, '_atomic_write', wraps=storage.backend._atomic_write) as write:
+            for i in range(50):
+                self.room.day_count = i
+                storage.mark_dirty(self.room)
+            self.assertEqual(write.call_count, 0)
+            storage.close()
+            self.assertEqual(write.call_count, 1)
+
+        loaded = GameStorage(self.tmp.name).load_game("test_room")
+        self.assertEqual(loaded.day_count, 49)
+
+    def test_atomic_compact_write(self):
+        storage = GameStorage(self.tmp.name)
+        self.assertTrue(storage.save_game(self.room))
+        self.assertEqual(os.listdir(self.tmp.name), ["test_room.json"])
+
+        with open(os.path.join(self.tmp.name, "test_room.json"), encoding='utf-8') as f:
+            content = f.read()
+        self.assertNotIn("\n", content)
+        self.assertEqual(json.loads(content)["players"][0]["user_id"], "user_1")
+
+    def test_failed_write_keeps_previous_file(self):
+        storage = GameStorage(self.tmp.name)
+        storage.save_game(self.room)
+        self.room.day_count = 5
+        with patch('src.utils.backend.os.fsync', side_effect=OSError("disk full")):
+            self.assertFalse(storage.save_game(self.room))
+        self.assertEqual(os.listdir(self.tmp.name), ["test_room.json"])
+        self.assertEqual(storage.load_game("test_room").day_count, 0)
+
+    def test_deleted_game_is_not_resurrected_by_pending_snapshot(self):
+        storage = GameStorage(self.tmp.name, flush_interval=3600)
+        storage.mark_dirty(self.room)
+        storage.delete_game("test_room")
+        storage.close()
+        self.assertFalse(storage.has_game("test_room"))
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_snapshot_taken_before_delete_is_skipped(self):
+        storage = GameStorage(self.tmp.name, flush_interval=3600)
+        write = storage._write
+
+        def delete_then_write(pending):
+            # 快照已從佇列取出、尚未寫入時刪除遊戲
+            storage.delete_game("test_room")
+            return write(pending)
+
+        storage.mark_dirty(self.room)
+        with patch.object(storage, '_write', side_effect=delete_then_write):
+            storage.flush()
+        self.assertEqual(os.listdir(self.tmp.name), [])
+        storage.close()
+
+    def test_sequence_bookkeeping_does_not_grow(self):
+        storage = GameStorage(self.tmp.name, flush_interval=3600)
+        for i in range(20):
+            room = GameRoom(f"room_{i}")
+            storage.mark_dirty(room)
+            storage.flush()
+            if i % 2:
+                storage.delete_game(room.room_id)
+        storage.close()
+        self.assertEqual(storage._written_seq, {})
+        self.assertEqual(storage._in_flight, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import threading
+import time
+import unittest
+from src.utils.timer import GameTimer
+
+class TestGameTimer(unittest.TestCase):
+    def setUp(self):
+        self.timer = GameTimer()
+
+    def tearDown(self):
+        self.timer.shutdown()
+
+    def test_timers_fire_in_deadline_order(self):
+        fired = []
+        done = threading.Event()
+        self.timer.schedule("room_a", "vote", 0.05, lambda: fired.append("vote"))
+        self.timer.schedule("room_b", "night", 0.01, lambda: fired.append("night"))
+        self.timer.schedule("room_a", "warning", 0.1, done.set)
+        self.assertTrue(done.wait(2))
+        time.sleep(0.01)
+        self.assertEqual(fired, ["night", "vote"])
+        self.assertEqual(self.timer.active_count(), 0)
+
+    def test_cancel_named_timer(self):
+        fired = threading.Event()
+        self.timer.schedule("room_a", "warning", 0.02, fired.set)
+        self.timer.cancel("room_a", "warning")
+        self.assertFalse(fired.wait(0.1))
+
+    def test_start_timer_replaces_room_timers(self):
+        fired = []
+        self.timer.schedule("room_a", "warning", 0.02, lambda: fired.append("warning"))
+        self.timer.start_timer("room_a", 60, lambda: fired.append("vote"), "vote")
+        time.sleep(0.1)
+        self.assertEqual(fired, [])
+        self.assertEqual(self.timer.active_count(), 1)
+        self.assertIn(self.timer.get_remaining_time("room_a"), (59, 60))
+
+    def test_timer_waiting_for_the_pool_can_be_cancelled(self):
+        timer = GameTimer(callback_workers=1)
+        release = threading.Event()
+        fired = []
+        timer.schedule("room_b", "night", 0, release.wait)
+        timer.schedule("room_a", "vote", 0.01, lambda: fired.append("vote"))
+        time.sleep(0.1)
+        # vote 已到期並排入執行緒池，但回呼尚未執行
+        self.assertTrue(timer.has_timers("room_a"))
+        timer.cancel_timer("room_a")
+        self.assertFalse(timer.has_timers("room_a"))
+        release.set()
+        time.sleep(0.05)
+        timer.shutdown()
+        self.assertEqual(fired, [])
+
+    def test_many_timers_use_single_thread(self):
+        before = threading.active_count()
+        for i in range(1000):
+            self.timer.schedule(f"room_{i}", "night", 3600, lambda: None)
+        self.assertLessEqual(threading.active_count() - before, 1)
+        for i in range(1000):
+            self.timer.cancel_timer(f"room_{i}")
+        self.assertEqual(self.timer.active_count(), 0)
+        self.assertEqual(self.timer.get_remaining_time("room_0"), 0)
+
+if __name__ == '__main__':
+    unittest.main()
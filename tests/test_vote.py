@@ -0,0 +1,101 @@
+import random
+import unittest
+from src.game.room import GameRoom
+from src.game.vote import TIE_NO_ELIMINATION, TIE_RANDOM, TIE_REVOTE, VoteTally
+
+class TestVoteTally(unittest.TestCase):
+    def test_change_and_retract_update_counts(self):
+        tally = VoteTally()
+        tally.cast("a", "x")
+        tally.cast("b", "x")
+        tally.cast("c", "y")
+        self.assertEqual(tally.leaders, {"x"})
+        self.assertEqual(tally.max_count, 2)
+
+        self.assertEqual(tally.cast("b", "y"), "x")
+        self.assertEqual(tally.counts, {"x": 1, "y": 2})
+        self.assertEqual(tally.leaders, {"y"})
+
+        tally.retract("c")
+        self.assertTrue(tally.is_tie())
+        self.assertEqual(tally.leaders, {"x", "y"})
+        tally.retract("a")
+        tally.retract("b")
+        self.assertEqual((tally.max_count, tally.leaders, tally.counts), (0, set(), {}))
+
+    def test_leaders_match_recount(self):
+        rng = random.Random(7)
+        tally = VoteTally()
+        for _ in range(2000):
+            voter = f"v{rng.randrange(12)}"
+            if rng.random() < 0.2:
+                tally.retract(voter)
+            else:
+                tally.cast(voter, f"t{rng.randrange(5)}")
+            counts = {}
+            for target in tally.votes.values():
+                counts[target] = counts.get(target, 0) + 1
+            self.assertEqual(tally.counts, counts)
+            best = max(counts.values(), default=0)
+            self.assertEqual(set(tally.leaders), {t for t, c in counts.items() if c == best})
+
+    def test_tie_policies(self):
+        tally = VoteTally({"a": "x", "b": "y"})
+        self.assertEqual(tally.resolve(TIE_NO_ELIMINATION), (None, None))
+        self.assertEqual(tally.resolve(TIE_REVOTE), (None, {"x", "y"}))
+        self.assertIn(tally.resolve(TIE_RANDOM, random.Random(1))[0], ("x", "y"))
+        # 重新投票後仍平票則無人出局
+        tally.candidates = {"x", "y"}
+        self.assertEqual(tally.resolve(TIE_REVOTE), (None, None))
+
+class TestRoomVoting(unittest.TestCase):
+    def setUp(self):
+        self.room = GameRoom("test_room")
+        for i in range(6):
+            self.room.add_player(f"user_{i}", f"Player {i}")
+            self.room.toggle_ready(f"user_{i}")
+        self.room.start_game()
+        self.room.start_voting_phase()
+
+    def test_revote_does_not_double_count(self):
+        self.room.cast_vote("user_0", "user_1")
+        self.room.cast_vote("user_0", "user_2")
+        self.assertEqual(self.room.players["user_1"].voted_by, [])
+        self.assertEqual(self.room.get_vote_results(), {"user_2": 1})
+        self.room.cast_vote("user_3", "user_2")
+        self.assertEqual(self.room.process_votes().user_id, "user_2")
+        self.assertEqual(self.room.players["user_2"].voted_by, [])
+
+    def test_revote_among_tied_players(self):
+        self.room.config.config = dict(self.room.config.config, vote_tie_policy=TIE_REVOTE)
+        self.room.cast_vote("user_0", "user_1")
+        self.room.cast_vote("user_1", "user_2")
+        self.assertIsNone(self.room.process_votes())
+        self.assertEqual(self.room.vote_candidates, ["user_1", "user_2"])
+
+        self.assertFalse(self.room.cast_vote("user_0", "user_3"))
+        self.room.cast_vote("user_0", "user_1")
+        self.assertEqual(self.room.process_votes().user_id, "user_1")
+        self.assertIsNone(self.room.vote_candidates)
+
+    def test_random_tie_replays_the_same_elimination(self):
+        events = []
+        self.room.on_event = lambda room, seq, op, args: events.append((seq, op, args))
+        self.room.config.config = dict(self.room.config.config, vote_tie_policy=TIE_RANDOM)
+        self.room.cast_vote("user_0", "user_1")
+        self.room.cast_vote("user_1", "user_2")
+        eliminated = self.room.process_votes()
+        self.assertEqual(events[-1][2]["eliminated"], eliminated.user_id)
+
+        replayed = GameRoom("test_room")
+        for i in range(6):
+            replayed.add_player(f"user_{i}", f"Player {i}")
+        replayed._set_roles(self.room._role_map())
+        replayed._begin_game()
+        for event in events:
+            replayed.apply_event(*event)
+        self.assertFalse(replayed.players[eliminated.user_id].is_alive())
+        self.assertEqual(replayed.alive_count(), 5)
+
+if __name__ == '__main__':
+    unittest.main()